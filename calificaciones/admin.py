@@ -1,6 +1,40 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ERROR_FLAG
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponseRedirect
+from django.urls import path, reverse
 from django.utils.html import format_html
+from sistema_triage.admin import admin_site
 from .models import CalificacionSQLite
+from .estadisticas import actualizar_calificacion_en_lote, resumenes, estadisticas_sqlite
+from sistema_triage.exportar import FORMATOS, respuesta_exportacion
+
+
+# (campo de values_list, encabezado) de la exportación en streaming
+COLUMNAS_EXPORTACION = [
+    ('id', 'id'),
+    ('fecha_creacion', 'fecha_creacion'),
+    ('nombre', 'nombre'),
+    ('calificacion', 'calificacion'),
+    ('comentario', 'comentario'),
+]
+
+
+def respuesta_calificaciones(queryset, formato):
+    return respuesta_exportacion(queryset, formato, COLUMNAS_EXPORTACION, 'calificaciones')
+
+
+def contexto_estadisticas(estadisticas):
+    """Dict para la plantilla a partir de EstadisticasCalificaciones"""
+    return {
+        'total': estadisticas.total,
+        'promedio': round(estadisticas.promedio, 2),
+        'excelentes': estadisticas.excelentes,
+        'buenas': estadisticas.buenas,
+        'regulares': estadisticas.regulares,
+        'malas': estadisticas.malas,
+    }
 
 @admin.register(CalificacionSQLite)
 class CalificacionSQLiteAdmin(admin.ModelAdmin):
@@ -102,11 +136,16 @@ class CalificacionSQLiteAdmin(admin.ModelAdmin):
     acciones_personalizadas.short_description = '🔧 Acciones'
     
     # Acciones personalizadas en lote
-    actions = ['marcar_como_excelente', 'exportar_calificaciones']
+    actions = [
+        'marcar_como_excelente',
+        'exportar_calificaciones',
+        'exportar_calificaciones_jsonl',
+        'estadisticas_seleccion',
+    ]
     
     def marcar_como_excelente(self, request, queryset):
         """Acción para marcar calificaciones como excelentes (5 estrellas)"""
-        updated_count = queryset.update(calificacion=5)
+        updated_count = actualizar_calificacion_en_lote(queryset, 5)
         
         self.message_user(
             request, 
@@ -116,16 +155,57 @@ class CalificacionSQLiteAdmin(admin.ModelAdmin):
     marcar_como_excelente.short_description = '⭐ Cambiar a 5 estrellas (excelente)'
     
     def exportar_calificaciones(self, request, queryset):
-        """Acción para exportar calificaciones seleccionadas"""
-        total = queryset.count()
-        promedio = sum(q.calificacion for q in queryset) / total if total > 0 else 0
+        """Descarga la selección en CSV, leída por bloques (memoria constante)"""
+        # Con "seleccionar todas" el queryset es el filtro del listado, sin IN (...)
+        return respuesta_calificaciones(queryset, 'csv')
+    exportar_calificaciones.short_description = '⬇️ Exportar selección (CSV)'
+    
+    def exportar_calificaciones_jsonl(self, request, queryset):
+        """Descarga la selección en JSONL, una calificación por línea"""
+        return respuesta_calificaciones(queryset, 'jsonl')
+    exportar_calificaciones_jsonl.short_description = '⬇️ Exportar selección (JSONL)'
+    
+    def estadisticas_seleccion(self, request, queryset):
+        """Acción para ver las estadísticas de las calificaciones seleccionadas"""
+        # Un solo aggregate() con los conteos por estrella
+        estadisticas = estadisticas_sqlite(queryset)
         
         self.message_user(
             request,
-            f'📊 {total} calificación(es) seleccionada(s). Promedio: {promedio:.1f}/5',
+            f'📊 {estadisticas.total} calificación(es) seleccionada(s). '
+            f'Promedio: {estadisticas.promedio:.1f}/5 | ⭐5: {estadisticas.excelentes} | '
+            f'⭐4: {estadisticas.buenas} | ⭐3: {estadisticas.regulares} | ⭐1-2: {estadisticas.malas}',
             level='info'
         )
-    exportar_calificaciones.short_description = '📊 Ver estadísticas de selección'
+    estadisticas_seleccion.short_description = '📊 Ver estadísticas de selección'
+    
+    # Exportación de todo lo que coincide con el filtro actual
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        urls = [
+            path(
+                'exportar/<str:formato>/',
+                self.admin_site.admin_view(self.exportar_filtro_view),
+                name='%s_%s_exportar' % info,
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def exportar_filtro_view(self, request, formato):
+        """Exporta todas las calificaciones que coinciden con los filtros y la búsqueda del listado"""
+        if formato not in FORMATOS:
+            raise Http404(f'Formato no soportado: {formato}')
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        # Mismos parámetros que el changelist (?calificacion__exact=5&q=...)
+        try:
+            cl = self.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            # Igual que el changelist: vuelve al listado sin los filtros inválidos
+            info = self.opts.app_label, self.opts.model_name
+            url = reverse('%s:%s_%s_changelist' % ((self.admin_site.name,) + info))
+            return HttpResponseRedirect(f'{url}?{ERROR_FLAG}=1')
+        return respuesta_calificaciones(cl.get_queryset(request), formato)
     
     # Personalización del formulario
     def get_form(self, request, obj=None, **kwargs):
@@ -143,29 +223,25 @@ class CalificacionSQLiteAdmin(admin.ModelAdmin):
     # Estadísticas en el changelist
     def changelist_view(self, request, extra_context=None):
         """Agregar estadísticas al listado"""
-        extra_context = extra_context or {}
-        
-        # Calcular estadísticas
-        queryset = self.get_queryset(request)
-        total = queryset.count()
+        response = super().changelist_view(request, extra_context=extra_context)
+        cl = getattr(response, 'context_data', {}).get('cl')
+        if cl is None:
+            return response
         
-        if total > 0:
-            promedio = sum(q.calificacion for q in queryset) / total
-            excelentes = queryset.filter(calificacion=5).count()
-            buenas = queryset.filter(calificacion=4).count()
-            regulares = queryset.filter(calificacion=3).count()
-            malas = queryset.filter(calificacion__lte=2).count()
-            
-            extra_context['estadisticas'] = {
-                'total': total,
-                'promedio': round(promedio, 2),
-                'excelentes': excelentes,
-                'buenas': buenas,
-                'regulares': regulares,
-                'malas': malas,
-            }
+        if cl.queryset.query.where:
+            # Con filtros o búsqueda: un aggregate() sobre el mismo queryset del listado
+            estadisticas = estadisticas_sqlite(cl.queryset)
+        else:
+            # Sin filtros: el resumen precalculado
+            estadisticas = resumenes()['sqlite']
         
-        return super().changelist_view(request, extra_context=extra_context)
+        if estadisticas.total > 0:
+            response.context_data['estadisticas'] = contexto_estadisticas(estadisticas)
+            response.context_data['estadisticas_filtradas'] = bool(cl.queryset.query.where)
+        return response
+
+
+admin_site.register(CalificacionSQLite, CalificacionSQLiteAdmin)
 
 
 # Personalización del sitio de administración
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CalificacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calificaciones'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        if getattr(settings, 'MONGODB_VERIFICAR_INDICES', False) and settings.MONGODB_URI:
+            import threading
+            from .mongo import revisar_indices_al_iniciar
+
+            # En un hilo para no retrasar el arranque si Atlas tarda en responder
+            threading.Thread(
+                target=revisar_indices_al_iniciar, name='verificar-indices-mongo', daemon=True
+            ).start()
@@ -0,0 +1,152 @@
+"""
+Detalle de una calificación con el origen decidido por el formato del ID.
+
+Un ID numérico solo puede ser de SQLite y un ObjectId (24 hex) solo de
+MongoDB, así que cada detalle hace una única consulta con proyección en la
+base que corresponde. Los datos ya armados se guardan en una caché LRU con
+TTL por proceso, que se invalida cuando una calificación se edita o elimina.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from django.conf import settings
+
+from .models import CalificacionSQLite, CalificacionPendienteMongo
+from .mongo import get_coleccion, circuito_mongo, PROYECCION_CALIFICACION
+from .listado import ORIGEN_MONGODB, ORIGEN_SQLITE, NOMBRES_ORIGEN
+
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_DETALLE = tuple(PROYECCION_CALIFICACION)
+
+
+def origen_de_id(id_calificacion):
+    """Retorna (origen, id) según el formato del ID; (None, None) si no es válido"""
+    # Primero ObjectId: 24 dígitos también son hexadecimales válidos
+    if ObjectId.is_valid(id_calificacion):
+        return ORIGEN_MONGODB, ObjectId(id_calificacion)
+    # isdigit() acepta dígitos Unicode como '²' que int() rechaza
+    if id_calificacion.isascii() and id_calificacion.isdigit():
+        return ORIGEN_SQLITE, int(id_calificacion)
+    return None, None
+
+
+class CacheDetalle:
+    """Caché LRU acotada con expiración por TTL"""
+
+    def __init__(self, tamano_maximo=256, ttl_segundos=60):
+        self.tamano_maximo = tamano_maximo
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._datos[clave]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        if self.tamano_maximo <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl_segundos, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano_maximo:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def invalidar_origen(self, origen):
+        with self._lock:
+            for clave in [clave for clave in self._datos if clave[0] == origen]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+
+cache_detalle = CacheDetalle(
+    tamano_maximo=getattr(settings, 'CALIFICACIONES_CACHE_DETALLE_TAMANO', 256),
+    ttl_segundos=getattr(settings, 'CALIFICACIONES_CACHE_DETALLE_TTL', 60),
+)
+
+
+def invalidar_detalle(origen, id_registro):
+    """Descarta el detalle cacheado de una calificación editada o eliminada"""
+    cache_detalle.invalidar((origen, str(id_registro)))
+
+
+def _datos(id_registro, origen, fila):
+    return {
+        'id': str(id_registro),
+        'nombre': fila.get('nombre', ''),
+        'comentario': fila.get('comentario', ''),
+        'calificacion': fila.get('calificacion', 0),
+        'fecha_creacion': fila.get('fecha_creacion'),
+        'origen': NOMBRES_ORIGEN[origen],
+    }
+
+
+def _buscar_sqlite(id_registro):
+    fila = CalificacionSQLite.objects.filter(pk=id_registro).values(*CAMPOS_DETALLE).first()
+    return _datos(id_registro, ORIGEN_SQLITE, fila) if fila else None
+
+
+def _buscar_mongodb(id_registro):
+    documento = None
+    try:
+        with circuito_mongo():
+            documento = get_coleccion().find_one({'_id': id_registro}, PROYECCION_CALIFICACION)
+    except Exception as e:
+        logger.warning('Error al buscar la calificación %s en MongoDB Atlas: %s', id_registro, e)
+
+    if documento is None:
+        # Puede estar aceptada en el spool pero aún no enviada a Atlas
+        documento = CalificacionPendienteMongo.objects.filter(
+            mongo_id=str(id_registro)
+        ).values(*CAMPOS_DETALLE).first()
+    return _datos(id_registro, ORIGEN_MONGODB, documento) if documento else None
+
+
+def obtener_detalle(id_calificacion):
+    """
+    Retorna el dict de detalle de una calificación o None si no existe.
+    Las fechas se entregan tal como vienen de la base; la vista las normaliza.
+    """
+    origen, id_registro = origen_de_id(id_calificacion)
+    if origen is None:
+        return None
+
+    clave = (origen, str(id_registro))
+    datos = cache_detalle.obtener(clave)
+    if datos is not None:
+        return datos
+
+    if origen == ORIGEN_SQLITE:
+        datos = _buscar_sqlite(id_registro)
+    else:
+        datos = _buscar_mongodb(id_registro)
+    if datos is not None:
+        cache_detalle.guardar(clave, datos)
+    return datos
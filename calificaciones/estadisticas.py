@@ -0,0 +1,242 @@
+"""
+Estadísticas de calificaciones calculadas por cada motor de base de datos.
+
+SQLite responde con un único aggregate() condicional y MongoDB con un único
+pipeline $group; ambos resultados se combinan en EstadisticasCalificaciones,
+así ninguna vista necesita traer las calificaciones a Python para contarlas.
+
+Las páginas no recalculan nada: leen ResumenCalificaciones, que se actualiza
+en cada alta, cambio o baja y se puede reconstruir con el comando
+reconstruir_resumen_calificaciones.
+
+Si reconstruir un resumen faltante falla (p. ej. Atlas caído), no se vuelve a
+intentar en ese proceso hasta que pase CALIFICACIONES_RESUMEN_REINTENTO_SEGUNDOS,
+así las páginas no esperan el timeout de MongoDB en cada carga.
+"""
+import logging
+import time
+
+from bson import ObjectId
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import CalificacionSQLite, CalificacionPendienteMongo, ResumenCalificaciones
+from .mongo import get_coleccion, circuito_mongo
+
+
+logger = logging.getLogger(__name__)
+
+ESTRELLAS = (1, 2, 3, 4, 5)
+ORIGENES = ('sqlite', 'mongodb')
+
+# Se envía (sender=ResumenCalificaciones, origen=...) cuando se confirma la
+# transacción que cambió las calificaciones de un origen
+resumen_actualizado = Signal()
+
+
+class EstadisticasCalificaciones:
+    """Histograma por estrellas, total y suma de un conjunto de calificaciones"""
+
+    def __init__(self, por_estrella=None, actualizado=None):
+        self.actualizado = actualizado
+        self.por_estrella = {estrella: 0 for estrella in ESTRELLAS}
+        for estrella, cantidad in (por_estrella or {}).items():
+            if estrella in self.por_estrella:
+                self.por_estrella[estrella] += cantidad
+
+    def __add__(self, otra):
+        combinado = dict(self.por_estrella)
+        for estrella, cantidad in otra.por_estrella.items():
+            combinado[estrella] += cantidad
+        actualizados = [fecha for fecha in (self.actualizado, otra.actualizado) if fecha]
+        return EstadisticasCalificaciones(combinado, max(actualizados) if actualizados else None)
+
+    @property
+    def total(self):
+        return sum(self.por_estrella.values())
+
+    @property
+    def suma(self):
+        return sum(estrella * cantidad for estrella, cantidad in self.por_estrella.items())
+
+    @property
+    def promedio(self):
+        return self.suma / self.total if self.total else 0
+
+    # Agrupaciones usadas por las plantillas y el admin
+    @property
+    def excelentes(self):
+        return self.por_estrella[5]
+
+    @property
+    def buenas(self):
+        return self.por_estrella[4]
+
+    @property
+    def regulares(self):
+        return self.por_estrella[3]
+
+    @property
+    def malas(self):
+        return self.por_estrella[1] + self.por_estrella[2]
+
+
+def estadisticas_sqlite(queryset=None):
+    """Estadísticas de un queryset con campo calificacion en una sola consulta"""
+    if queryset is None:
+        queryset = CalificacionSQLite.objects.all()
+
+    conteos = queryset.order_by().aggregate(**{
+        f'estrellas_{estrella}': Count('id', filter=Q(calificacion=estrella))
+        for estrella in ESTRELLAS
+    })
+    return EstadisticasCalificaciones({
+        estrella: conteos[f'estrellas_{estrella}'] for estrella in ESTRELLAS
+    })
+
+
+def estadisticas_mongodb(filtro=None):
+    """Estadísticas de la colección de MongoDB calculadas en el servidor"""
+    pipeline = [
+        {'$match': filtro or {}},
+        {'$group': {'_id': '$calificacion', 'cantidad': {'$sum': 1}}},
+    ]
+    # Como máximo cinco documentos de respuesta, uno por estrella
+    with circuito_mongo():
+        return EstadisticasCalificaciones({
+            grupo['_id']: grupo['cantidad'] for grupo in get_coleccion().aggregate(pipeline)
+        })
+
+
+# RESUMEN INCREMENTAL
+
+
+def _estadisticas_mongodb_con_spool():
+    """
+    Calificaciones de MongoDB más las del spool que aún no llegaron a Atlas.
+
+    El flusher inserta en Atlas antes de borrar del spool, así que una fila
+    puede estar en los dos lados. Se lee el spool primero, luego el $group y
+    al final se descartan (con un $in) las pendientes que ya están en Atlas:
+    cada calificación se cuenta una sola vez.
+    """
+    pendientes = dict(CalificacionPendienteMongo.objects.values_list('mongo_id', 'calificacion'))
+    estadisticas = estadisticas_mongodb()
+    if pendientes:
+        with circuito_mongo():
+            enviadas = get_coleccion().find(
+                {'_id': {'$in': [ObjectId(mongo_id) for mongo_id in pendientes]}}, {'_id': 1}
+            )
+            for documento in enviadas:
+                pendientes.pop(str(documento['_id']), None)
+        por_estrella = {}
+        for calificacion in pendientes.values():
+            por_estrella[calificacion] = por_estrella.get(calificacion, 0) + 1
+        estadisticas = estadisticas + EstadisticasCalificaciones(por_estrella)
+    return estadisticas
+
+
+def reconstruir_resumen(origen):
+    """Recalcula desde cero el resumen de un origen y lo guarda"""
+    if origen == 'sqlite':
+        estadisticas = estadisticas_sqlite()
+    else:
+        # Las calificaciones del spool cuentan como de MongoDB desde que se aceptan
+        estadisticas = _estadisticas_mongodb_con_spool()
+
+    valores = {
+        f'estrellas_{estrella}': estadisticas.por_estrella[estrella]
+        for estrella in ESTRELLAS
+    }
+    valores['suma'] = estadisticas.suma
+    valores['actualizado'] = timezone.now()
+    try:
+        with transaction.atomic():
+            ResumenCalificaciones.objects.update_or_create(origen=origen, defaults=valores)
+    except IntegrityError:
+        # Otro proceso creó el resumen al mismo tiempo; ese valor es igual de válido
+        pass
+    estadisticas.actualizado = valores['actualizado']
+    return estadisticas
+
+
+# origen -> time.monotonic() del último intento fallido de reconstrucción
+_fallos_reconstruccion = {}
+
+
+def _espera_reintento():
+    return getattr(settings, 'CALIFICACIONES_RESUMEN_REINTENTO_SEGUNDOS', 60)
+
+
+def reconstruir_si_procede(origen):
+    """
+    reconstruir_resumen() para un resumen faltante, salvo que haya fallado hace
+    menos de la espera de reintento. Retorna None si no se pudo reconstruir.
+    """
+    fallo = _fallos_reconstruccion.get(origen)
+    if fallo is not None and time.monotonic() - fallo < _espera_reintento():
+        return None
+    try:
+        estadisticas = reconstruir_resumen(origen)
+    except Exception as e:
+        _fallos_reconstruccion[origen] = time.monotonic()
+        logger.warning('No se pudo reconstruir el resumen de %s: %s', origen, e)
+        return None
+    _fallos_reconstruccion.pop(origen, None)
+    return estadisticas
+
+
+def registrar_cambios(origen, cambios):
+    """Aplica {estrella: +/-cantidad} al resumen; si aún no existe lo reconstruye"""
+    transaction.on_commit(
+        lambda: resumen_actualizado.send(sender=ResumenCalificaciones, origen=origen)
+    )
+    if ResumenCalificaciones.registrar(origen, cambios):
+        return
+    reconstruir_si_procede(origen)
+
+
+def _desde_resumen(resumen):
+    return EstadisticasCalificaciones({
+        estrella: getattr(resumen, f'estrellas_{estrella}') for estrella in ESTRELLAS
+    }, resumen.actualizado)
+
+
+def resumen_origen(origen):
+    """Estadísticas de un solo origen leídas del resumen (se reconstruye si falta)"""
+    resumen = ResumenCalificaciones.objects.filter(origen=origen).first()
+    if resumen is None:
+        return reconstruir_si_procede(origen) or EstadisticasCalificaciones()
+    return _desde_resumen(resumen)
+
+
+def resumenes():
+    """Estadísticas de todos los orígenes leídas del resumen en una consulta"""
+    resultado = {}
+    for resumen in ResumenCalificaciones.objects.filter(origen__in=ORIGENES):
+        resultado[resumen.origen] = _desde_resumen(resumen)
+
+    for origen in ORIGENES:
+        if origen not in resultado:
+            resultado[origen] = reconstruir_si_procede(origen) or EstadisticasCalificaciones()
+    return resultado
+
+
+def actualizar_calificacion_en_lote(queryset, valor):
+    """queryset.update(calificacion=valor) manteniendo el resumen al día"""
+    with transaction.atomic():
+        anteriores = dict(
+            queryset.order_by().values_list('calificacion').annotate(cantidad=Count('id'))
+        )
+        actualizadas = queryset.update(calificacion=valor)
+        cambios = {estrella: -cantidad for estrella, cantidad in anteriores.items()}
+        cambios[valor] = cambios.get(valor, 0) + sum(anteriores.values())
+        registrar_cambios('sqlite', cambios)
+
+    # update() no envía señales: se descartan los detalles cacheados de SQLite
+    from .detalle import cache_detalle
+    cache_detalle.invalidar_origen('sqlite')
+    return actualizadas
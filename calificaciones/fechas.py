@@ -0,0 +1,39 @@
+"""
+Fechas de las calificaciones: se guardan siempre en UTC y se convierten a la
+hora de Colombia solo al mostrarlas.
+
+La zona horaria se resuelve una vez por proceso (zoneinfo) en lugar de
+llamar a pytz.timezone() en cada fila.
+"""
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+
+NOMBRE_ZONA_COLOMBIA = 'America/Bogota'
+
+
+@lru_cache(maxsize=None)
+def zona(nombre=NOMBRE_ZONA_COLOMBIA):
+    """ZoneInfo cacheada por nombre"""
+    return ZoneInfo(nombre)
+
+
+def a_utc(fecha):
+    """Fecha aware en UTC; las fechas naive se asumen UTC (así las entrega pymongo)"""
+    if fecha is None:
+        return None
+    if fecha.tzinfo is None:
+        return fecha.replace(tzinfo=dt_timezone.utc)
+    return fecha.astimezone(dt_timezone.utc)
+
+
+def a_colombia(fecha):
+    """Convierte una fecha a la hora de Colombia para mostrarla"""
+    if not isinstance(fecha, datetime):
+        return fecha
+    return a_utc(fecha).astimezone(zona())
+
+
+def ahora_utc():
+    return datetime.now(dt_timezone.utc)
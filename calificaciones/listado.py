@@ -0,0 +1,265 @@
+"""
+Listado paginado que combina las calificaciones de SQLite y MongoDB Atlas.
+
+Cada fuente (SQLite, MongoDB y el spool de calificaciones aún no enviadas a
+Atlas) se lee como un cursor ya ordenado por fecha_creacion y todas se
+mezclan de forma perezosa (k-way merge). La posición se guarda en un cursor
+opaco (fecha, origen, id), así cada página lee como máximo por_pagina + 1
+filas de cada fuente sin importar cuántas calificaciones existan.
+"""
+import heapq
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.db.models import Q
+
+from .models import CalificacionSQLite, CalificacionPendienteMongo
+from .mongo import get_coleccion, circuito_mongo, PROYECCION_CALIFICACION
+from .spool import despertar_flusher
+from .fechas import a_utc
+from sistema_triage.cursores import codificar_token, decodificar_token
+
+
+logger = logging.getLogger(__name__)
+
+POR_PAGINA = 20
+MAX_POR_PAGINA = 100
+
+# Claves cortas de origen usadas en el cursor; también definen el desempate
+# entre bases cuando dos calificaciones tienen exactamente la misma fecha.
+ORIGEN_MONGODB = 'mongodb'
+ORIGEN_SQLITE = 'sqlite'
+
+NOMBRES_ORIGEN = {
+    ORIGEN_SQLITE: 'SQLite',
+    ORIGEN_MONGODB: 'MongoDB Atlas',
+}
+
+
+def codificar_cursor(fecha, origen, id_registro):
+    """Convierte la clave (fecha, origen, id) en un token opaco para la URL"""
+    return codificar_token({
+        't': fecha.astimezone(dt_timezone.utc).isoformat(),
+        'o': origen,
+        'i': id_registro,
+    })
+
+
+def decodificar_cursor(token):
+    """Recupera la clave (fecha, origen, id) de un token; ValueError si es inválido"""
+    datos = decodificar_token(token)
+    try:
+        fecha = datetime.fromisoformat(datos['t'])
+        origen = datos['o']
+        id_registro = datos['i']
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f'Cursor inválido: {token}') from e
+
+    if origen not in NOMBRES_ORIGEN or fecha.tzinfo is None:
+        raise ValueError(f'Cursor inválido: {token}')
+    if origen == ORIGEN_SQLITE and not isinstance(id_registro, int):
+        raise ValueError(f'Cursor inválido: {token}')
+    return fecha, origen, id_registro
+
+
+def _limites(origen, clave, ascendente):
+    """
+    Traduce la clave del cursor a un filtro para una sola base.
+
+    Retorna (fecha, incluir_misma_fecha, id_limite): si id_limite no es None
+    el empate en fecha se resuelve por id; si no, incluir_misma_fecha indica
+    si las filas con la misma fecha quedan del lado pedido del cursor.
+    """
+    fecha, origen_cursor, id_cursor = clave
+    if origen == origen_cursor:
+        return fecha, False, id_cursor
+    return fecha, (origen < origen_cursor) != ascendente, None
+
+
+def _fila(fecha, origen, id_registro, nombre, comentario, calificacion):
+    # La fecha queda en UTC: la plantilla la muestra en hora de Colombia
+    return {
+        'id': str(id_registro),
+        'nombre': nombre,
+        'comentario': comentario,
+        'calificacion': calificacion,
+        'fecha_creacion': fecha,
+        'origen': NOMBRES_ORIGEN[origen],
+        # Clave de orden total usada por el merge y por los cursores
+        'clave': (fecha, origen, id_registro),
+    }
+
+
+def _leer_sqlite(clave, ascendente, limite):
+    queryset = CalificacionSQLite.objects.all()
+    if clave is not None:
+        fecha, incluir, id_limite = _limites(ORIGEN_SQLITE, clave, ascendente)
+        op = 'gt' if ascendente else 'lt'
+        if id_limite is not None:
+            queryset = queryset.filter(
+                Q(**{f'fecha_creacion__{op}': fecha}) |
+                Q(fecha_creacion=fecha, **{f'id__{op}': id_limite})
+            )
+        else:
+            op = op + 'e' if incluir else op
+            queryset = queryset.filter(**{f'fecha_creacion__{op}': fecha})
+
+    orden = ['fecha_creacion', 'id'] if ascendente else ['-fecha_creacion', '-id']
+    filas = queryset.order_by(*orden).values(
+        'id', 'nombre', 'comentario', 'calificacion', 'fecha_creacion'
+    )[:limite]
+    for fila in filas:
+        yield _fila(
+            fila['fecha_creacion'], ORIGEN_SQLITE, fila['id'],
+            fila['nombre'], fila['comentario'], fila['calificacion']
+        )
+
+
+def _id_mongo(id_registro):
+    try:
+        return ObjectId(id_registro)
+    except (InvalidId, TypeError):
+        return id_registro
+
+
+def _leer_mongodb(clave, ascendente, limite):
+    # Solo fechas BSON: los documentos antiguos con la fecha como texto quedan
+    # fuera hasta correr migrar_fechas_utc_mongo (el índice y el cursor
+    # comparan fechas, no cadenas)
+    solo_fechas = {'fecha_creacion': {'$type': 'date'}}
+    filtro = solo_fechas
+    if clave is not None:
+        fecha, incluir, id_limite = _limites(ORIGEN_MONGODB, clave, ascendente)
+        op = '$gt' if ascendente else '$lt'
+        if id_limite is not None:
+            filtro = {'$or': [
+                {'fecha_creacion': {op: fecha}},
+                {'fecha_creacion': fecha, '_id': {op: _id_mongo(id_limite)}},
+            ]}
+        else:
+            filtro = {'fecha_creacion': {op + 'e' if incluir else op: fecha}}
+        filtro = {'$and': [solo_fechas, filtro]}
+
+    sentido = 1 if ascendente else -1
+    documentos = get_coleccion().find(filtro, PROYECCION_CALIFICACION).sort(
+        [('fecha_creacion', sentido), ('_id', sentido)]
+    ).limit(limite).batch_size(limite)
+    for doc in documentos:
+        if not isinstance(doc.get('fecha_creacion'), datetime):
+            logger.warning('Calificación %s sin fecha BSON, se omite del listado', doc.get('_id'))
+            continue
+        yield _fila(
+            a_utc(doc['fecha_creacion']), ORIGEN_MONGODB, str(doc['_id']),
+            doc.get('nombre', ''), doc.get('comentario', ''), doc.get('calificacion', 0)
+        )
+
+
+def _leer_spool(clave, ascendente, limite):
+    """Calificaciones aceptadas para MongoDB que el flusher aún no ha enviado"""
+    queryset = CalificacionPendienteMongo.objects.all()
+    if clave is not None:
+        fecha, incluir, id_limite = _limites(ORIGEN_MONGODB, clave, ascendente)
+        op = 'gt' if ascendente else 'lt'
+        if id_limite is not None:
+            queryset = queryset.filter(
+                Q(**{f'fecha_creacion__{op}': fecha}) |
+                Q(fecha_creacion=fecha, **{f'mongo_id__{op}': id_limite})
+            )
+        else:
+            op = op + 'e' if incluir else op
+            queryset = queryset.filter(**{f'fecha_creacion__{op}': fecha})
+
+    orden = ['fecha_creacion', 'mongo_id'] if ascendente else ['-fecha_creacion', '-mongo_id']
+    filas = queryset.order_by(*orden).values(
+        'mongo_id', 'nombre', 'comentario', 'calificacion', 'fecha_creacion'
+    )[:limite]
+    for fila in filas:
+        yield _fila(
+            fila['fecha_creacion'], ORIGEN_MONGODB, fila['mongo_id'],
+            fila['nombre'], fila['comentario'], fila['calificacion']
+        )
+
+
+class PaginaCalificaciones:
+    """Una página del listado combinado con sus cursores de navegación"""
+
+    def __init__(self, calificaciones, cursor_siguiente=None, cursor_anterior=None,
+                 mongodb_disponible=True):
+        self.calificaciones = calificaciones
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.mongodb_disponible = mongodb_disponible
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+
+def _cursor_de(fila):
+    return codificar_cursor(*fila['clave'])
+
+
+def paginar_calificaciones(despues=None, antes=None, por_pagina=POR_PAGINA):
+    """
+    Retorna una PaginaCalificaciones ordenada de la más reciente a la más antigua.
+
+    despues/antes son tokens de cursor: 'despues' avanza a la página siguiente
+    y 'antes' retrocede a la anterior. Sin cursor se retorna la primera página.
+    """
+    por_pagina = max(1, min(por_pagina, MAX_POR_PAGINA))
+    ascendente = antes is not None
+    token = antes if ascendente else despues
+    clave = decodificar_cursor(token) if token else None
+    limite = por_pagina + 1
+
+    fuentes = [
+        list(_leer_sqlite(clave, ascendente, limite)),
+        list(_leer_spool(clave, ascendente, limite)),
+    ]
+    if fuentes[1]:
+        # Pendientes de un worker anterior: asegurar que alguien los envíe
+        despertar_flusher()
+    mongodb_disponible = True
+    try:
+        with circuito_mongo():
+            fuentes.append(list(_leer_mongodb(clave, ascendente, limite)))
+    except Exception as e:
+        logger.warning('MongoDB no disponible para el listado: %s', e)
+        mongodb_disponible = False
+
+    mezcla = heapq.merge(*fuentes, key=lambda fila: fila['clave'], reverse=not ascendente)
+    filas = []
+    for fila in mezcla:
+        # Una calificación recién enviada puede estar a la vez en el spool y en Atlas
+        if filas and filas[-1]['clave'] == fila['clave']:
+            continue
+        filas.append(fila)
+        if len(filas) == limite:
+            break
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+
+    if ascendente:
+        if not hay_mas:
+            # No quedan suficientes filas antes del cursor: es la primera página
+            return paginar_calificaciones(por_pagina=por_pagina)
+        filas.reverse()
+        return PaginaCalificaciones(
+            filas,
+            cursor_siguiente=_cursor_de(filas[-1]),
+            cursor_anterior=_cursor_de(filas[0]),
+            mongodb_disponible=mongodb_disponible,
+        )
+
+    return PaginaCalificaciones(
+        filas,
+        cursor_siguiente=_cursor_de(filas[-1]) if hay_mas else None,
+        cursor_anterior=_cursor_de(filas[0]) if clave is not None and filas else None,
+        mongodb_disponible=mongodb_disponible,
+    )
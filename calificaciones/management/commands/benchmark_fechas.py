@@ -0,0 +1,49 @@
+import time
+from datetime import timedelta
+
+import pytz
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.utils import timezone
+
+from calificaciones.fechas import a_colombia
+
+
+class Command(BaseCommand):
+    help = 'Compara el costo por fila de convertir fechas a hora de Colombia (pytz por fila vs zoneinfo cacheada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        base = timezone.now()
+        fechas = [base - timedelta(minutes=i) for i in range(options['filas'])]
+
+        def antes(fecha):
+            # Lo que hacían normalizar_fecha y el listado en cada fila
+            colombia_tz = pytz.timezone('America/Bogota')
+            return fecha.astimezone(colombia_tz)
+
+        plantilla_antes = Template(
+            '{% load tz %}{% for f in fechas %}{% timezone "America/Bogota" %}'
+            '{{ f|date:"d/m/Y H:i" }}{% endtimezone %}{% endfor %}'
+        )
+        plantilla_despues = Template(
+            '{% load fechas_colombia %}{% for f in fechas %}'
+            '{{ f|hora_colombia|date:"d/m/Y H:i" }}{% endfor %}'
+        )
+        filas_plantilla = fechas[:min(len(fechas), 5000)]
+
+        pruebas = [
+            ('pytz.timezone() + astimezone por fila', lambda: [antes(f) for f in fechas], len(fechas)),
+            ('zoneinfo cacheada (a_colombia)', lambda: [a_colombia(f) for f in fechas], len(fechas)),
+            ('plantilla con {% timezone %}',
+             lambda: plantilla_antes.render(Context({'fechas': filas_plantilla})), len(filas_plantilla)),
+            ('plantilla con |hora_colombia',
+             lambda: plantilla_despues.render(Context({'fechas': filas_plantilla})), len(filas_plantilla)),
+        ]
+        for nombre, funcion, filas in pruebas:
+            inicio = time.perf_counter()
+            funcion()
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(f'⏱️ {nombre}: {segundos * 1e6 / filas:.2f} µs/fila ({filas} filas)')
@@ -0,0 +1,84 @@
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calificaciones.services import CalificacionService
+
+
+def leer_jsonl(archivo):
+    """Genera un dict por línea sin cargar el archivo en memoria"""
+    for linea in archivo:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError:
+            # Se entrega vacío para que el repositorio lo cuente como rechazado
+            datos = {}
+        yield datos if isinstance(datos, dict) else {}
+
+
+def leer_csv(archivo):
+    yield from csv.DictReader(archivo)
+
+
+LECTORES = {
+    'jsonl': leer_jsonl,
+    'csv': leer_csv,
+}
+
+
+class Command(BaseCommand):
+    help = ('Importa calificaciones desde un archivo JSONL o CSV usando inserciones por lotes '
+            '(fecha_creacion opcional en ISO 8601; sin ella se usa la fecha de la carga)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo (.jsonl o .csv)')
+        parser.add_argument('--formato', choices=sorted(LECTORES), help='Por defecto según la extensión')
+        parser.add_argument('--destino', choices=['sqlite', 'mongodb'], help='Por defecto TIPO_BASE_DATOS')
+        parser.add_argument('--lote', type=int, default=None, help='Filas por bulk_create / insert_many')
+        parser.add_argument('--ordenado', action='store_true',
+                            help='MongoDB: detener cada lote en el primer error')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        formato = options['formato'] or os.path.splitext(ruta)[1].lstrip('.').lower()
+        if formato == 'json':
+            formato = 'jsonl'
+        if formato not in LECTORES:
+            raise CommandError(f'Formato no soportado: {formato} (use --formato jsonl|csv)')
+        if options['lote'] is not None and options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        def progreso(resultado):
+            self.stdout.write(
+                f'⏳ {resultado.procesadas} filas | {resultado.por_segundo:.0f} filas/s'
+            )
+
+        try:
+            with open(ruta, newline='', encoding='utf-8') as archivo:
+                resultado = CalificacionService.guardar_lote(
+                    LECTORES[formato](archivo),
+                    tipo_bd=options['destino'],
+                    tamano_lote=options['lote'],
+                    ordenado=options['ordenado'],
+                    progreso=progreso if options['verbosity'] > 1 else None,
+                )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+
+        for posicion, motivo in resultado.errores:
+            self.stderr.write(f'⚠️ Fila {posicion}: {motivo}')
+        estilo = self.style.WARNING if resultado.rechazadas else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'📥 Guardadas: {resultado.guardadas} | Rechazadas: {resultado.rechazadas} | '
+            f'{resultado.segundos:.2f}s | {resultado.por_segundo:.0f} filas/s'
+        ))
+        if resultado.interrumpido:
+            # Lo ya guardado se reportó arriba; el código de salida indica el fallo
+            raise CommandError(
+                f'❌ Importación interrumpida después de {resultado.procesadas} filas: {resultado.interrumpido}'
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calificaciones.mongo import INDICES, MongoNoDisponible, asegurar_indices, verificar_indices
+
+
+class Command(BaseCommand):
+    help = 'Crea y verifica los índices de la colección de calificaciones en MongoDB Atlas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Solo verificar; termina con error si falta alguno')
+
+    def handle(self, *args, **options):
+        try:
+            if options['verificar']:
+                faltantes = verificar_indices()
+                if faltantes:
+                    raise CommandError(f'Faltan índices: {", ".join(faltantes)}')
+            else:
+                creados = asegurar_indices()
+                for nombre in creados:
+                    self.stdout.write(f'🛠️ Índice creado: {nombre}')
+                faltantes = verificar_indices()
+                if faltantes:
+                    raise CommandError(f'No se pudieron crear: {", ".join(faltantes)}')
+        except MongoNoDisponible as e:
+            raise CommandError(f'MongoDB Atlas no disponible: {e}')
+
+        nombres = ', '.join(indice.document['name'] for indice in INDICES)
+        self.stdout.write(self.style.SUCCESS(f'✅ Índices verificados: {nombres}'))
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+
+from calificaciones.fechas import a_utc
+from calificaciones.mongo import MongoNoDisponible, circuito_mongo, get_coleccion
+
+
+# Documentos escritos con el formato anterior (fecha local + UTC + nombre de zona)
+FILTRO_ANTIGUOS = {'$or': [
+    {'fecha_creacion_utc': {'$exists': True}},
+    {'timezone': {'$exists': True}},
+    {'fecha_creacion': {'$type': 'string'}},
+]}
+CAMPOS_ANTIGUOS = {'fecha_creacion': 1, 'fecha_creacion_utc': 1}
+INDICE_ANTIGUO = 'fecha_creacion_utc_idx'
+
+
+def fecha_utc(documento):
+    """La fecha UTC de un documento antiguo, o None si no tiene ninguna legible"""
+    fecha = documento.get('fecha_creacion_utc') or documento.get('fecha_creacion')
+    if isinstance(fecha, str):
+        try:
+            fecha = datetime.fromisoformat(fecha)
+        except ValueError:
+            return None
+    return a_utc(fecha) if isinstance(fecha, datetime) else None
+
+
+class Command(BaseCommand):
+    help = 'Migra las calificaciones de MongoDB a una sola fecha_creacion en UTC'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Documentos por bulk_write')
+        parser.add_argument('--simular', action='store_true', help='Solo contar, sin escribir')
+
+    def handle(self, *args, **options):
+        try:
+            with circuito_mongo():
+                migrados, sin_fecha = self._migrar(get_coleccion(), options['lote'], options['simular'])
+        except MongoNoDisponible as e:
+            raise CommandError(f'MongoDB Atlas no disponible: {e}')
+
+        accion = 'Por migrar' if options['simular'] else 'Migrados'
+        self.stdout.write(self.style.SUCCESS(f'🕒 {accion}: {migrados} | Sin fecha legible: {sin_fecha}'))
+
+    def _migrar(self, coleccion, tamano_lote, simular):
+        migrados = sin_fecha = 0
+        operaciones = []
+        for documento in coleccion.find(FILTRO_ANTIGUOS, CAMPOS_ANTIGUOS).batch_size(tamano_lote):
+            fecha = fecha_utc(documento)
+            cambios = {'$unset': {'fecha_creacion_utc': '', 'timezone': ''}}
+            if fecha is None:
+                sin_fecha += 1
+            else:
+                cambios['$set'] = {'fecha_creacion': fecha}
+            operaciones.append(UpdateOne({'_id': documento['_id']}, cambios))
+            migrados += 1
+
+            if len(operaciones) >= tamano_lote:
+                if not simular:
+                    coleccion.bulk_write(operaciones, ordered=False)
+                operaciones = []
+
+        if operaciones and not simular:
+            coleccion.bulk_write(operaciones, ordered=False)
+        if not simular and INDICE_ANTIGUO in coleccion.index_information():
+            # El índice sobre fecha_creacion_utc ya no lo usa ninguna consulta
+            coleccion.drop_index(INDICE_ANTIGUO)
+        return migrados, sin_fecha
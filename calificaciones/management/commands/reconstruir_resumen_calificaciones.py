@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calificaciones.estadisticas import ORIGENES, reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores de ResumenCalificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--origen',
+            choices=ORIGENES,
+            help='Reconstruir solo este origen (por defecto todos)'
+        )
+
+    def handle(self, *args, **options):
+        origenes = [options['origen']] if options['origen'] else ORIGENES
+
+        for origen in origenes:
+            try:
+                estadisticas = reconstruir_resumen(origen)
+            except Exception as e:
+                raise CommandError(f'❌ No se pudo reconstruir el resumen de {origen}: {e}')
+
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Resumen {origen}: {estadisticas.total} calificaciones, '
+                f'promedio {estadisticas.promedio:.2f}'
+            ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from calificaciones.models import CalificacionPendienteMongo
+from calificaciones.spool import TAMANO_LOTE, vaciar_todo
+
+
+class Command(BaseCommand):
+    help = 'Envía a MongoDB Atlas las calificaciones pendientes del spool local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Documentos por insert_many')
+        parser.add_argument('--continuo', action='store_true', help='Seguir ejecutando como proceso worker')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre pasadas en modo continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            enviadas, fallidas = vaciar_todo(options['lote'])
+            pendientes = CalificacionPendienteMongo.objects.count()
+
+            if enviadas or fallidas or not options['continuo']:
+                estilo = self.style.WARNING if fallidas else self.style.SUCCESS
+                self.stdout.write(estilo(
+                    f'📤 Enviadas: {enviadas} | Fallidas: {fallidas} | Pendientes: {pendientes}'
+                ))
+
+            if not options['continuo']:
+                return
+            close_old_connections()
+            time.sleep(options['intervalo'])
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCalificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen', models.CharField(choices=[('sqlite', 'SQLite'), ('mongodb', 'MongoDB Atlas')], max_length=10, unique=True)),
+                ('estrellas_1', models.IntegerField(default=0)),
+                ('estrellas_2', models.IntegerField(default=0)),
+                ('estrellas_3', models.IntegerField(default=0)),
+                ('estrellas_4', models.IntegerField(default=0)),
+                ('estrellas_5', models.IntegerField(default=0)),
+                ('suma', models.IntegerField(default=0)),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Calificaciones',
+                'verbose_name_plural': 'Resúmenes de Calificaciones',
+            },
+        ),
+    ]
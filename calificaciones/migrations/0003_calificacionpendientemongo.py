@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:01
+
+import django.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0002_resumencalificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalificacionPendienteMongo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mongo_id', models.CharField(max_length=24, unique=True)),
+                ('nombre', models.CharField(max_length=100)),
+                ('comentario', models.TextField(blank=True)),
+                ('calificacion', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Calificación pendiente de MongoDB',
+                'verbose_name_plural': 'Calificaciones pendientes de MongoDB',
+                'indexes': [models.Index(fields=['fecha_creacion', 'mongo_id'], name='pendiente_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0003_calificacionpendientemongo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='calificacionsqlite',
+            name='fecha_creacion',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.utils import timezone
 
 class CalificacionBase(models.Model):
     nombre = models.CharField(max_length=100)
@@ -8,7 +10,8 @@ class CalificacionBase(models.Model):
     calificacion = models.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
-    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # default en lugar de auto_now_add: la carga masiva conserva la fecha del archivo
+    fecha_creacion = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         abstract = True
@@ -17,11 +20,83 @@ class CalificacionSQLite(CalificacionBase):
     def __str__(self):
         return f"{self.nombre} - {self.calificacion}/5"
     
+    def save(self, *args, **kwargs):
+        # La fila y el resumen (actualizado por señales) se guardan juntos
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     class Meta:
         db_table = 'calificaciones_calificacion'
         ordering = ['-fecha_creacion']
 
 
+class ResumenCalificaciones(models.Model):
+    """Contadores por estrella de cada base, mantenidos en cada alta, cambio o baja"""
+    ORIGEN_CHOICES = [
+        ('sqlite', 'SQLite'),
+        ('mongodb', 'MongoDB Atlas'),
+    ]
+    
+    origen = models.CharField(max_length=10, choices=ORIGEN_CHOICES, unique=True)
+    estrellas_1 = models.IntegerField(default=0)
+    estrellas_2 = models.IntegerField(default=0)
+    estrellas_3 = models.IntegerField(default=0)
+    estrellas_4 = models.IntegerField(default=0)
+    estrellas_5 = models.IntegerField(default=0)
+    suma = models.IntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Resumen {self.get_origen_display()}"
+    
+    @classmethod
+    def registrar(cls, origen, cambios):
+        """
+        Aplica cambios {estrella: +/-cantidad} con un UPDATE atómico.
+        Retorna False si todavía no existe el resumen de ese origen.
+        """
+        cambios = {estrella: cantidad for estrella, cantidad in cambios.items() if cantidad}
+        if not cambios:
+            return True
+        
+        valores = {
+            f'estrellas_{estrella}': F(f'estrellas_{estrella}') + cantidad
+            for estrella, cantidad in cambios.items()
+        }
+        valores['suma'] = F('suma') + sum(estrella * cantidad for estrella, cantidad in cambios.items())
+        valores['actualizado'] = timezone.now()
+        return cls.objects.filter(origen=origen).update(**valores) > 0
+    
+    class Meta:
+        verbose_name = "Resumen de Calificaciones"
+        verbose_name_plural = "Resúmenes de Calificaciones"
+
+
+class CalificacionPendienteMongo(models.Model):
+    """Calificación aceptada localmente que todavía no se ha enviado a MongoDB Atlas"""
+    # El _id se genera al aceptar la calificación: reenviar un lote es idempotente
+    mongo_id = models.CharField(max_length=24, unique=True)
+    nombre = models.CharField(max_length=100)
+    comentario = models.TextField(blank=True)
+    calificacion = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now, db_index=True)
+    ultimo_error = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"{self.nombre} - {self.calificacion}/5 (pendiente)"
+    
+    class Meta:
+        verbose_name = "Calificación pendiente de MongoDB"
+        verbose_name_plural = "Calificaciones pendientes de MongoDB"
+        indexes = [
+            models.Index(fields=['fecha_creacion', 'mongo_id'], name='pendiente_fecha_idx'),
+        ]
+
+
 def get_calificacion_model():
     """Retorna el modelo según la configuración"""
     tipo_bd = getattr(settings, 'TIPO_BASE_DATOS', 'sqlite')
@@ -0,0 +1,354 @@
+"""
+Acceso compartido a MongoDB Atlas para las calificaciones.
+
+Cada proceso (worker de gunicorn) mantiene un único MongoClient creado de
+forma perezosa y reutilizado por todas las vistas y por CalificacionService,
+en lugar de abrir y cerrar una conexión TLS/SRV en cada petición.
+
+Todo acceso pasa por un circuit breaker: tras varios fallos de conexión el
+circuito se abre y las vistas fallan de inmediato (mostrando solo SQLite)
+en lugar de esperar serverSelectionTimeoutMS en cada petición.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from pymongo import MongoClient, monitoring, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure
+
+from .fechas import a_utc, ahora_utc
+
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_COLECCION = 'calificaciones'
+
+# Solo los campos que muestran las plantillas viajan por la red
+PROYECCION_CALIFICACION = {'nombre': 1, 'comentario': 1, 'calificacion': 1, 'fecha_creacion': 1}
+TAMANO_BATCH = 100
+
+# Índices que necesitan las lecturas: orden del listado (fecha, _id) y el
+# $match/$group por calificacion de las estadísticas.
+INDICES = [
+    IndexModel([('fecha_creacion', DESCENDING), ('_id', DESCENDING)], name='fecha_creacion_idx'),
+    IndexModel([('calificacion', ASCENDING)], name='calificacion_idx'),
+]
+
+
+class MongoNoDisponible(Exception):
+    """MongoDB Atlas no está configurado o no se puede usar en este momento"""
+
+
+class EstadisticasPool(monitoring.ConnectionPoolListener):
+    """Cuenta los eventos del pool de conexiones para verificar la reutilización"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.conexiones_creadas = 0
+            self.conexiones_cerradas = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.checkouts_fallidos = 0
+            self.pools_limpiados = 0
+
+    def _sumar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._sumar('pools_limpiados')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._sumar('conexiones_creadas')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._sumar('conexiones_cerradas')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._sumar('checkouts_fallidos')
+
+    def connection_checked_out(self, event):
+        self._sumar('checkouts')
+
+    def connection_checked_in(self, event):
+        self._sumar('checkins')
+
+    def como_dict(self):
+        with self._lock:
+            creadas = self.conexiones_creadas
+            return {
+                'conexiones_creadas': creadas,
+                'conexiones_cerradas': self.conexiones_cerradas,
+                'conexiones_abiertas': creadas - self.conexiones_cerradas,
+                'conexiones_en_uso': self.checkouts - self.checkins,
+                'checkouts': self.checkouts,
+                'checkouts_fallidos': self.checkouts_fallidos,
+                'pools_limpiados': self.pools_limpiados,
+                # Operaciones atendidas por cada conexión abierta
+                'reutilizacion': round(self.checkouts / creadas, 2) if creadas else 0,
+            }
+
+
+class CircuitoMongo:
+    """Circuit breaker con estados cerrado, abierto y semiabierto"""
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, umbral_fallos=3, espera_segundos=30):
+        self.umbral_fallos = umbral_fallos
+        self.espera_segundos = espera_segundos
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos_consecutivos = 0
+            self.abierto_desde = None
+            self.ultimo_error = ''
+            self._sondeo_en_curso = False
+
+    def permitir(self):
+        """Indica si se puede intentar una operación contra MongoDB"""
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO:
+                if time.monotonic() - self.abierto_desde < self.espera_segundos:
+                    return False
+                self.estado = self.SEMIABIERTO
+                self._sondeo_en_curso = False
+            # Semiabierto: una sola petición de prueba a la vez
+            if self._sondeo_en_curso:
+                return False
+            self._sondeo_en_curso = True
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos_consecutivos = 0
+            self.abierto_desde = None
+            self._sondeo_en_curso = False
+
+    def registrar_fallo(self, error):
+        with self._lock:
+            self.fallos_consecutivos += 1
+            self.ultimo_error = str(error)[:200]
+            self._sondeo_en_curso = False
+            if self.estado == self.SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+                self.estado = self.ABIERTO
+                self.abierto_desde = time.monotonic()
+
+    @property
+    def disponible(self):
+        return self.estado == self.CERRADO
+
+    def como_dict(self):
+        with self._lock:
+            restante = 0
+            if self.estado == self.ABIERTO:
+                restante = max(0, self.espera_segundos - (time.monotonic() - self.abierto_desde))
+            return {
+                'estado': self.estado,
+                'fallos_consecutivos': self.fallos_consecutivos,
+                'ultimo_error': self.ultimo_error,
+                'segundos_para_sondeo': round(restante, 1),
+            }
+
+
+_lock = threading.Lock()
+_cliente = None
+_pid_cliente = None
+_clientes_creados = 0
+_estadisticas = EstadisticasPool()
+_circuito = CircuitoMongo(
+    umbral_fallos=getattr(settings, 'MONGODB_CIRCUITO_UMBRAL_FALLOS', 3),
+    espera_segundos=getattr(settings, 'MONGODB_CIRCUITO_ESPERA_SEGUNDOS', 30),
+)
+
+
+def _crear_cliente():
+    uri = getattr(settings, 'MONGODB_URI', '')
+    if not uri:
+        raise MongoNoDisponible('MONGODB_URI no está configurado')
+
+    # connect=False evita abrir sockets o hilos de monitoreo antes del fork
+    # de gunicorn: la primera operación del worker es la que conecta.
+    return MongoClient(
+        uri,
+        connect=False,
+        maxPoolSize=getattr(settings, 'MONGODB_MAX_POOL_SIZE', 20),
+        minPoolSize=getattr(settings, 'MONGODB_MIN_POOL_SIZE', 0),
+        maxIdleTimeMS=getattr(settings, 'MONGODB_MAX_IDLE_TIME_MS', 300000),
+        serverSelectionTimeoutMS=getattr(settings, 'MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        connectTimeoutMS=getattr(settings, 'MONGODB_CONNECT_TIMEOUT_MS', 5000),
+        socketTimeoutMS=getattr(settings, 'MONGODB_SOCKET_TIMEOUT_MS', 10000),
+        event_listeners=[_estadisticas],
+        # Las fechas vuelven como datetime aware en UTC, sin conversión por fila
+        tz_aware=True,
+        tzinfo=dt_timezone.utc,
+    )
+
+
+def get_cliente():
+    """Retorna el MongoClient del proceso actual, creándolo si hace falta"""
+    global _cliente, _pid_cliente, _clientes_creados
+
+    pid = os.getpid()
+    if _cliente is not None and _pid_cliente == pid:
+        return _cliente
+
+    with _lock:
+        if _cliente is None or _pid_cliente != pid:
+            # Un cliente heredado del proceso padre no es seguro tras un fork:
+            # se descarta sin cerrarlo (sus sockets pertenecen al padre).
+            if _pid_cliente != pid:
+                _estadisticas.reiniciar()
+                _circuito.reiniciar()
+                _clientes_creados = 0
+            _cliente = _crear_cliente()
+            _pid_cliente = pid
+            _clientes_creados += 1
+    return _cliente
+
+
+def get_base_datos():
+    """Retorna la base de datos de Atlas usada por el sistema"""
+    return get_cliente()[getattr(settings, 'MONGODB_DB_NAME', 'sistema_triage')]
+
+
+def get_coleccion():
+    """Retorna la colección de calificaciones usando el cliente compartido"""
+    return get_base_datos()[NOMBRE_COLECCION]
+
+
+@contextmanager
+def circuito_mongo():
+    """
+    Envuelve una operación contra MongoDB con el circuit breaker.
+
+    Lanza MongoNoDisponible sin tocar la red si el circuito está abierto;
+    los errores de conexión se registran como fallo y se propagan tal cual.
+    Solo los errores de conexión cuentan como fallo; un error de la propia
+    operación (clave duplicada, validación...) significa que Atlas respondió.
+    """
+    if not getattr(settings, 'MONGODB_URI', ''):
+        raise MongoNoDisponible('MONGODB_URI no está configurado')
+    if not _circuito.permitir():
+        raise MongoNoDisponible('MongoDB Atlas no responde (circuito abierto)')
+    try:
+        yield
+    except ConnectionFailure as e:
+        _circuito.registrar_fallo(e)
+        raise
+    except BaseException:
+        _circuito.registrar_exito()
+        raise
+    else:
+        _circuito.registrar_exito()
+
+
+def _claves(indice):
+    return [(campo, int(sentido)) for campo, sentido in indice]
+
+
+def verificar_indices():
+    """Retorna los nombres de los índices de INDICES que faltan en Atlas"""
+    with circuito_mongo():
+        existentes = [
+            _claves(info['key']) for info in get_coleccion().index_information().values()
+        ]
+    return [
+        indice.document['name'] for indice in INDICES
+        if _claves(indice.document['key'].items()) not in existentes
+    ]
+
+
+def asegurar_indices():
+    """Crea los índices que falten (create_indexes es idempotente)"""
+    faltantes = verificar_indices()
+    if faltantes:
+        with circuito_mongo():
+            get_coleccion().create_indexes(
+                [indice for indice in INDICES if indice.document['name'] in faltantes]
+            )
+    return faltantes
+
+
+def revisar_indices_al_iniciar():
+    """Advierte en el log si faltan índices; pensado para correr en un hilo"""
+    try:
+        faltantes = verificar_indices()
+    except Exception:
+        logger.exception('No se pudieron verificar los índices de MongoDB')
+        return
+    if faltantes:
+        logger.warning(
+            'Faltan índices en MongoDB Atlas: %s (ejecute: python manage.py indices_mongo)',
+            ', '.join(faltantes)
+        )
+
+
+def estado_mongo():
+    """Estado del circuit breaker del proceso actual (sin tocar la red)"""
+    datos = _circuito.como_dict()
+    datos['configurado'] = bool(getattr(settings, 'MONGODB_URI', ''))
+    datos['disponible'] = datos['configurado'] and _circuito.disponible
+    return datos
+
+
+def cerrar_cliente():
+    """Cierra el cliente del proceso actual (apagado del worker y tests)"""
+    global _cliente, _pid_cliente
+
+    with _lock:
+        if _cliente is not None and _pid_cliente == os.getpid():
+            _cliente.close()
+        _cliente = None
+        _pid_cliente = None
+
+
+def estadisticas_pool():
+    """Estadísticas del pool de conexiones del proceso actual"""
+    datos = _estadisticas.como_dict()
+    datos.update({
+        'pid': os.getpid(),
+        'cliente_activo': _cliente is not None and _pid_cliente == os.getpid(),
+        'clientes_creados': _clientes_creados,
+        'max_pool_size': getattr(settings, 'MONGODB_MAX_POOL_SIZE', 20),
+        'circuito': _circuito.como_dict(),
+    })
+    return datos
+
+
+def documento_mongo(nombre, comentario, calificacion, fecha=None):
+    """Construye el documento de calificación que se guarda en MongoDB Atlas"""
+    return {
+        'nombre': nombre,
+        'comentario': comentario,
+        'calificacion': calificacion,
+        # Una sola fecha en UTC; la hora de Colombia se calcula al mostrarla
+        'fecha_creacion': a_utc(fecha) if fecha else ahora_utc(),
+    }
@@ -1,46 +1,263 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from itertools import islice
+
 from django.conf import settings
-from .models import CalificacionSQLite, CalificacionMongoDB
+from django.db import transaction
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .models import CalificacionSQLite
+from .mongo import (
+    get_coleccion, documento_mongo, circuito_mongo, PROYECCION_CALIFICACION, TAMANO_BATCH,
+    MongoNoDisponible,
+)
+from .fechas import a_utc, zona
+from .spool import encolar
+from .estadisticas import registrar_cambios
+
+
+MAX_ERRORES_REPORTADOS = 50
+
+
+def _fecha_origen(valor):
+    """
+    fecha_creacion opcional del archivo (ISO 8601) en UTC, o None si no viene.
+    Las fechas sin zona horaria se toman como hora de Colombia.
+    """
+    if valor in (None, ''):
+        return None
+    if not isinstance(valor, datetime):
+        try:
+            valor = datetime.fromisoformat(str(valor).strip())
+        except ValueError:
+            raise ValueError(f'fecha_creacion inválida: {valor}')
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=zona())
+    return a_utc(valor)
+
+
+def validar_calificacion(datos):
+    """Normaliza un dict de calificación; lanza ValueError si no es válido"""
+    nombre = str(datos.get('nombre') or '').strip()
+    comentario = str(datos.get('comentario') or '').strip()
+    try:
+        calificacion = int(datos.get('calificacion'))
+    except (TypeError, ValueError):
+        raise ValueError('La calificación debe ser un número entre 1 y 5')
+
+    if not nombre or len(nombre) > 100:
+        raise ValueError('El nombre es obligatorio y debe tener máximo 100 caracteres')
+    if calificacion < 1 or calificacion > 5:
+        raise ValueError('La calificación debe estar entre 1 y 5')
+    validada = {'nombre': nombre, 'comentario': comentario, 'calificacion': calificacion}
+    fecha = _fecha_origen(datos.get('fecha_creacion'))
+    if fecha is not None:
+        # Se conserva la fecha original del archivo; sin ella se usa la de la carga
+        validada['fecha_creacion'] = fecha
+    return validada
+
+
+class ResultadoLote:
+    """Resumen de una carga masiva de calificaciones"""
+
+    def __init__(self):
+        self.guardadas = 0
+        self.rechazadas = 0
+        self.errores = []
+        # Motivo por el que se detuvo la carga (p. ej. Atlas dejó de responder)
+        self.interrumpido = None
+        self.inicio = time.monotonic()
+
+    def rechazar(self, posicion, motivo):
+        self.rechazadas += 1
+        # Solo se conservan los primeros errores para no crecer con el archivo
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append((posicion, motivo))
+
+    @property
+    def procesadas(self):
+        return self.guardadas + self.rechazadas
+
+    @property
+    def segundos(self):
+        return time.monotonic() - self.inicio
+
+    @property
+    def por_segundo(self):
+        segundos = self.segundos
+        return self.guardadas / segundos if segundos else 0
+
+
+class RepositorioCalificaciones(ABC):
+    """Interfaz común para guardar calificaciones sin importar la base"""
+    origen = None
+    tamano_lote = 500
+
+    @abstractmethod
+    def guardar(self, nombre, comentario, calificacion):
+        """Guarda una calificación"""
+
+    @abstractmethod
+    def obtener(self):
+        """Calificaciones de esta base, de la más reciente a la más antigua"""
+
+    @abstractmethod
+    def _insertar_lote(self, validas, resultado):
+        """Inserta [(posicion, datos)] ya validados y actualiza el resultado"""
+
+    def guardar_lote(self, calificaciones, tamano_lote=None, progreso=None):
+        """
+        Guarda un iterable de dicts por bloques, sin cargarlo completo en memoria.
+        progreso(resultado) se llama después de cada bloque.
+        """
+        tamano_lote = tamano_lote or self.tamano_lote
+        resultado = ResultadoLote()
+        iterador = enumerate(calificaciones, start=1)
+
+        while True:
+            bloque = list(islice(iterador, tamano_lote))
+            if not bloque:
+                break
+
+            validas = []
+            for posicion, datos in bloque:
+                try:
+                    validas.append((posicion, validar_calificacion(datos)))
+                except ValueError as e:
+                    resultado.rechazar(posicion, str(e))
+
+            if validas:
+                self._insertar_lote(validas, resultado)
+            if progreso:
+                progreso(resultado)
+            if resultado.interrumpido:
+                # Los bloques anteriores ya quedaron guardados y se reportan
+                break
+
+        return resultado
+
+
+def _contar_por_estrella(calificaciones):
+    cambios = {}
+    for calificacion in calificaciones:
+        cambios[calificacion] = cambios.get(calificacion, 0) + 1
+    return cambios
+
+
+class RepositorioSQLite(RepositorioCalificaciones):
+    origen = 'sqlite'
+    tamano_lote = 500
+
+    def guardar(self, nombre, comentario, calificacion):
+        calificacion_obj = CalificacionSQLite(
+            nombre=nombre,
+            comentario=comentario,
+            calificacion=calificacion
+        )
+        calificacion_obj.save()
+        return calificacion_obj
+
+    def obtener(self):
+        return CalificacionSQLite.objects.all().order_by('-fecha_creacion')
+
+    def _insertar_lote(self, validas, resultado):
+        objetos = [CalificacionSQLite(**datos) for _, datos in validas]
+        # bulk_create no envía señales: el resumen se actualiza en la misma transacción
+        with transaction.atomic():
+            CalificacionSQLite.objects.bulk_create(objetos)
+            registrar_cambios(self.origen, _contar_por_estrella(o.calificacion for o in objetos))
+        resultado.guardadas += len(objetos)
+
+
+class RepositorioMongo(RepositorioCalificaciones):
+    origen = 'mongodb'
+    tamano_lote = 1000
+
+    def __init__(self, ordenado=False):
+        # ordenado=True se detiene en el primer error; False inserta todo lo posible
+        self.ordenado = ordenado
+
+    def guardar(self, nombre, comentario, calificacion):
+        # Se acepta en el spool local; el flusher la envía a Atlas por lotes
+        return encolar(nombre, comentario, calificacion)
+
+    def obtener(self):
+        return get_coleccion().find({}, PROYECCION_CALIFICACION).sort(
+            [('fecha_creacion', -1), ('_id', -1)]
+        ).batch_size(TAMANO_BATCH)
+
+    def _insertar_lote(self, validas, resultado):
+        documentos = [
+            documento_mongo(
+                datos['nombre'], datos['comentario'], datos['calificacion'], datos.get('fecha_creacion')
+            )
+            for _, datos in validas
+        ]
+        fallidos = {}
+        try:
+            with circuito_mongo():
+                get_coleccion().insert_many(documentos, ordered=self.ordenado)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                fallidos[error['index']] = error.get('errmsg', 'Error al insertar')
+            if self.ordenado and fallidos:
+                # Con inserción ordenada no se intentó nada después del primer error
+                for indice in range(min(fallidos) + 1, len(documentos)):
+                    fallidos.setdefault(indice, 'No insertada: el lote ordenado se detuvo')
+        except (PyMongoError, MongoNoDisponible) as e:
+            # Conexión perdida a mitad de la carga: no se sabe qué entró de este bloque
+            resultado.interrumpido = f'MongoDB Atlas no disponible: {e}'
+            for posicion, _ in validas:
+                resultado.rechazar(posicion, 'Sin confirmar: la carga se interrumpió en este bloque')
+            return
+
+        guardadas = []
+        for indice, (posicion, datos) in enumerate(validas):
+            if indice in fallidos:
+                resultado.rechazar(posicion, fallidos[indice])
+            else:
+                guardadas.append(datos['calificacion'])
+        resultado.guardadas += len(guardadas)
+        registrar_cambios(self.origen, _contar_por_estrella(guardadas))
+
+
+def get_repositorio(tipo_bd=None, **opciones):
+    """Retorna el repositorio de la base indicada (o la configurada por defecto)"""
+    if tipo_bd is None:
+        tipo_bd = settings.TIPO_BASE_DATOS
+
+    if tipo_bd == 'sqlite':
+        return RepositorioSQLite()
+    elif tipo_bd == 'mongodb':
+        return RepositorioMongo(**opciones)
+    raise ValueError(f'Base de datos no soportada: {tipo_bd}')
+
 
 class CalificacionService:
     """Servicio para manejar calificaciones en ambas bases de datos"""
-    
+
     @staticmethod
     def guardar_calificacion(nombre, comentario, calificacion, tipo_bd=None):
         """Guarda en la base de datos especificada"""
+        return get_repositorio(tipo_bd).guardar(nombre, comentario, calificacion)
+
+    @staticmethod
+    def guardar_lote(calificaciones, tipo_bd=None, tamano_lote=None, ordenado=False, progreso=None):
+        """Guarda muchas calificaciones con bulk_create / insert_many por bloques"""
         if tipo_bd is None:
             tipo_bd = settings.TIPO_BASE_DATOS
-        
-        if tipo_bd == 'sqlite':
-            # Guardar en SQLite
-            calificacion_obj = CalificacionSQLite(
-                nombre=nombre,
-                comentario=comentario,
-                calificacion=calificacion
-            )
-            calificacion_obj.save()
-            return calificacion_obj
-            
-        elif tipo_bd == 'mongodb':
-            # Guardar en MongoDB
-            calificacion_obj = CalificacionMongoDB(
-                nombre=nombre,
-                comentario=comentario, 
-                calificacion=calificacion
-            )
-            calificacion_obj.save()
-            return calificacion_obj
-    
+
+        opciones = {'ordenado': ordenado} if tipo_bd == 'mongodb' else {}
+        return get_repositorio(tipo_bd, **opciones).guardar_lote(
+            calificaciones, tamano_lote=tamano_lote, progreso=progreso
+        )
+
     @staticmethod
     def obtener_calificaciones(tipo_bd=None):
         """Obtiene calificaciones de la base de datos especificada"""
-        if tipo_bd is None:
-            tipo_bd = settings.TIPO_BASE_DATOS
-        
-        if tipo_bd == 'sqlite':
-            return CalificacionSQLite.objects.all().order_by('-fecha_creacion')
-        elif tipo_bd == 'mongodb':
-            return CalificacionMongoDB.objects.using('mongodb').all().order_by('-fecha_creacion')
-    
+        return get_repositorio(tipo_bd).obtener()
+
     @staticmethod
     def cambiar_base_datos(nueva_bd):
         """Cambia la base de datos global"""
@@ -48,4 +265,4 @@ class CalificacionService:
             from django.conf import settings
             settings.TIPO_BASE_DATOS = nueva_bd
             return True
-        return False
\ No newline at end of file
+        return False
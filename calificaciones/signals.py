@@ -0,0 +1,35 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CalificacionSQLite
+from .estadisticas import registrar_cambios
+from .detalle import invalidar_detalle
+
+
+@receiver(pre_save, sender=CalificacionSQLite)
+def recordar_calificacion_anterior(sender, instance, **kwargs):
+    """Guarda la calificación almacenada antes de una edición"""
+    if instance._state.adding or instance.pk is None:
+        instance._calificacion_anterior = None
+    else:
+        instance._calificacion_anterior = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('calificacion', flat=True).first()
+
+
+@receiver(post_save, sender=CalificacionSQLite)
+def actualizar_resumen_al_guardar(sender, instance, **kwargs):
+    """Suma la calificación nueva y descuenta la anterior en el resumen"""
+    cambios = {instance.calificacion: 1}
+    anterior = getattr(instance, '_calificacion_anterior', None)
+    if anterior is not None:
+        cambios[anterior] = cambios.get(anterior, 0) - 1
+    registrar_cambios('sqlite', cambios)
+    invalidar_detalle('sqlite', instance.pk)
+
+
+@receiver(post_delete, sender=CalificacionSQLite)
+def actualizar_resumen_al_eliminar(sender, instance, **kwargs):
+    """Descuenta la calificación eliminada (también en borrados desde el admin)"""
+    registrar_cambios('sqlite', {instance.calificacion: -1})
+    invalidar_detalle('sqlite', instance.pk)
@@ -0,0 +1,178 @@
+"""
+Spool local (write-behind) para las calificaciones destinadas a MongoDB Atlas.
+
+crear_calificacion guarda la calificación en la tabla CalificacionPendienteMongo
+de SQLite y responde de inmediato. Un hilo por worker (o el comando
+vaciar_spool_mongo) envía los pendientes a Atlas con insert_many por lotes,
+reintentando con espera exponencial cuando Atlas falla.
+
+El _id de MongoDB se asigna al encolar, así que reenviar un lote ya insertado
+solo produce errores de clave duplicada, que se tratan como éxito.
+"""
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from bson import ObjectId
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from pymongo.errors import BulkWriteError
+
+from .models import CalificacionPendienteMongo
+from .mongo import get_coleccion, documento_mongo, circuito_mongo, MongoNoDisponible
+from .estadisticas import registrar_cambios
+
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 100
+ESPERA_BASE_SEGUNDOS = 2
+ESPERA_MAXIMA_SEGUNDOS = 300
+INTERVALO_FLUSHER_SEGUNDOS = 5
+CODIGO_CLAVE_DUPLICADA = 11000
+
+
+def encolar(nombre, comentario, calificacion):
+    """
+    Acepta una calificación para MongoDB sin esperar a Atlas.
+    Lanza MongoNoDisponible si no hay MONGODB_URI: el flusher nunca la enviaría.
+    """
+    if not getattr(settings, 'MONGODB_URI', ''):
+        raise MongoNoDisponible('MONGODB_URI no está configurado')
+    ahora = timezone.now()
+    pendiente = CalificacionPendienteMongo(
+        mongo_id=str(ObjectId()),
+        nombre=nombre,
+        comentario=comentario,
+        calificacion=calificacion,
+        # MongoDB guarda milisegundos: la misma fecha antes y después del envío
+        fecha_creacion=ahora.replace(microsecond=ahora.microsecond // 1000 * 1000),
+    )
+    with transaction.atomic():
+        pendiente.save()
+        # Las estadísticas de MongoDB ya incluyen la calificación pendiente
+        registrar_cambios('mongodb', {calificacion: 1})
+        transaction.on_commit(despertar_flusher)
+    return pendiente
+
+
+def documento_pendiente(pendiente):
+    """Documento de MongoDB correspondiente a una calificación del spool"""
+    documento = documento_mongo(
+        pendiente.nombre, pendiente.comentario, pendiente.calificacion,
+        fecha=pendiente.fecha_creacion
+    )
+    documento['_id'] = ObjectId(pendiente.mongo_id)
+    return documento
+
+
+def _espera(intentos):
+    segundos = min(ESPERA_BASE_SEGUNDOS * 2 ** (intentos - 1), ESPERA_MAXIMA_SEGUNDOS)
+    return timedelta(seconds=segundos)
+
+
+def vaciar_spool(tamano_lote=TAMANO_LOTE):
+    """
+    Envía a Atlas un lote de calificaciones pendientes.
+    Retorna (enviadas, fallidas).
+    """
+    ahora = timezone.now()
+    pendientes = list(
+        CalificacionPendienteMongo.objects.filter(
+            proximo_intento__lte=ahora
+        ).order_by('id')[:tamano_lote]
+    )
+    if not pendientes:
+        return 0, 0
+
+    fallidos = {}
+    try:
+        with circuito_mongo():
+            get_coleccion().insert_many(
+                [documento_pendiente(pendiente) for pendiente in pendientes],
+                ordered=False
+            )
+    except MongoNoDisponible:
+        # Circuito abierto o sin configurar: no se intentó, no cuenta como reintento
+        return 0, len(pendientes)
+    except BulkWriteError as e:
+        for error in e.details.get('writeErrors', []):
+            if error.get('code') != CODIGO_CLAVE_DUPLICADA:
+                fallidos[error['index']] = error.get('errmsg', '')
+    except Exception as e:
+        fallidos = {indice: str(e) for indice in range(len(pendientes))}
+
+    enviados = [p.id for indice, p in enumerate(pendientes) if indice not in fallidos]
+    CalificacionPendienteMongo.objects.filter(id__in=enviados).delete()
+
+    reintentos = []
+    for indice, error in fallidos.items():
+        pendiente = pendientes[indice]
+        pendiente.intentos += 1
+        pendiente.proximo_intento = ahora + _espera(pendiente.intentos)
+        pendiente.ultimo_error = error[:500]
+        reintentos.append(pendiente)
+    CalificacionPendienteMongo.objects.bulk_update(
+        reintentos, ['intentos', 'proximo_intento', 'ultimo_error']
+    )
+
+    return len(enviados), len(fallidos)
+
+
+def vaciar_todo(tamano_lote=TAMANO_LOTE):
+    """Envía lotes mientras haya pendientes listos y Atlas los acepte"""
+    total_enviadas = total_fallidas = 0
+    while True:
+        enviadas, fallidas = vaciar_spool(tamano_lote)
+        total_enviadas += enviadas
+        total_fallidas += fallidas
+        if fallidas or enviadas < tamano_lote:
+            return total_enviadas, total_fallidas
+
+
+class _Flusher:
+    """Hilo en segundo plano, uno por proceso, que vacía el spool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+    def despertar(self):
+        if not getattr(settings, 'MONGODB_SPOOL_HILO', True):
+            return
+
+        pid = os.getpid()
+        with self._lock:
+            # Los hilos no sobreviven al fork de gunicorn: cada worker crea el suyo
+            if self._hilo is None or self._pid != pid or not self._hilo.is_alive():
+                self._evento = threading.Event()
+                self._hilo = threading.Thread(
+                    target=self._ejecutar, args=(self._evento,),
+                    name='flusher-spool-mongo', daemon=True
+                )
+                self._pid = pid
+                self._hilo.start()
+        self._evento.set()
+
+    def _ejecutar(self, evento):
+        while True:
+            evento.wait(timeout=INTERVALO_FLUSHER_SEGUNDOS)
+            evento.clear()
+            try:
+                vaciar_todo()
+            except Exception:
+                logger.exception('Error al vaciar el spool de MongoDB')
+            finally:
+                close_old_connections()
+
+
+_flusher = _Flusher()
+
+
+def despertar_flusher():
+    """Pide al hilo del proceso actual que envíe los pendientes"""
+    _flusher.despertar()
@@ -0,0 +1,12 @@
+from django import template
+
+from calificaciones.fechas import a_colombia
+
+
+register = template.Library()
+
+
+@register.filter(expects_localtime=False)
+def hora_colombia(fecha):
+    """Uso: {{ calificacion.fecha_creacion|hora_colombia|date:"d/m/Y H:i" }}"""
+    return a_colombia(fecha)
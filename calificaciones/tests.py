@@ -0,0 +1,740 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import mongo, estadisticas
+from .listado import (
+    paginar_calificaciones, codificar_cursor, decodificar_cursor, _fila,
+    ORIGEN_MONGODB, ORIGEN_SQLITE,
+)
+from .models import CalificacionSQLite, CalificacionPendienteMongo, ResumenCalificaciones
+from .spool import encolar, vaciar_spool
+from .services import CalificacionService
+from .fechas import a_colombia
+from .templatetags.fechas_colombia import hora_colombia
+from .detalle import CacheDetalle, cache_detalle, origen_de_id, obtener_detalle
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+from .admin import CalificacionSQLiteAdmin
+from sistema_triage.admin import admin_site
+from .estadisticas import (
+    EstadisticasCalificaciones, estadisticas_sqlite, estadisticas_mongodb,
+    resumenes, actualizar_calificacion_en_lote,
+)
+
+
+@override_settings(MONGODB_URI='mongodb://localhost:27017/')
+class ClienteMongoTestCase(TestCase):
+    """Tests para el cliente MongoDB compartido por proceso"""
+    
+    def tearDown(self):
+        mongo.cerrar_cliente()
+    
+    def test_cliente_se_reutiliza(self):
+        """Test: Todas las llamadas del mismo proceso usan el mismo cliente"""
+        self.assertIs(mongo.get_cliente(), mongo.get_cliente())
+        self.assertEqual(mongo.estadisticas_pool()['clientes_creados'], 1)
+    
+    def test_cliente_nuevo_tras_fork(self):
+        """Test: Un proceso hijo no reutiliza el cliente del padre"""
+        cliente_padre = mongo.get_cliente()
+        with mock.patch('calificaciones.mongo.os.getpid', return_value=-1):
+            cliente_hijo = mongo.get_cliente()
+        self.assertIsNot(cliente_padre, cliente_hijo)
+    
+    @override_settings(MONGODB_URI='')
+    def test_sin_uri_no_disponible(self):
+        """Test: Sin MONGODB_URI se informa de inmediato"""
+        with self.assertRaises(mongo.MongoNoDisponible):
+            mongo.get_cliente()
+    
+    def test_estado_pool_requiere_staff(self):
+        """Test: Las estadísticas del pool solo son visibles para el staff"""
+        client = Client()
+        url = reverse('calificaciones:estado_pool_mongo')
+        self.assertEqual(client.get(url).status_code, 302)
+        
+        User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        client.login(username='staff', password='testpass123')
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('conexiones_creadas', response.json())
+
+
+@override_settings(MONGODB_URI='')
+class ListadoCombinadoTestCase(TestCase):
+    """Tests para el listado combinado paginado por cursor"""
+    
+    def setUp(self):
+        """Crear 25 calificaciones con fechas distintas"""
+        ahora = timezone.now()
+        for i in range(25):
+            cal = CalificacionSQLite.objects.create(
+                nombre=f"Usuario {i}", comentario="", calificacion=(i % 5) + 1
+            )
+            CalificacionSQLite.objects.filter(id=cal.id).update(
+                fecha_creacion=ahora - timedelta(minutes=i)
+            )
+    
+    def test_cursor_ida_y_vuelta(self):
+        """Test: El cursor opaco conserva fecha, origen e id"""
+        fecha = timezone.now()
+        token = codificar_cursor(fecha, ORIGEN_SQLITE, 7)
+        self.assertEqual(decodificar_cursor(token), (fecha, ORIGEN_SQLITE, 7))
+        with self.assertRaises(ValueError):
+            decodificar_cursor('no-es-un-cursor')
+    
+    def test_recorrer_paginas(self):
+        """Test: Las páginas cubren todas las filas sin repetir y se puede retroceder"""
+        vistos = []
+        pagina = paginar_calificaciones(por_pagina=10)
+        self.assertFalse(pagina.tiene_anterior)
+        primera = [c['id'] for c in pagina.calificaciones]
+        vistos.extend(primera)
+        while pagina.tiene_siguiente:
+            pagina = paginar_calificaciones(despues=pagina.cursor_siguiente, por_pagina=10)
+            vistos.extend(c['id'] for c in pagina.calificaciones)
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(len(set(vistos)), 25)
+        
+        segunda = paginar_calificaciones(
+            despues=paginar_calificaciones(por_pagina=10).cursor_siguiente, por_pagina=10
+        )
+        anterior = paginar_calificaciones(antes=segunda.cursor_anterior, por_pagina=10)
+        self.assertEqual([c['id'] for c in anterior.calificaciones], primera)
+    
+    def test_pagina_lee_filas_acotadas(self):
+        """Test: Una página es una consulta limitada por fuente local (tabla y spool)"""
+        with self.assertNumQueries(2):
+            pagina = paginar_calificaciones(por_pagina=5)
+        self.assertEqual(len(pagina.calificaciones), 5)
+        self.assertFalse(pagina.mongodb_disponible)
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_mezcla_con_mongodb(self):
+        """Test: Las filas de MongoDB se intercalan por fecha con las de SQLite"""
+        mas_reciente = CalificacionSQLite.objects.order_by('-fecha_creacion').first()
+        fecha_mongo = mas_reciente.fecha_creacion - timedelta(seconds=30)
+        filas_mongo = [_fila(fecha_mongo, ORIGEN_MONGODB, 'a' * 24, 'Mongo', '', 5)]
+        with mock.patch('calificaciones.listado._leer_mongodb', return_value=iter(filas_mongo)):
+            pagina = paginar_calificaciones(por_pagina=3)
+        self.assertEqual(
+            [c['origen'] for c in pagina.calificaciones],
+            ['SQLite', 'MongoDB Atlas', 'SQLite']
+        )
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_documento_con_fecha_en_texto(self):
+        """Test: Un documento antiguo con la fecha como texto no deja a MongoDB como caído"""
+        mongo._circuito.reiniciar()
+        fecha = timezone.now() - timedelta(seconds=30)
+        coleccion = mock.Mock()
+        coleccion.find.return_value.sort.return_value.limit.return_value.batch_size.return_value = iter([
+            {'_id': ObjectId('a' * 24), 'nombre': 'Antiguo', 'calificacion': 3,
+             'fecha_creacion': fecha.isoformat()},
+            {'_id': ObjectId('b' * 24), 'nombre': 'Mongo', 'calificacion': 5, 'fecha_creacion': fecha},
+        ])
+        with mock.patch('calificaciones.listado.get_coleccion', return_value=coleccion):
+            pagina = paginar_calificaciones(por_pagina=3)
+        self.assertTrue(pagina.mongodb_disponible)
+        self.assertEqual(coleccion.find.call_args[0][0], {'fecha_creacion': {'$type': 'date'}})
+        nombres = [c['nombre'] for c in pagina.calificaciones]
+        self.assertIn('Mongo', nombres)
+        self.assertNotIn('Antiguo', nombres)
+    
+    def test_vista_lista_paginada(self):
+        """Test: La vista muestra una página y el total general"""
+        response = Client().get(reverse('calificaciones:lista_calificaciones'), {'por_pagina': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['calificaciones']), 10)
+        self.assertEqual(response.context['total_calificaciones'], 25)
+        self.assertContains(response, 'despues=')
+
+
+@override_settings(MONGODB_URI='')
+class EstadisticasTestCase(TestCase):
+    """Tests para las estadísticas agregadas de calificaciones"""
+    
+    def setUp(self):
+        for valor in [5, 5, 4, 3, 1]:
+            CalificacionSQLite.objects.create(nombre="Usuario", calificacion=valor)
+    
+    def test_estadisticas_sqlite_una_consulta(self):
+        """Test: Histograma, total y promedio salen de un solo aggregate"""
+        with self.assertNumQueries(1):
+            resumen = estadisticas_sqlite()
+            self.assertEqual(resumen.total, 5)
+            self.assertEqual(resumen.por_estrella, {1: 1, 2: 0, 3: 1, 4: 1, 5: 2})
+            self.assertAlmostEqual(resumen.promedio, 3.6)
+            self.assertEqual(resumen.malas, 1)
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_estadisticas_mongodb_pipeline(self):
+        """Test: El $group de MongoDB se convierte en el mismo histograma"""
+        coleccion = mock.Mock()
+        coleccion.aggregate.return_value = iter([
+            {'_id': 5, 'cantidad': 3}, {'_id': 2, 'cantidad': 1}
+        ])
+        with mock.patch('calificaciones.estadisticas.get_coleccion', return_value=coleccion):
+            resumen = estadisticas_mongodb()
+        self.assertEqual(resumen.total, 4)
+        self.assertEqual(resumen.suma, 17)
+        pipeline = coleccion.aggregate.call_args[0][0]
+        self.assertEqual(pipeline[-1]['$group']['_id'], '$calificacion')
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_reconstruir_mongodb_sin_contar_dos_veces(self):
+        """Test: Una pendiente ya insertada en Atlas pero aún en el spool se cuenta una vez"""
+        mongo._circuito.reiniciar()
+        enviada, pendiente = str(ObjectId()), str(ObjectId())
+        for mongo_id, valor in [(enviada, 5), (pendiente, 2)]:
+            CalificacionPendienteMongo.objects.create(
+                mongo_id=mongo_id, nombre="Usuario", comentario="", calificacion=valor,
+                fecha_creacion=timezone.now()
+            )
+        coleccion = mock.Mock()
+        coleccion.aggregate.return_value = iter([{'_id': 5, 'cantidad': 1}, {'_id': 4, 'cantidad': 1}])
+        coleccion.find.return_value = iter([{'_id': ObjectId(enviada)}])
+        with mock.patch('calificaciones.estadisticas.get_coleccion', return_value=coleccion):
+            resumen = estadisticas.reconstruir_resumen('mongodb')
+        self.assertEqual(resumen.por_estrella, {1: 0, 2: 1, 3: 0, 4: 1, 5: 1})
+        self.assertEqual(ResumenCalificaciones.objects.get(origen='mongodb').estrellas_5, 1)
+        ids = coleccion.find.call_args[0][0]['_id']['$in']
+        self.assertEqual(sorted(map(str, ids)), sorted([enviada, pendiente]))
+    
+    def test_combinar_estadisticas(self):
+        """Test: Las estadísticas de ambas bases se suman por estrella"""
+        combinado = EstadisticasCalificaciones({5: 2, 1: 1}) + EstadisticasCalificaciones({5: 1})
+        self.assertEqual(combinado.excelentes, 3)
+        self.assertEqual(combinado.total, 4)
+        self.assertEqual(EstadisticasCalificaciones().promedio, 0)
+    
+    def test_accion_estadisticas_una_consulta(self):
+        """Test: La acción del admin calcula sus estadísticas con un solo aggregate"""
+        modelo_admin = CalificacionSQLiteAdmin(CalificacionSQLite, admin_site)
+        seleccion = CalificacionSQLite.objects.filter(calificacion__gte=4)
+        with mock.patch.object(modelo_admin, 'message_user') as mensaje:
+            with self.assertNumQueries(1):
+                modelo_admin.estadisticas_seleccion(None, seleccion)
+        texto = mensaje.call_args[0][1]
+        self.assertIn('3 calificación(es)', texto)
+        self.assertIn('Promedio: 4.7/5', texto)
+    
+    def test_changelist_estadisticas_filtradas(self):
+        """Test: Con filtros el changelist muestra las estadísticas del filtro"""
+        User.objects.create_superuser(username='admin', password='testpass123', email='a@b.com')
+        cliente = Client()
+        cliente.login(username='admin', password='testpass123')
+        url = reverse('custom_admin:calificaciones_calificacionsqlite_changelist')
+        response = cliente.get(url, {'calificacion__exact': 5})
+        self.assertEqual(response.context['estadisticas']['total'], 2)
+        self.assertTrue(response.context['estadisticas_filtradas'])
+        response = cliente.get(url)
+        self.assertEqual(response.context['estadisticas']['total'], 5)
+        self.assertFalse(response.context['estadisticas_filtradas'])
+    
+    def test_vista_estadisticas(self):
+        """Test: La vista de estadísticas funciona sin MongoDB"""
+        response = Client().get(reverse('calificaciones:estadisticas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_general'], 5)
+        self.assertEqual(response.context['calificaciones_5_estrellas'], 2)
+
+
+
+class ExportarCalificacionesTestCase(TestCase):
+    """Tests para la exportación en streaming desde el admin"""
+    
+    def setUp(self):
+        for valor in [5, 5, 4, 1]:
+            CalificacionSQLite.objects.create(nombre="Usuario", comentario="Bien, gracias", calificacion=valor)
+        User.objects.create_superuser(username='admin', password='testpass123', email='a@b.com')
+        self.client.login(username='admin', password='testpass123')
+        self.url = reverse('custom_admin:calificaciones_calificacionsqlite_changelist')
+    
+    def _contenido(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+    
+    def test_accion_exporta_csv_en_streaming(self):
+        """Test: La acción devuelve un CSV en streaming con las filas seleccionadas"""
+        seleccion = CalificacionSQLite.objects.filter(calificacion=5).values_list('id', flat=True)
+        response = self.client.post(self.url, {
+            'action': 'exportar_calificaciones',
+            '_selected_action': [str(pk) for pk in seleccion],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('.csv', response['Content-Disposition'])
+        lineas = self._contenido(response).splitlines()
+        self.assertEqual(lineas[0], 'id,fecha_creacion,nombre,calificacion,comentario')
+        self.assertEqual(len(lineas), 3)
+        self.assertIn('"Bien, gracias"', lineas[1])
+    
+    def test_accion_exporta_jsonl(self):
+        """Test: La acción JSONL escribe un objeto por calificación"""
+        modelo_admin = CalificacionSQLiteAdmin(CalificacionSQLite, admin_site)
+        response = modelo_admin.exportar_calificaciones_jsonl(None, CalificacionSQLite.objects.all())
+        filas = [json.loads(linea) for linea in self._contenido(response).splitlines()]
+        self.assertEqual([fila['calificacion'] for fila in filas], [5, 5, 4, 1])
+        self.assertEqual(filas[0]['comentario'], 'Bien, gracias')
+    
+    def test_exportar_filtro_sin_lista_de_ids(self):
+        """Test: Exportar el filtro actual usa los filtros del listado, no un IN (...) de ids"""
+        response = self.client.get(self.url, {'calificacion__exact': 5})
+        self.assertContains(response, 'Exportar filtro (CSV)')
+        
+        url = reverse('custom_admin:calificaciones_calificacionsqlite_exportar', args=['csv'])
+        response = self.client.get(url, {'calificacion__exact': 5})
+        with CaptureQueriesContext(connection) as consultas:
+            lineas = self._contenido(response).splitlines()
+        self.assertEqual(len(lineas), 3)
+        sql = consultas.captured_queries[-1]['sql']
+        self.assertIn('"calificacion" = 5', sql)
+        self.assertNotIn(' IN (', sql)
+        
+        url = reverse('custom_admin:calificaciones_calificacionsqlite_exportar', args=['xml'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+    
+    def test_exportar_filtro_invalido_redirige(self):
+        """Test: Un filtro inválido redirige al listado con ?e=1 en lugar de un error 500"""
+        url = reverse('custom_admin:calificaciones_calificacionsqlite_exportar', args=['csv'])
+        response = self.client.get(url, {'calificacion__exact': 'no-es-numero'})
+        self.assertRedirects(response, f'{self.url}?e=1', fetch_redirect_response=False)
+
+
+@override_settings(MONGODB_URI='')
+class ResumenCalificacionesTestCase(TestCase):
+    """Tests para los contadores incrementales de calificaciones"""
+    
+    def setUp(self):
+        ResumenCalificaciones.objects.create(origen='mongodb')
+        self.calificaciones = [
+            CalificacionSQLite.objects.create(nombre="Usuario", calificacion=valor)
+            for valor in [5, 4, 3, 2, 1]
+        ]
+    
+    def assertResumenCoincide(self):
+        self.assertEqual(resumenes()['sqlite'].por_estrella, estadisticas_sqlite().por_estrella)
+    
+    def test_alta_edicion_y_baja(self):
+        """Test: El resumen sigue a creaciones, ediciones y eliminaciones"""
+        self.assertResumenCoincide()
+        
+        cal = self.calificaciones[0]
+        cal.calificacion = 1
+        cal.save()
+        self.assertResumenCoincide()
+        
+        self.calificaciones[1].delete()
+        CalificacionSQLite.objects.filter(calificacion=1).delete()
+        self.assertResumenCoincide()
+        self.assertEqual(resumenes()['sqlite'].total, 2)
+    
+    def test_actualizacion_en_lote(self):
+        """Test: La acción masiva a 5 estrellas mantiene los contadores"""
+        actualizadas = actualizar_calificacion_en_lote(
+            CalificacionSQLite.objects.filter(calificacion__lte=3), 5
+        )
+        self.assertEqual(actualizadas, 3)
+        self.assertResumenCoincide()
+        self.assertEqual(resumenes()['sqlite'].excelentes, 4)
+    
+    def test_lectura_en_una_consulta(self):
+        """Test: Leer las estadísticas no depende del tamaño de la tabla"""
+        with self.assertNumQueries(1):
+            resumen = resumenes()
+        self.assertEqual(resumen['sqlite'].suma, 15)
+    
+    def test_reconstruir_resumen(self):
+        """Test: El comando recupera contadores desincronizados"""
+        ResumenCalificaciones.objects.filter(origen='sqlite').update(estrellas_5=99, suma=0)
+        call_command('reconstruir_resumen_calificaciones', '--origen', 'sqlite', stdout=mock.Mock())
+        self.assertResumenCoincide()
+    
+    def test_reconstruccion_fallida_espera_antes_de_reintentar(self):
+        """Test: Sin Atlas, el resumen faltante no se reconstruye en cada carga"""
+        ResumenCalificaciones.objects.filter(origen='mongodb').delete()
+        estadisticas._fallos_reconstruccion.clear()
+        self.addCleanup(estadisticas._fallos_reconstruccion.clear)
+        with mock.patch('calificaciones.estadisticas.estadisticas_mongodb',
+                        side_effect=ServerSelectionTimeoutError('sin servidor')) as consulta:
+            self.assertEqual(resumenes()['mongodb'].total, 0)
+            self.assertEqual(resumenes()['mongodb'].total, 0)
+        self.assertEqual(consulta.call_count, 1)
+
+
+@override_settings(MONGODB_URI='mongodb://localhost:27017/', MONGODB_SPOOL_HILO=False)
+class SpoolMongoTestCase(TestCase):
+    """Tests para el spool local de calificaciones de MongoDB"""
+    
+    def setUp(self):
+        ResumenCalificaciones.objects.create(origen='mongodb')
+        self.pendiente = encolar("Usuario Mongo", "Muy bien", 4)
+    
+    @override_settings(MONGODB_URI='')
+    def test_sin_uri_no_se_encola(self):
+        """Test: Sin MONGODB_URI la calificación se rechaza en lugar de quedar pendiente para siempre"""
+        with self.assertRaises(mongo.MongoNoDisponible):
+            encolar("Usuario Mongo", "", 5)
+        self.assertEqual(CalificacionPendienteMongo.objects.count(), 1)
+        
+        response = Client().post(reverse('calificaciones:crear_calificacion'), {
+            'nombre': 'Usuario', 'comentario': '', 'calificacion': 5, 'tipo_base_datos': 'mongodb',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'MONGODB_URI no está configurado')
+        self.assertEqual(CalificacionPendienteMongo.objects.count(), 1)
+    
+    @override_settings(MONGODB_URI='')
+    def test_encolar_es_visible(self):
+        """Test: Una calificación encolada aparece en la lista y en las estadísticas"""
+        self.assertEqual(resumenes()['mongodb'].total, 1)
+        pagina = paginar_calificaciones()
+        self.assertEqual(pagina.calificaciones[0]['id'], self.pendiente.mongo_id)
+        self.assertEqual(pagina.calificaciones[0]['origen'], 'MongoDB Atlas')
+    
+    def test_vaciar_envia_y_elimina(self):
+        """Test: Un lote enviado con insert_many sale del spool"""
+        coleccion = mock.Mock()
+        with mock.patch('calificaciones.spool.get_coleccion', return_value=coleccion):
+            self.assertEqual(vaciar_spool(), (1, 0))
+        documentos = coleccion.insert_many.call_args[0][0]
+        self.assertEqual(str(documentos[0]['_id']), self.pendiente.mongo_id)
+        self.assertFalse(CalificacionPendienteMongo.objects.exists())
+    
+    def test_duplicado_cuenta_como_enviado(self):
+        """Test: Reenviar un documento ya insertado no lo deja en el spool"""
+        coleccion = mock.Mock()
+        coleccion.insert_many.side_effect = BulkWriteError(
+            {'writeErrors': [{'index': 0, 'code': 11000, 'errmsg': 'duplicate key'}]}
+        )
+        with mock.patch('calificaciones.spool.get_coleccion', return_value=coleccion):
+            self.assertEqual(vaciar_spool(), (1, 0))
+    
+    def test_fallo_programa_reintento(self):
+        """Test: Si Atlas falla el pendiente se reintenta más tarde"""
+        mongo._circuito.reiniciar()
+        coleccion = mock.Mock()
+        coleccion.insert_many.side_effect = ServerSelectionTimeoutError('sin servidor')
+        with mock.patch('calificaciones.spool.get_coleccion', return_value=coleccion):
+            self.assertEqual(vaciar_spool(), (0, 1))
+        self.pendiente.refresh_from_db()
+        self.assertEqual(self.pendiente.intentos, 1)
+        self.assertGreater(self.pendiente.proximo_intento, timezone.now())
+        # Aún no es momento de reintentar
+        self.assertEqual(vaciar_spool(), (0, 0))
+    
+    @override_settings(MONGODB_URI='')
+    def test_sin_mongodb_no_gasta_reintentos(self):
+        """Test: Con el circuito abierto o sin URI no se cuentan intentos"""
+        self.assertEqual(vaciar_spool(), (0, 1))
+        self.pendiente.refresh_from_db()
+        self.assertEqual(self.pendiente.intentos, 0)
+
+
+class CircuitoMongoTestCase(TestCase):
+    """Tests para el circuit breaker de MongoDB"""
+    
+    def setUp(self):
+        self.circuito = mongo.CircuitoMongo(umbral_fallos=2, espera_segundos=30)
+    
+    def test_abre_tras_fallos_consecutivos(self):
+        """Test: El circuito se abre al llegar al umbral y falla rápido"""
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.assertTrue(self.circuito.permitir())
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.assertEqual(self.circuito.estado, mongo.CircuitoMongo.ABIERTO)
+        self.assertFalse(self.circuito.permitir())
+    
+    def test_semiabierto_permite_un_sondeo(self):
+        """Test: Pasada la espera solo una petición prueba la conexión"""
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.circuito.abierto_desde -= 31
+        self.assertTrue(self.circuito.permitir())
+        self.assertEqual(self.circuito.estado, mongo.CircuitoMongo.SEMIABIERTO)
+        self.assertFalse(self.circuito.permitir())
+        
+        self.circuito.registrar_exito()
+        self.assertTrue(self.circuito.disponible)
+    
+    def test_sondeo_fallido_reabre(self):
+        """Test: Si el sondeo falla el circuito vuelve a abrirse"""
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.circuito.abierto_desde -= 31
+        self.circuito.permitir()
+        self.circuito.registrar_fallo(Exception('timeout'))
+        self.assertEqual(self.circuito.estado, mongo.CircuitoMongo.ABIERTO)
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_lista_degradada_con_circuito_abierto(self):
+        """Test: Con el circuito abierto la lista se muestra desde SQLite sin esperar"""
+        CalificacionSQLite.objects.create(nombre="Usuario", calificacion=5)
+        for _ in range(mongo._circuito.umbral_fallos):
+            mongo._circuito.registrar_fallo(Exception('timeout'))
+        try:
+            with mock.patch('calificaciones.listado._leer_mongodb') as leer_mongodb:
+                response = Client().get(reverse('calificaciones:lista_calificaciones'))
+            leer_mongodb.assert_not_called()
+            self.assertTrue(response.context['mongodb_degradado'])
+            self.assertEqual(len(response.context['calificaciones']), 1)
+        finally:
+            mongo._circuito.reiniciar()
+
+
+@override_settings(MONGODB_URI='', MONGODB_SPOOL_HILO=False)
+class GuardarLoteTestCase(TestCase):
+    """Tests para la carga masiva de calificaciones"""
+    
+    def setUp(self):
+        ResumenCalificaciones.objects.create(origen='sqlite')
+        ResumenCalificaciones.objects.create(origen='mongodb')
+        mongo._circuito.reiniciar()
+    
+    def test_lote_sqlite_por_bloques(self):
+        """Test: bulk_create por bloques y resumen actualizado sin señales"""
+        filas = ({'nombre': f'Usuario {i}', 'calificacion': i % 5 + 1} for i in range(7))
+        with self.assertNumQueries(12):
+            # 3 bloques: bulk_create y resumen dentro de su propia transacción
+            resultado = CalificacionService.guardar_lote(filas, tipo_bd='sqlite', tamano_lote=3)
+        self.assertEqual(resultado.guardadas, 7)
+        self.assertEqual(CalificacionSQLite.objects.count(), 7)
+        self.assertEqual(resumenes()['sqlite'].total, 7)
+    
+    def test_filas_invalidas_se_rechazan(self):
+        """Test: Las filas inválidas se reportan sin detener la carga"""
+        filas = [
+            {'nombre': 'Usuario', 'calificacion': '5'},
+            {'nombre': '', 'calificacion': 4},
+            {'nombre': 'Usuario', 'calificacion': 9},
+        ]
+        resultado = CalificacionService.guardar_lote(filas, tipo_bd='sqlite')
+        self.assertEqual(resultado.guardadas, 1)
+        self.assertEqual([posicion for posicion, _ in resultado.errores], [2, 3])
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_lote_mongodb_ordenado_se_detiene(self):
+        """Test: insert_many ordenado no cuenta lo que quedó después del error"""
+        coleccion = mock.Mock()
+        coleccion.insert_many.side_effect = BulkWriteError(
+            {'writeErrors': [{'index': 1, 'code': 121, 'errmsg': 'validation'}]}
+        )
+        filas = [{'nombre': f'Usuario {i}', 'calificacion': 5} for i in range(4)]
+        with mock.patch('calificaciones.services.get_coleccion', return_value=coleccion):
+            resultado = CalificacionService.guardar_lote(filas, tipo_bd='mongodb', ordenado=True)
+        self.assertTrue(coleccion.insert_many.call_args[1]['ordered'])
+        self.assertEqual(resultado.guardadas, 1)
+        self.assertEqual(resultado.rechazadas, 3)
+        self.assertEqual(resumenes()['mongodb'].total, 1)
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_lote_mongodb_conexion_perdida_reporta_parcial(self):
+        """Test: Si Atlas cae a mitad de la carga se reportan los bloques ya guardados"""
+        coleccion = mock.Mock()
+        coleccion.insert_many.side_effect = [None, ServerSelectionTimeoutError('sin servidor')]
+        filas = [{'nombre': f'Usuario {i}', 'calificacion': 4} for i in range(7)]
+        with mock.patch('calificaciones.services.get_coleccion', return_value=coleccion):
+            resultado = CalificacionService.guardar_lote(filas, tipo_bd='mongodb', tamano_lote=3)
+        self.assertEqual(coleccion.insert_many.call_count, 2)
+        self.assertEqual(resultado.guardadas, 3)
+        self.assertEqual(resultado.rechazadas, 3)
+        self.assertIn('sin servidor', resultado.interrumpido)
+        self.assertEqual(resumenes()['mongodb'].total, 3)
+    
+    def test_lote_conserva_fecha_del_archivo(self):
+        """Test: fecha_creacion del archivo se guarda (hora de Colombia si no trae zona)"""
+        filas = [
+            {'nombre': 'Ana', 'calificacion': 5, 'fecha_creacion': '2024-03-01T08:00:00'},
+            {'nombre': 'Luis', 'calificacion': 4},
+            {'nombre': 'Eva', 'calificacion': 3, 'fecha_creacion': 'ayer'},
+        ]
+        resultado = CalificacionService.guardar_lote(filas, tipo_bd='sqlite')
+        self.assertEqual(resultado.guardadas, 2)
+        self.assertEqual([posicion for posicion, _ in resultado.errores], [3])
+        ana = CalificacionSQLite.objects.get(nombre='Ana')
+        self.assertEqual(ana.fecha_creacion.isoformat(), '2024-03-01T13:00:00+00:00')
+        luis = CalificacionSQLite.objects.get(nombre='Luis')
+        self.assertLess(timezone.now() - luis.fecha_creacion, timedelta(minutes=1))
+    
+    def test_comando_importar_csv(self):
+        """Test: El comando importa un CSV y reporta el rendimiento"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write('nombre,comentario,calificacion\nAna,Muy bien,5\nLuis,,3\n')
+        self.addCleanup(os.remove, archivo.name)
+        
+        salida = StringIO()
+        call_command('importar_calificaciones', archivo.name, destino='sqlite', stdout=salida)
+        self.assertEqual(CalificacionSQLite.objects.count(), 2)
+        self.assertIn('filas/s', salida.getvalue())
+
+
+@override_settings(MONGODB_URI='', MONGODB_SPOOL_HILO=False)
+class DetalleCalificacionTestCase(TestCase):
+    """Tests para el detalle con origen por formato de ID y caché"""
+    
+    def setUp(self):
+        cache_detalle.limpiar()
+        mongo._circuito.reiniciar()
+        self.calificacion = CalificacionSQLite.objects.create(nombre="Usuario", calificacion=4)
+    
+    def tearDown(self):
+        cache_detalle.limpiar()
+    
+    def test_origen_por_formato(self):
+        """Test: El formato del ID decide la base"""
+        self.assertEqual(origen_de_id('42'), (ORIGEN_SQLITE, 42))
+        self.assertEqual(origen_de_id('a' * 24)[0], ORIGEN_MONGODB)
+        self.assertEqual(origen_de_id('no-es-un-id'), (None, None))
+    
+    def test_origen_digitos_unicode_y_objectid_numerico(self):
+        """Test: Dígitos Unicode no llegan a int() y 24 dígitos son un ObjectId"""
+        self.assertEqual(origen_de_id('²'), (None, None))
+        self.assertEqual(origen_de_id('١٢'), (None, None))
+        self.assertEqual(origen_de_id('1' * 24), (ORIGEN_MONGODB, ObjectId('1' * 24)))
+        response = self.client.get(reverse('calificaciones:detalle_calificacion', args=['²']))
+        self.assertRedirects(response, reverse('calificaciones:lista_calificaciones'), fetch_redirect_response=False)
+    
+    def test_detalle_sqlite_una_consulta_y_cache(self):
+        """Test: Una consulta la primera vez y ninguna mientras esté en caché"""
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_detalle(str(self.calificacion.pk))['calificacion'], 4)
+        with self.assertNumQueries(0):
+            obtener_detalle(str(self.calificacion.pk))
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_detalle_mongodb_con_proyeccion(self):
+        """Test: Un ObjectId se busca solo en MongoDB con una consulta proyectada"""
+        id_mongo = '65a1b2c3d4e5f60718293a4b'
+        coleccion = mock.Mock()
+        coleccion.find_one.return_value = {
+            '_id': id_mongo, 'nombre': 'Usuario Mongo', 'calificacion': 5,
+            'fecha_creacion': timezone.now(),
+        }
+        with mock.patch('calificaciones.detalle.get_coleccion', return_value=coleccion):
+            with self.assertNumQueries(0):
+                datos = obtener_detalle(id_mongo)
+        self.assertEqual(datos['origen'], 'MongoDB Atlas')
+        filtro, proyeccion = coleccion.find_one.call_args[0]
+        self.assertEqual(str(filtro['_id']), id_mongo)
+        self.assertNotIn('timezone', proyeccion)
+    
+    def test_edicion_y_borrado_invalidan(self):
+        """Test: Editar o eliminar descarta el detalle cacheado"""
+        obtener_detalle(str(self.calificacion.pk))
+        self.calificacion.calificacion = 2
+        self.calificacion.save()
+        self.assertEqual(obtener_detalle(str(self.calificacion.pk))['calificacion'], 2)
+        
+        pk = self.calificacion.pk
+        self.calificacion.delete()
+        self.assertIsNone(obtener_detalle(str(pk)))
+        response = Client().get(reverse('calificaciones:detalle_calificacion', args=[pk]))
+        self.assertRedirects(response, reverse('calificaciones:lista_calificaciones'))
+    
+    def test_cache_lru_y_ttl(self):
+        """Test: La caché descarta la menos usada y las entradas vencidas"""
+        cache = CacheDetalle(tamano_maximo=2, ttl_segundos=60)
+        cache.guardar('a', 1)
+        cache.guardar('b', 2)
+        cache.obtener('a')
+        cache.guardar('c', 3)
+        self.assertIsNone(cache.obtener('b'))
+        self.assertEqual(cache.obtener('a'), 1)
+        
+        cache.ttl_segundos = -1
+        cache.guardar('d', 4)
+        self.assertIsNone(cache.obtener('d'))
+
+
+@override_settings(MONGODB_URI='mongodb://localhost:27017/')
+class IndicesMongoTestCase(TestCase):
+    """Tests para los índices y las lecturas proyectadas de MongoDB"""
+    
+    def setUp(self):
+        mongo._circuito.reiniciar()
+        self.coleccion = mock.Mock()
+        self.coleccion.index_information.return_value = {
+            '_id_': {'key': [('_id', 1)]},
+            'calificacion_idx': {'key': [('calificacion', 1.0)]},
+        }
+        patcher = mock.patch('calificaciones.mongo.get_coleccion', return_value=self.coleccion)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_verificar_indices_faltantes(self):
+        """Test: Se detectan los índices que faltan comparando sus claves"""
+        self.assertEqual(mongo.verificar_indices(), ['fecha_creacion_idx'])
+    
+    def test_comando_crea_solo_faltantes(self):
+        """Test: El comando crea únicamente los índices que no existen"""
+        self.coleccion.index_information.side_effect = [
+            self.coleccion.index_information.return_value,
+            {info.document['name']: {'key': list(info.document['key'].items())}
+             for info in mongo.INDICES},
+        ]
+        salida = StringIO()
+        call_command('indices_mongo', stdout=salida)
+        creados = self.coleccion.create_indexes.call_args[0][0]
+        self.assertEqual(len(creados), 1)
+        self.assertIn('Índices verificados', salida.getvalue())
+    
+    def test_listado_usa_proyeccion(self):
+        """Test: El listado pide solo los campos de la plantilla y en un solo batch"""
+        cursor = self.coleccion.find.return_value
+        cursor.sort.return_value.limit.return_value.batch_size.return_value = iter([])
+        with mock.patch('calificaciones.listado.get_coleccion', return_value=self.coleccion):
+            paginar_calificaciones(por_pagina=10)
+        self.assertEqual(self.coleccion.find.call_args[0][1], mongo.PROYECCION_CALIFICACION)
+        cursor.sort.return_value.limit.return_value.batch_size.assert_called_once_with(11)
+
+
+class FechasUTCTestCase(TestCase):
+    """Tests para el almacenamiento en UTC y la conversión al mostrar"""
+    
+    def test_documento_guarda_solo_utc(self):
+        """Test: El documento de MongoDB tiene una sola fecha, en UTC"""
+        documento = mongo.documento_mongo("Usuario", "", 5)
+        self.assertEqual(documento['fecha_creacion'].utcoffset(), timedelta(0))
+        self.assertNotIn('fecha_creacion_utc', documento)
+        self.assertNotIn('timezone', documento)
+    
+    def test_filtro_hora_colombia(self):
+        """Test: El filtro convierte a la hora de Colombia (UTC-5)"""
+        fecha = timezone.now()
+        self.assertEqual(hora_colombia(fecha).utcoffset(), timedelta(hours=-5))
+        self.assertEqual(hora_colombia(fecha), fecha)
+        # Fechas naive de pymongo se interpretan como UTC
+        self.assertEqual(a_colombia(fecha.replace(tzinfo=None)), fecha)
+        self.assertEqual(hora_colombia(''), '')
+    
+    @override_settings(MONGODB_URI='mongodb://localhost:27017/')
+    def test_migracion_documentos_antiguos(self):
+        """Test: El comando deja fecha_creacion en UTC y quita los campos viejos"""
+        mongo._circuito.reiniciar()
+        fecha = timezone.now()
+        coleccion = mock.Mock()
+        coleccion.find.return_value.batch_size.return_value = [
+            {'_id': 1, 'fecha_creacion': fecha, 'fecha_creacion_utc': fecha},
+            {'_id': 2, 'fecha_creacion': fecha.isoformat()},
+        ]
+        coleccion.index_information.return_value = {'fecha_creacion_utc_idx': {}}
+        with mock.patch(
+            'calificaciones.management.commands.migrar_fechas_utc_mongo.get_coleccion',
+            return_value=coleccion
+        ):
+            call_command('migrar_fechas_utc_mongo', stdout=StringIO())
+        operaciones = coleccion.bulk_write.call_args[0][0]
+        self.assertEqual(len(operaciones), 2)
+        self.assertEqual(operaciones[1]._doc['$set']['fecha_creacion'], fecha)
+        coleccion.drop_index.assert_called_once_with('fecha_creacion_utc_idx')
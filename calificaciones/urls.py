@@ -17,6 +17,7 @@ urlpatterns = [
     path('cbv/editar/<int:pk>/', views.CalificacionUpdateView.as_view(), name='editar_calificacion_cbv'),
     path('cbv/eliminar/<int:pk>/', views.CalificacionDeleteView.as_view(), name='eliminar_calificacion_cbv'),
     path('estadisticas/', views.estadisticas_calificaciones, name='estadisticas'),
+    path('mongo/pool/', views.estado_pool_mongo, name='estado_pool_mongo'),
 
 ]
 
@@ -0,0 +1,64 @@
+"""
+Registro de trabajadores sociales disponibles para la ruta de crisis.
+
+La lista (con nombre, especialidad y teléfono ya resueltos desde User) se
+guarda en la caché de Django y se reconstruye con una sola consulta cuando
+un trabajador o su usuario cambian (ver signals.py). La página de atención
+inmediata la lee de la caché sin consultar TrabajadorSocial ni User.
+
+Con una caché compartida (CACHE_BACKEND) todos los workers ven el cambio de
+inmediato; con la caché local por proceso el TTL acota el desfase.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import TrabajadorSocial
+
+
+CLAVE_CACHE = 'encuentros:trabajadores_disponibles:v1'
+
+
+def _ttl():
+    return getattr(settings, 'DISPONIBILIDAD_TTL_SEGUNDOS', 300)
+
+
+def _leer_de_bd():
+    filas = TrabajadorSocial.objects.filter(disponible=True).order_by('id').values(
+        'id', 'user_id', 'user__first_name', 'user__last_name', 'user__username',
+        'especialidad', 'telefono',
+    )
+    return [
+        {
+            'id': fila['id'],
+            'user_id': fila['user_id'],
+            'nombre': f"{fila['user__first_name']} {fila['user__last_name']}".strip() or fila['user__username'],
+            'especialidad': fila['especialidad'],
+            'telefono': fila['telefono'],
+        }
+        for fila in filas
+    ]
+
+
+def reconstruir_registro():
+    """Relee los disponibles y los publica en la caché (una consulta)"""
+    trabajadores = _leer_de_bd()
+    cache.set(CLAVE_CACHE, trabajadores, _ttl())
+    return trabajadores
+
+
+def trabajadores_disponibles():
+    """Lista de dicts de trabajadores disponibles, desde la caché si está"""
+    trabajadores = cache.get(CLAVE_CACHE)
+    if trabajadores is None:
+        trabajadores = reconstruir_registro()
+    return trabajadores
+
+
+def usuario_en_registro(user_id):
+    """Indica si un usuario aparece en el registro en caché (sin consultar la BD)"""
+    trabajadores = cache.get(CLAVE_CACHE)
+    return trabajadores is not None and any(t['user_id'] == user_id for t in trabajadores)
+
+
+def invalidar_registro():
+    cache.delete(CLAVE_CACHE)
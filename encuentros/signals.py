@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from solicitudes.tablero import marcar_al_confirmar
+
+from .models import TrabajadorSocial, EncuentroVirtual
+from .disponibilidad import reconstruir_registro, usuario_en_registro
+
+
+@receiver(post_save, sender=TrabajadorSocial)
+@receiver(post_delete, sender=TrabajadorSocial)
+def actualizar_registro_trabajadores(sender, instance, **kwargs):
+    """Publica la lista de disponibles una vez confirmado el cambio"""
+    transaction.on_commit(reconstruir_registro)
+
+
+@receiver(post_save, sender=User)
+def actualizar_registro_usuario(sender, instance, update_fields=None, **kwargs):
+    """Un cambio de nombre de un trabajador disponible se refleja en la lista"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        # Cada inicio de sesión guarda last_login: no afecta al registro
+        return
+    if usuario_en_registro(instance.pk):
+        transaction.on_commit(reconstruir_registro)
+
+
+@receiver(post_save, sender=EncuentroVirtual)
+@receiver(post_delete, sender=EncuentroVirtual)
+def desactualizar_tablero(sender, instance, **kwargs):
+    marcar_al_confirmar()
@@ -2,6 +2,7 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from .models import TrabajadorSocial, EncuentroVirtual
+from .disponibilidad import trabajadores_disponibles, invalidar_registro
 from solicitudes.models import SolicitudAyuda
 from django.utils import timezone
 
@@ -105,4 +106,73 @@ class EncuentrosViewTestCase(TestCase):
     def test_lista_encuentros_sin_encuentros(self):
         """Test: Verificar mensaje cuando no hay encuentros"""
         response = self.client.get(reverse('encuentros:lista_encuentros'))
-        self.assertContains(response, 'No hay encuentros')
\ No newline at end of file
+        self.assertContains(response, 'No hay encuentros')
+
+class RegistroDisponibilidadTestCase(TestCase):
+    """Tests para el registro en caché de trabajadores disponibles"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        invalidar_registro()
+        self.user = User.objects.create_user(
+            username='crisis1',
+            first_name='María',
+            last_name='González',
+            password='testpass123'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trabajador = TrabajadorSocial.objects.create(
+                user=self.user,
+                telefono='3009876543',
+                especialidad='Especialista en Crisis',
+                disponible=True
+            )
+        self.solicitud = SolicitudAyuda.objects.create(
+            nombre_completo="Test Crisis",
+            cedula="123456789",
+            celular="3001234567",
+            descripcion_problema="Problema de prueba",
+            urgencia="crisis",
+            acepta_terminos=True,
+            acepta_tratamiento_datos=True
+        )
+    
+    def tearDown(self):
+        invalidar_registro()
+    
+    def test_registro_con_nombre_resuelto(self):
+        """Test: El registro trae el nombre del usuario sin consultar la BD"""
+        with self.assertNumQueries(0):
+            trabajadores = trabajadores_disponibles()
+        self.assertEqual(len(trabajadores), 1)
+        self.assertEqual(trabajadores[0]['nombre'], 'María González')
+        self.assertEqual(trabajadores[0]['telefono'], '3009876543')
+    
+    def test_registro_se_actualiza_al_cambiar_disponibilidad(self):
+        """Test: Marcar un trabajador como ocupado lo saca del registro"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trabajador.disponible = False
+            self.trabajador.save()
+        self.assertEqual(trabajadores_disponibles(), [])
+    
+    def test_registro_se_actualiza_al_cambiar_nombre(self):
+        """Test: Cambiar el nombre del usuario se refleja en el registro"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Marta'
+            self.user.save()
+        self.assertEqual(trabajadores_disponibles()[0]['nombre'], 'Marta González')
+    
+    def test_pagina_crisis_no_consulta_trabajadores(self):
+        """Test: La página de crisis solo lee la solicitud y escribe una vez"""
+        url = reverse('solicitudes:atencion_inmediata', args=[self.solicitud.id])
+        with self.assertNumQueries(2):
+            # SELECT de la solicitud + UPDATE del estado
+            response = self.client.get(url)
+        self.assertContains(response, 'María González')
+        
+        with self.assertNumQueries(1):
+            # Recargar no vuelve a escribir
+            self.client.get(url)
+        
+        self.solicitud.refresh_from_db()
+        self.assertEqual(self.solicitud.estado, 'atencion_inmediata')
@@ -2,10 +2,7 @@ from django.contrib import admin
 from django.contrib.admin import AdminSite
 from django.urls import path
 from django.shortcuts import render
-from django.db.models import Count, Avg
-from solicitudes.models import SolicitudAyuda
-from encuentros.models import EncuentroVirtual
-from calificaciones.models import CalificacionSQLite
+from solicitudes.tablero import obtener_instantanea, contexto_tablero
 
 class CustomAdminSite(AdminSite):
     site_header = "🏥 Sistema de Triage Psicosocial"
@@ -20,17 +17,12 @@ class CustomAdminSite(AdminSite):
         return custom_urls + urls
     
     def estadisticas_view(self, request):
-        """Vista personalizada de estadísticas"""
+        """Vista personalizada de estadísticas, leída de la instantánea del tablero"""
+        instantanea = obtener_instantanea(forzar=request.GET.get('actualizar') == '1')
         context = {
             **self.each_context(request),
             'title': 'Estadísticas del Sistema',
-            'total_solicitudes': SolicitudAyuda.objects.count(),
-            'solicitudes_pendientes': SolicitudAyuda.objects.filter(estado='pendiente').count(),
-            'solicitudes_completadas': SolicitudAyuda.objects.filter(estado='completado').count(),
-            'total_encuentros': EncuentroVirtual.objects.count(),
-            'encuentros_programados': EncuentroVirtual.objects.filter(estado='programado').count(),
-            'total_calificaciones': CalificacionSQLite.objects.count(),
-            'promedio_calificaciones': CalificacionSQLite.objects.aggregate(Avg('calificacion'))['calificacion__avg'],
+            **contexto_tablero(instantanea),
         }
         return render(request, 'admin/estadisticas.html', context)
 
@@ -0,0 +1,27 @@
+"""
+Tokens opacos de cursor para la paginación keyset de solicitudes y calificaciones.
+
+Un token es el JSON compacto de la clave de la última fila vista, codificado
+en base64 urlsafe sin relleno. Cada listado decide qué campos guarda y cómo
+validarlos; aquí solo se codifica y decodifica.
+"""
+import base64
+import json
+
+
+def codificar_token(datos):
+    """dict -> token para la URL"""
+    token = base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode())
+    return token.decode().rstrip('=')
+
+
+def decodificar_token(token):
+    """token -> dict; ValueError si no es un token válido"""
+    try:
+        relleno = '=' * (-len(token) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Cursor inválido: {token}') from e
+    if not isinstance(datos, dict):
+        raise ValueError(f'Cursor inválido: {token}')
+    return datos
@@ -0,0 +1,70 @@
+"""
+Exportación en streaming (CSV o JSONL) para los reportes de solicitudes y
+las calificaciones del admin.
+
+Las filas se leen con values_list().iterator(chunk_size) y se escriben una a
+una en la respuesta, así la memoria se mantiene constante sin importar
+cuántas filas abarque la consulta. Cada módulo define sus columnas como
+[(campo de values_list, encabezado)].
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+TAMANO_BLOQUE = 2000
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor(valor):
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def filas(queryset, columnas, tamano_bloque=TAMANO_BLOQUE):
+    """Tuplas con las columnas exportadas, leídas por bloques del cursor"""
+    campos = [campo for campo, _ in columnas]
+    return queryset.order_by('id').values_list(*campos).iterator(chunk_size=tamano_bloque)
+
+
+def lineas_csv(filas, columnas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([encabezado for _, encabezado in columnas])
+    for fila in filas:
+        yield escritor.writerow([_valor(valor) for valor in fila])
+
+
+def lineas_jsonl(filas, columnas):
+    encabezados = [encabezado for _, encabezado in columnas]
+    for fila in filas:
+        datos = dict(zip(encabezados, (_valor(valor) for valor in fila)))
+        yield json.dumps(datos, ensure_ascii=False) + '\n'
+
+
+GENERADORES = {
+    'csv': lineas_csv,
+    'jsonl': lineas_jsonl,
+}
+
+
+def respuesta_exportacion(queryset, formato, columnas, nombre):
+    """StreamingHttpResponse con las columnas del queryset en el formato indicado"""
+    lineas = GENERADORES[formato](filas(queryset, columnas), columnas)
+    respuesta = StreamingHttpResponse(lineas, content_type=FORMATOS[formato])
+    fecha = timezone.localtime().strftime('%Y%m%d_%H%M')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}_{fecha}.{formato}"'
+    return respuesta
@@ -61,6 +61,31 @@ WSGI_APPLICATION = 'sistema_triage.wsgi.application'
 
 # MongoDB Atlas
 MONGODB_URI = config('MONGODB_URI', default='')
+MONGODB_DB_NAME = config('MONGODB_DB_NAME', default='sistema_triage')
+
+# Pool de conexiones: un MongoClient compartido por cada worker de gunicorn
+MONGODB_MAX_POOL_SIZE = config('MONGODB_MAX_POOL_SIZE', default=20, cast=int)
+MONGODB_MIN_POOL_SIZE = config('MONGODB_MIN_POOL_SIZE', default=0, cast=int)
+MONGODB_MAX_IDLE_TIME_MS = config('MONGODB_MAX_IDLE_TIME_MS', default=300000, cast=int)
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = config('MONGODB_SERVER_SELECTION_TIMEOUT_MS', default=5000, cast=int)
+MONGODB_CONNECT_TIMEOUT_MS = config('MONGODB_CONNECT_TIMEOUT_MS', default=5000, cast=int)
+MONGODB_SOCKET_TIMEOUT_MS = config('MONGODB_SOCKET_TIMEOUT_MS', default=10000, cast=int)
+
+# Circuit breaker: fallos de conexión seguidos antes de abrir y espera antes de sondear
+MONGODB_CIRCUITO_UMBRAL_FALLOS = config('MONGODB_CIRCUITO_UMBRAL_FALLOS', default=3, cast=int)
+MONGODB_CIRCUITO_ESPERA_SEGUNDOS = config('MONGODB_CIRCUITO_ESPERA_SEGUNDOS', default=30, cast=int)
+
+# Hilo que envía a Atlas las calificaciones aceptadas en el spool local
+MONGODB_SPOOL_HILO = config('MONGODB_SPOOL_HILO', default=not TESTING, cast=bool)
+
+# Al iniciar, advertir en el log si faltan los índices de la colección de calificaciones
+MONGODB_VERIFICAR_INDICES = config('MONGODB_VERIFICAR_INDICES', default=False, cast=bool)
+
+# Caché por proceso del detalle de calificaciones (0 la desactiva)
+CALIFICACIONES_CACHE_DETALLE_TAMANO = config('CALIFICACIONES_CACHE_DETALLE_TAMANO', default=256, cast=int)
+CALIFICACIONES_CACHE_DETALLE_TTL = config('CALIFICACIONES_CACHE_DETALLE_TTL', default=60, cast=int)
+# Espera antes de reintentar reconstruir un resumen de calificaciones que falló (Atlas caído)
+CALIFICACIONES_RESUMEN_REINTENTO_SEGUNDOS = config('CALIFICACIONES_RESUMEN_REINTENTO_SEGUNDOS', default=60, cast=int)
 
 # Base de datos principal
 DATABASES = {
@@ -72,6 +97,37 @@ DATABASES = {
 
 TIPO_BASE_DATOS = 'mongodb'
 
+# Caché: por defecto local a cada proceso. Para compartirla entre los workers
+# de gunicorn usar p. ej. CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# y CACHE_LOCATION=/tmp/sistema_triage_cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='sistema-triage'),
+    }
+}
+
+# Registro de trabajadores disponibles para crisis (encuentros.disponibilidad)
+DISPONIBILIDAD_TTL_SEGUNDOS = config('DISPONIBILIDAD_TTL_SEGUNDOS', default=300, cast=int)
+
+# Jornada (hora local) en la que se agendan los encuentros de una derivación masiva
+ENCUENTROS_HORA_INICIO = config('ENCUENTROS_HORA_INICIO', default=8, cast=int)
+ENCUENTROS_HORA_FIN = config('ENCUENTROS_HORA_FIN', default=18, cast=int)
+
+# Cada cuántos segundos un proceso relee la versión de la taxonomía (solicitudes.taxonomia)
+TAXONOMIA_VERIFICAR_SEGUNDOS = config('TAXONOMIA_VERIFICAR_SEGUNDOS', default=5, cast=int)
+
+# Ingreso masivo de remisiones de entidades aliadas (Authorization: Token <token>)
+INGRESO_MASIVO_TOKENS_STR = config('INGRESO_MASIVO_TOKENS', default='')
+INGRESO_MASIVO_TOKENS = [token.strip() for token in INGRESO_MASIVO_TOKENS_STR.split(',') if token.strip()]
+INGRESO_MASIVO_MAX_FILAS = config('INGRESO_MASIVO_MAX_FILAS', default=5000, cast=int)
+
+# Instantánea del panel de estadísticas: se regenera al superar la edad máxima o,
+# si hubo escrituras, cuando pasó el intervalo mínimo (cron: manage.py actualizar_tablero)
+TABLERO_EDAD_MAXIMA_SEGUNDOS = config('TABLERO_EDAD_MAXIMA_SEGUNDOS', default=900, cast=int)
+TABLERO_INTERVALO_MINIMO_SEGUNDOS = config('TABLERO_INTERVALO_MINIMO_SEGUNDOS', default=30, cast=int)
+TABLERO_DIAS_SERIE = config('TABLERO_DIAS_SERIE', default=30, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -1,13 +1,47 @@
-from django.contrib import admin
-from django.utils.html import format_html
+from django.contrib import admin, messages
+from django.db.models import Prefetch
+from django.utils.html import format_html, format_html_join
 from sistema_triage.admin import admin_site
-from .models import SolicitudAyuda, CategoriaProblema, Sintoma
+from .models import SolicitudAyuda, CategoriaProblema, Sintoma, EvaluacionSintomas, FactorEvaluacion
+from . import taxonomia, busqueda
+from .paginacion import PaginadorEstimado
+from .transiciones import (
+    transicionar, derivar_a_encuentros, SinTrabajadoresDisponibles, TransicionConcurrente
+)
+
+class EvaluacionSolicitudInline(admin.StackedInline):
+    """Evaluación de síntomas (paso 3) de la solicitud, solo lectura"""
+    model = EvaluacionSintomas
+    fields = ['factores_marcados', 'causas', 'elementos_clave', 'observaciones', 'fecha_creacion']
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('factores')
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def factores_marcados(self, obj):
+        grupos = obj.factores_por_tipo()
+        if not grupos:
+            return '-'
+        return format_html_join(
+            '', '<div><strong>{}:</strong> {}</div>',
+            ((tipo, ', '.join(factores)) for tipo, factores in grupos)
+        )
+    factores_marcados.short_description = 'Factores'
+
 
 @admin.register(SolicitudAyuda)
 class SolicitudAyudaAdmin(admin.ModelAdmin):
     list_display = [
         'id', 'nombre_completo', 'cedula', 'mostrar_urgencia', 
-        'estado', 'fecha_creacion', 'acciones_rapidas'
+        'estado', 'categoria_problema', 'resumen_sintomas', 'fecha_creacion', 'acciones_rapidas'
     ]
     
     list_filter = ['urgencia', 'estado', 'fecha_creacion', 'requiere_ayuda_basica']
@@ -15,6 +49,11 @@ class SolicitudAyudaAdmin(admin.ModelAdmin):
     list_per_page = 25
     date_hierarchy = 'fecha_creacion'
     
+    # Presupuesto fijo de consultas por página: FK en el mismo SELECT, síntomas en un prefetch
+    list_select_related = ['categoria_problema']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    
     # Campos de solo lectura
     readonly_fields = ['fecha_creacion', 'informacion_completa']
     
@@ -38,6 +77,8 @@ class SolicitudAyudaAdmin(admin.ModelAdmin):
         }),
     )
     
+    inlines = [EvaluacionSolicitudInline]
+    
     # Filtros laterales avanzados
     class UrgenciaFilter(admin.SimpleListFilter):
         title = 'Nivel de Urgencia'
@@ -60,6 +101,18 @@ class SolicitudAyudaAdmin(admin.ModelAdmin):
     
     list_filter = [UrgenciaFilter, 'estado', 'fecha_creacion']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('sintomas_seleccionados', queryset=Sintoma.objects.only('id', 'nombre'))
+        )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Usa el índice FTS5 en lugar de LIKE '%término%' sobre tres columnas"""
+        filtrado = busqueda.filtrar(queryset, search_term)
+        if filtrado is None:
+            return super().get_search_results(request, queryset, search_term)
+        return filtrado, False
+    
     # Métodos personalizados
     def mostrar_urgencia(self, obj):
         """Muestra la urgencia con colores"""
@@ -91,11 +144,16 @@ class SolicitudAyudaAdmin(admin.ModelAdmin):
             obj.edad,
             obj.celular,
             obj.correo_electronico,
-            ", ".join([s.nombre for s in obj.sintomas_seleccionados.all()][:3]),
+            self.resumen_sintomas(obj),
             "Sí" if obj.requiere_ayuda_basica else "No"
         )
     informacion_completa.short_description = 'Información Completa'
     
+    def resumen_sintomas(self, obj):
+        """Primeros síntomas, leídos del prefetch de get_queryset"""
+        return ", ".join(sintoma.nombre for sintoma in obj.sintomas_seleccionados.all()[:3])
+    resumen_sintomas.short_description = 'Síntomas'
+    
     def acciones_rapidas(self, obj):
         """Botones de acción rápida"""
         return format_html(
@@ -114,27 +172,36 @@ class SolicitudAyudaAdmin(admin.ModelAdmin):
     
     def marcar_como_completadas(self, request, queryset):
         """Marca solicitudes como completadas"""
-        updated = queryset.update(estado='completado')
-        self.message_user(request, f'{updated} solicitudes marcadas como completadas.')
+        try:
+            resultado = transicionar(queryset, 'completado')
+        except TransicionConcurrente as e:
+            self.message_user(request, f'❌ {e}', level=messages.ERROR)
+            return
+        self.message_user(request, f'✅ {resultado.mensaje()}')
     marcar_como_completadas.short_description = '✅ Marcar como completadas'
     
     def derivar_a_encuentro(self, request, queryset):
         """Deriva solicitudes para encuentro virtual"""
-        for solicitud in queryset.filter(estado='pendiente'):
-            # Lógica para crear encuentro automáticamente
-            solicitud.estado = 'programado'
-            solicitud.save()
-        self.message_user(request, f'{queryset.count()} solicitudes derivadas a encuentros.')
+        try:
+            resultado = derivar_a_encuentros(queryset)
+        except (SinTrabajadoresDisponibles, TransicionConcurrente) as e:
+            self.message_user(request, f'❌ {e}', level=messages.ERROR)
+            return
+        nivel = messages.WARNING if resultado.total_no_permitidas else messages.SUCCESS
+        self.message_user(request, f'👥 {resultado.mensaje()}', level=nivel)
     derivar_a_encuentro.short_description = '👥 Derivar a encuentro virtual'
 
 # Admin para Categorías y Síntomas
 @admin.register(CategoriaProblema)
 class CategoriaProblemaAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'cantidad_sintomas', 'descripcion_corta']
+    list_display = ['nombre', 'slug', 'cantidad_sintomas', 'descripcion_corta']
     search_fields = ['nombre', 'descripcion']
+    prepopulated_fields = {'slug': ('nombre',)}
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     def cantidad_sintomas(self, obj):
-        return obj.sintoma_set.count()
+        return taxonomia.cantidad_sintomas(obj.id)
     cantidad_sintomas.short_description = 'Síntomas'
     
     def descripcion_corta(self, obj):
@@ -143,8 +210,11 @@ class CategoriaProblemaAdmin(admin.ModelAdmin):
 
 @admin.register(Sintoma)
 class SintomaAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'categoria', 'descripcion_corta']
+    list_display = ['nombre', 'codigo', 'categoria', 'descripcion_corta']
     list_filter = ['categoria']
+    list_select_related = ['categoria']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     search_fields = ['nombre', 'descripcion']
     
     def descripcion_corta(self, obj):
@@ -152,7 +222,20 @@ class SintomaAdmin(admin.ModelAdmin):
     descripcion_corta.short_description = 'Descripción'
 
 
+class FactorEvaluacionInline(admin.TabularInline):
+    model = FactorEvaluacion
+    extra = 0
+
+@admin.register(EvaluacionSintomas)
+class EvaluacionSintomasAdmin(admin.ModelAdmin):
+    list_display = ['solicitud', 'fecha_creacion']
+    list_select_related = ['solicitud']
+    raw_id_fields = ['solicitud']
+    inlines = [FactorEvaluacionInline]
+
 
-admin_site.register(SolicitudAyuda)
-admin_site.register(CategoriaProblema)
-admin_site.register(Sintoma)
+# El sitio servido en /admin/ usa las mismas configuraciones
+admin_site.register(SolicitudAyuda, SolicitudAyudaAdmin)
+admin_site.register(CategoriaProblema, CategoriaProblemaAdmin)
+admin_site.register(Sintoma, SintomaAdmin)
+admin_site.register(EvaluacionSintomas, EvaluacionSintomasAdmin)
@@ -0,0 +1,117 @@
+"""
+Búsqueda de texto completo sobre solicitudes con SQLite FTS5.
+
+La tabla virtual solicitudes_busqueda guarda nombre, cédula y descripción
+de cada solicitud (rowid = id) con el tokenizador unicode61 sin tildes, así
+'maria' encuentra 'María'. Se mantiene sincronizada desde signals.py y desde
+los ingresos masivos; reconstruir_busqueda la regenera completa. Con otros
+motores de BD la tabla no existe y la búsqueda vuelve a los LIKE del admin.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import SolicitudAyuda
+
+
+TABLA = 'solicitudes_busqueda'
+CAMPOS = ('nombre_completo', 'cedula', 'descripcion_problema')
+TAMANO_LOTE = 2000
+
+SQL_CREAR = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+    "nombre_completo, cedula, descripcion_problema, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+SQL_INSERTAR = f'INSERT INTO {TABLA} (rowid, {", ".join(CAMPOS)}) VALUES (%s, %s, %s, %s)'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def disponible():
+    return connection.vendor == 'sqlite'
+
+
+def consulta_fts(texto):
+    """
+    Convierte lo escrito por el usuario en una consulta FTS5 segura:
+    cada palabra entre comillas y como prefijo, todas obligatorias.
+    Retorna '' si no hay palabras.
+    """
+    return ' '.join(f'"{token}"*' for token in _TOKEN.findall(texto or ''))
+
+
+def _filas(solicitudes):
+    return [
+        (solicitud.id, *(getattr(solicitud, campo) or '' for campo in CAMPOS))
+        for solicitud in solicitudes
+    ]
+
+
+def indexar(solicitudes, nuevas=False):
+    """
+    Agrega o reemplaza en el índice las solicitudes dadas (objetos ya guardados).
+    nuevas=True omite el borrado previo cuando se sabe que no estaban indexadas.
+    """
+    if not disponible():
+        return
+    filas = _filas(solicitudes)
+    if not filas:
+        return
+    with connection.cursor() as cursor:
+        if not nuevas:
+            cursor.executemany(f'DELETE FROM {TABLA} WHERE rowid = %s', [(fila[0],) for fila in filas])
+        cursor.executemany(SQL_INSERTAR, filas)
+
+
+def eliminar(id_solicitud):
+    if not disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [id_solicitud])
+
+
+def reconstruir(tamano_lote=TAMANO_LOTE):
+    """Regenera el índice completo leyendo las solicitudes por bloques; retorna cuántas indexó"""
+    if not disponible():
+        return 0
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SQL_CREAR)
+        cursor.execute(f'DELETE FROM {TABLA}')
+        lote = []
+        for fila in SolicitudAyuda.objects.values_list('id', *CAMPOS).iterator(chunk_size=tamano_lote):
+            lote.append(tuple(valor or '' for valor in fila))
+            if len(lote) >= tamano_lote:
+                cursor.executemany(SQL_INSERTAR, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            cursor.executemany(SQL_INSERTAR, lote)
+            total += len(lote)
+        cursor.execute(f"INSERT INTO {TABLA}({TABLA}) VALUES ('optimize')")
+    return total
+
+
+def filtrar(queryset, texto):
+    """Restringe el queryset a las solicitudes que coinciden; None si no aplica FTS"""
+    consulta = consulta_fts(texto)
+    if not consulta or not disponible():
+        return None
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s', [consulta])
+    )
+
+
+def buscar(texto, limite=20):
+    """[(id, puntaje)] ordenados por relevancia (bm25), en una consulta"""
+    consulta = consulta_fts(texto)
+    if not consulta or not disponible():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({TABLA}) FROM {TABLA} WHERE {TABLA} MATCH %s ORDER BY rank LIMIT %s',
+            [consulta, limite]
+        )
+        return cursor.fetchall()
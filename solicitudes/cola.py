@@ -0,0 +1,98 @@
+"""
+Cola de triage de solicitudes.
+
+El orden es por clave_prioridad: la fecha de creación adelantada según la
+urgencia (ver SolicitudAyuda.VENTAJA_URGENCIA). Como la clave no cambia con
+el tiempo, el envejecimiento no obliga a recalcular nada.
+
+Cada estado de la cola se lee del índice (estado, asignado_a, clave_prioridad)
+ya ordenado y con LIMIT, y las cabezas se mezclan en Python: el siguiente caso
+cuesta O(log n) sin importar cuántas solicitudes esperen.
+
+Tomar un caso es un UPDATE condicional (solo si sigue sin asignar), así dos
+trabajadores nunca reciben el mismo caso aunque consulten a la vez.
+"""
+import heapq
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SolicitudAyuda
+
+
+CANDIDATOS_POR_INTENTO = 5
+
+
+def _por_estado(estado):
+    return SolicitudAyuda.objects.filter(
+        estado=estado, asignado_a__isnull=True
+    ).order_by('clave_prioridad', 'id')
+
+
+def proximos_casos(cantidad, select_related=()):
+    """Los primeros casos sin asignar en orden de atención"""
+    cabezas = [
+        list(_por_estado(estado).select_related(*select_related)[:cantidad])
+        for estado in SolicitudAyuda.ESTADOS_EN_COLA
+    ]
+    mezcla = heapq.merge(*cabezas, key=lambda solicitud: (solicitud.clave_prioridad, solicitud.id))
+    return list(mezcla)[:cantidad]
+
+
+def _tomar_con_bloqueo(usuario, ahora):
+    """Bases con SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8)"""
+    with transaction.atomic():
+        cabezas = [
+            _por_estado(estado).select_for_update(skip_locked=True).first()
+            for estado in SolicitudAyuda.ESTADOS_EN_COLA
+        ]
+        cabezas = [solicitud for solicitud in cabezas if solicitud is not None]
+        if not cabezas:
+            return None
+        solicitud = min(cabezas, key=lambda caso: (caso.clave_prioridad, caso.id))
+        solicitud.asignado_a = usuario
+        solicitud.fecha_asignacion = ahora
+        if solicitud.estado == 'pendiente':
+            solicitud.estado = 'evaluando'
+        solicitud.save(update_fields=['asignado_a', 'fecha_asignacion', 'estado'])
+        return solicitud
+
+
+def tomar_siguiente_caso(usuario):
+    """
+    Asigna al usuario el caso de mayor prioridad sin asignar.
+    Retorna la solicitud tomada o None si la cola está vacía.
+    """
+    ahora = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        return _tomar_con_bloqueo(usuario, ahora)
+
+    # SQLite: UPDATE condicional; si otro trabajador ganó el caso se prueba el siguiente
+    while True:
+        candidatos = proximos_casos(CANDIDATOS_POR_INTENTO)
+        if not candidatos:
+            return None
+        for candidato in candidatos:
+            tomado = SolicitudAyuda.objects.filter(
+                pk=candidato.pk, asignado_a__isnull=True, estado=candidato.estado
+            ).update(
+                asignado_a=usuario,
+                fecha_asignacion=ahora,
+                # Las crisis conservan su estado de atención inmediata
+                estado='evaluando' if candidato.estado == 'pendiente' else candidato.estado,
+            )
+            if tomado:
+                return SolicitudAyuda.objects.get(pk=candidato.pk)
+
+
+def liberar_caso(solicitud):
+    """Devuelve un caso tomado a la cola conservando su posición original"""
+    estado = 'pendiente' if solicitud.estado == 'evaluando' else solicitud.estado
+    liberado = SolicitudAyuda.objects.filter(
+        pk=solicitud.pk, asignado_a__isnull=False
+    ).update(asignado_a=None, fecha_asignacion=None, estado=estado)
+    if liberado:
+        solicitud.asignado_a = None
+        solicitud.fecha_asignacion = None
+        solicitud.estado = estado
+    return bool(liberado)
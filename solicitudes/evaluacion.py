@@ -0,0 +1,77 @@
+"""
+Registro estructurado de la evaluación de síntomas (paso 3 del flujo).
+
+Los síntomas marcados van a SolicitudAyuda.sintomas_seleccionados y las
+causas / elementos clave a FactorEvaluacion (indexado por tipo y código),
+así las frecuencias se calculan con un GROUP BY en lugar de leer y
+analizar el texto libre de cada solicitud.
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from .models import SolicitudAyuda, EvaluacionSintomas, FactorEvaluacion
+from .taxonomia import sintomas_por_codigo
+
+
+def _codigos_validos(tipo, codigos):
+    permitidos = FactorEvaluacion.CODIGOS[tipo]
+    return list(dict.fromkeys(codigo for codigo in codigos if codigo in permitidos))
+
+
+def registrar_evaluacion(solicitud, sintomas=(), causas=(), elementos=(),
+                         texto_causas='', texto_elementos='', observaciones=''):
+    """
+    Guarda (o reemplaza) la evaluación de una solicitud, incluidos sus
+    síntomas marcados. sintomas, causas y elementos son listas de códigos
+    del formulario.
+    """
+    sintoma_ids = sintomas_por_codigo(sintomas)
+    with transaction.atomic():
+        evaluacion, creada = EvaluacionSintomas.objects.update_or_create(
+            solicitud=solicitud,
+            defaults={
+                'causas': texto_causas,
+                'elementos_clave': texto_elementos,
+                'observaciones': observaciones,
+            }
+        )
+        if not creada:
+            evaluacion.factores.all().delete()
+        FactorEvaluacion.objects.bulk_create(
+            [FactorEvaluacion(evaluacion=evaluacion, tipo='causa', codigo=c) for c in _codigos_validos('causa', causas)] +
+            [FactorEvaluacion(evaluacion=evaluacion, tipo='elemento', codigo=c) for c in _codigos_validos('elemento', elementos)]
+        )
+        # Los síntomas de la evaluación reemplazan a los anteriores: un borrado
+        # y una sola inserción en la tabla intermedia
+        Intermedia = SolicitudAyuda.sintomas_seleccionados.through
+        Intermedia.objects.filter(solicitudayuda_id=solicitud.id).delete()
+        if sintoma_ids:
+            Intermedia.objects.bulk_create(
+                [Intermedia(solicitudayuda_id=solicitud.id, sintoma_id=i) for i in sintoma_ids]
+            )
+    return evaluacion
+
+
+def frecuencia_sintomas(solicitudes=None):
+    """[(sintoma_id, nombre, cantidad)] de mayor a menor, en una consulta"""
+    Intermedia = SolicitudAyuda.sintomas_seleccionados.through
+    filas = Intermedia.objects.all()
+    if solicitudes is not None:
+        filas = filas.filter(solicitudayuda__in=solicitudes)
+    return list(
+        filas.values_list('sintoma_id', 'sintoma__nombre')
+        .annotate(cantidad=Count('id'))
+        .order_by('-cantidad', 'sintoma__nombre')
+    )
+
+
+def frecuencia_factores(tipo):
+    """[(codigo, etiqueta, cantidad)] de las causas o elementos clave, en una consulta"""
+    etiquetas = FactorEvaluacion.CODIGOS[tipo]
+    filas = (
+        FactorEvaluacion.objects.filter(tipo=tipo)
+        .values_list('codigo')
+        .annotate(cantidad=Count('id'))
+        .order_by('-cantidad', 'codigo')
+    )
+    return [(codigo, etiquetas.get(codigo, codigo), cantidad) for codigo, cantidad in filas]
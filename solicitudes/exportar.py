@@ -0,0 +1,28 @@
+"""
+Columnas del reporte de solicitudes exportado en streaming
+(ver sistema_triage/exportar.py).
+"""
+from sistema_triage import exportar
+
+
+# (campo de values_list, encabezado). Sin datos de contacto ni identificación.
+COLUMNAS_REPORTE = [
+    ('id', 'id'),
+    ('fecha_creacion', 'fecha_creacion'),
+    ('urgencia', 'urgencia'),
+    ('estado', 'estado'),
+    ('categoria_problema__nombre', 'categoria'),
+    ('genero', 'genero'),
+    ('edad', 'edad'),
+    ('grupo_raizal', 'grupo_raizal'),
+    ('discapacidad', 'discapacidad'),
+    ('sesiones_completadas', 'sesiones_completadas'),
+    ('max_sesiones', 'max_sesiones'),
+    ('remitido_otra_entidad', 'remitido_otra_entidad'),
+    ('entidad_remision', 'entidad_remision'),
+]
+
+
+def respuesta_exportacion(queryset, formato, nombre='reporte_solicitudes'):
+    """StreamingHttpResponse con el reporte en el formato indicado"""
+    return exportar.respuesta_exportacion(queryset, formato, COLUMNAS_REPORTE, nombre)
@@ -0,0 +1,237 @@
+"""
+Ingreso masivo de remisiones enviadas por entidades aliadas.
+
+Cada fila se valida con las mismas reglas de SolicitudAyudaForm; la
+categoría (por slug o id) y los síntomas (ids) se resuelven contra la caché
+de taxonomía, así la validación solo consulta la BD para confirmar una
+categoría o síntoma que la copia local no conoce. Las filas válidas se
+insertan por bloques con bulk_create y sus síntomas con un único bulk_create
+sobre la tabla intermedia por bloque.
+"""
+import hmac
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import SolicitudAyudaForm
+from .models import SolicitudAyuda
+from .taxonomia import taxonomia, categoria_por_slug, categoria_por_id, sintomas_con_recarga
+from . import busqueda
+from .tablero import marcar_al_confirmar
+
+
+TAMANO_LOTE = 500
+
+# Las entidades aliadas no siempre reportan estos datos: se usan los valores por defecto del modelo
+VALORES_POR_DEFECTO = {
+    'grupo_raizal': 'ninguno',
+    'discapacidad': 'ninguna',
+}
+
+
+def leer_jsonl(lineas):
+    """Un dict por línea; las líneas que no son un objeto JSON se entregan como None"""
+    for linea in lineas:
+        if isinstance(linea, bytes):
+            linea = linea.decode('utf-8')
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError:
+            datos = None
+        yield datos if isinstance(datos, dict) else None
+
+
+def token_valido(encabezado):
+    """Compara 'Token <valor>' contra INGRESO_MASIVO_TOKENS en tiempo constante"""
+    esquema, _, token = (encabezado or '').partition(' ')
+    if esquema.lower() != 'token' or not token:
+        return False
+    return any(
+        hmac.compare_digest(token.strip().encode(), permitido.encode())
+        for permitido in settings.INGRESO_MASIVO_TOKENS
+    )
+
+
+class FormularioIngreso(SolicitudAyudaForm):
+    """SolicitudAyudaForm sin la confirmación de correo, pensada para humanos"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['confirmar_correo'].required = False
+
+
+def _id_o_codigo(valor):
+    """(id, None) si el valor es numérico; (None, valor) si es un código"""
+    try:
+        return int(valor), None
+    except (TypeError, ValueError):
+        return None, valor
+
+
+def _resolver_taxonomia(datos, actual):
+    """
+    Retorna (categoria_id, [sintoma_ids], errores) usando la caché de taxonomía.
+    Lo que no está en la copia local se confirma en la BD antes de rechazarlo.
+    """
+    errores = {}
+    categoria_id = None
+    categoria = datos.get('categoria')
+    if categoria not in (None, ''):
+        encontrada = actual.por_slug.get(str(categoria))
+        if encontrada is None and str(categoria).isdigit():
+            encontrada = actual.categorias.get(int(categoria))
+        if encontrada is None:
+            encontrada = categoria_por_slug(str(categoria))
+        if encontrada is None and str(categoria).isdigit():
+            encontrada = categoria_por_id(int(categoria))
+        if encontrada is None:
+            errores['categoria'] = [f'Categoría desconocida: {categoria}']
+        else:
+            categoria_id = encontrada.id
+
+    sintoma_ids = []
+    sintomas = datos.get('sintomas') or []
+    if not isinstance(sintomas, (list, tuple)):
+        sintomas = [sintomas]
+    # Se aceptan ids o códigos del formulario de evaluación ('ansiedad')
+    pares = [(sintoma, *_id_o_codigo(sintoma)) for sintoma in sintomas]
+    ids = [i for _, i, _ in pares if i is not None]
+    codigos = [codigo for _, _, codigo in pares if isinstance(codigo, str)]
+    if any(i not in actual.sintomas for i in ids) or any(c not in actual.por_codigo for c in codigos):
+        actual = sintomas_con_recarga(ids=ids, codigos=codigos)
+    for sintoma, sintoma_id, codigo in pares:
+        if sintoma_id is None and isinstance(codigo, str):
+            encontrado = actual.por_codigo.get(codigo)
+            sintoma_id = encontrado.id if encontrado else None
+        if sintoma_id not in actual.sintomas:
+            errores.setdefault('sintomas', []).append(f'Síntoma desconocido: {sintoma}')
+        elif sintoma_id not in sintoma_ids:
+            sintoma_ids.append(sintoma_id)
+    return categoria_id, sintoma_ids, errores
+
+
+def validar_remision(datos, actual=None):
+    """
+    Valida una fila (dict) y retorna (solicitud sin guardar, [sintoma_ids]).
+    Lanza ValueError con el dict de errores si no es válida.
+    """
+    if not isinstance(datos, dict):
+        raise ValueError({'__all__': ['Cada remisión debe ser un objeto JSON']})
+    actual = actual or taxonomia()
+    # Un formulario por fila: mismas reglas que el formulario público
+    form = FormularioIngreso(data={**VALORES_POR_DEFECTO, **datos})
+    valido = form.is_valid()
+    categoria_id, sintoma_ids, errores = _resolver_taxonomia(datos, actual)
+    if not valido:
+        errores = {
+            **{campo: [str(mensaje) for mensaje in mensajes] for campo, mensajes in form.errors.items()},
+            **errores,
+        }
+    if errores:
+        raise ValueError(errores)
+
+    solicitud = form.save(commit=False)
+    solicitud.estado = 'pendiente'
+    solicitud.categoria_problema_id = categoria_id
+    return solicitud, sintoma_ids
+
+
+class ResultadoIngreso:
+    """Resultado por fila de un ingreso masivo"""
+
+    def __init__(self):
+        self.filas = []
+        self.creadas = 0
+        self.rechazadas = 0
+        self.inicio = time.monotonic()
+
+    def aceptar(self, posicion, id_solicitud):
+        self.creadas += 1
+        self.filas.append({'fila': posicion, 'ok': True, 'id': id_solicitud})
+
+    def rechazar(self, posicion, errores):
+        self.rechazadas += 1
+        self.filas.append({'fila': posicion, 'ok': False, 'errores': errores})
+
+    @property
+    def segundos(self):
+        return time.monotonic() - self.inicio
+
+    @property
+    def por_segundo(self):
+        segundos = self.segundos
+        return self.creadas / segundos if segundos else 0
+
+    def como_dict(self):
+        return {
+            'creadas': self.creadas,
+            'rechazadas': self.rechazadas,
+            'segundos': round(self.segundos, 3),
+            'resultados': self.filas,
+        }
+
+
+def _insertar_bloque(validas, resultado):
+    """Inserta [(posicion, solicitud, sintoma_ids)] en una transacción"""
+    Intermedia = SolicitudAyuda.sintomas_seleccionados.through
+    ahora = timezone.now()
+    solicitudes = []
+    for _, solicitud, _ in validas:
+        # bulk_create no envía pre_save: la clave de la cola se calcula aquí
+        solicitud.fecha_creacion = ahora
+        solicitud.calcular_clave_prioridad()
+        solicitudes.append(solicitud)
+
+    with transaction.atomic():
+        SolicitudAyuda.objects.bulk_create(solicitudes)
+        Intermedia.objects.bulk_create([
+            Intermedia(solicitudayuda_id=solicitud.id, sintoma_id=sintoma_id)
+            for (_, solicitud, sintoma_ids) in validas
+            for sintoma_id in sintoma_ids
+        ])
+        # bulk_create no envía post_save: el índice de búsqueda se actualiza aquí
+        busqueda.indexar(solicitudes, nuevas=True)
+        marcar_al_confirmar()
+
+    for posicion, solicitud, _ in validas:
+        resultado.aceptar(posicion, solicitud.id)
+
+
+def ingresar_remisiones(filas, tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Valida e inserta un iterable de dicts por bloques, sin cargarlo completo.
+    progreso(resultado) se llama después de cada bloque.
+    """
+    resultado = ResultadoIngreso()
+    actual = taxonomia()
+    iterador = enumerate(filas, start=1)
+
+    while True:
+        bloque = list(islice(iterador, tamano_lote))
+        if not bloque:
+            break
+
+        validas = []
+        for posicion, datos in bloque:
+            try:
+                solicitud, sintoma_ids = validar_remision(datos, actual)
+            except ValueError as e:
+                resultado.rechazar(posicion, e.args[0])
+                continue
+            validas.append((posicion, solicitud, sintoma_ids))
+
+        if validas:
+            _insertar_bloque(validas, resultado)
+        if progreso:
+            progreso(resultado)
+
+    resultado.filas.sort(key=lambda fila: fila['fila'])
+    return resultado
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from solicitudes import tablero
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la instantánea del panel de estadísticas (pensado para cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Días de la serie diaria (por defecto TABLERO_DIAS_SERIE)')
+        parser.add_argument('--si-desactualizado', action='store_true',
+                            help='Solo recalcular si hubo escrituras o la instantánea está vencida')
+
+    def handle(self, *args, **options):
+        if options['dias'] is not None and options['dias'] < 1:
+            raise CommandError('--dias debe ser mayor que 0')
+
+        if options['si_desactualizado']:
+            actual = tablero.InstantaneaTablero.objects.filter(clave=tablero.CLAVE_INSTANTANEA).first()
+            if not tablero.necesita_actualizarse(actual):
+                self.stdout.write('✅ La instantánea del tablero está al día')
+                return
+
+        instantanea = tablero.actualizar_instantanea(dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 Tablero actualizado: {instantanea.datos['total_solicitudes']} solicitudes, "
+            f"{len(instantanea.datos['serie'])} días de serie en {instantanea.segundos_calculo:.2f}s"
+        ))
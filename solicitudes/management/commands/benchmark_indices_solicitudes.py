@@ -0,0 +1,108 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from solicitudes.cola import _por_estado
+from solicitudes.models import SolicitudAyuda, CategoriaProblema
+
+
+class _Revertir(Exception):
+    """Deshace los datos sembrados al terminar el benchmark"""
+
+
+def consultas_triage(categoria, desde, hasta):
+    """Las rutas de acceso que deben resolverse con índice"""
+    return [
+        ('buscar_solicitudes (estado, urgencia)',
+         SolicitudAyuda.objects.filter(estado='pendiente', urgencia='alta').order_by('-fecha_creacion')[:50]),
+        ('generar_reporte (rango + categoría)',
+         SolicitudAyuda.objects.filter(
+             fecha_creacion__gte=desde, fecha_creacion__lte=hasta, categoria_problema=categoria
+         ).order_by('-fecha_creacion')[:50]),
+        ('generar_reporte (solo rango)',
+         SolicitudAyuda.objects.filter(fecha_creacion__gte=desde, fecha_creacion__lte=hasta)[:50]),
+        ('admin urgencia + date_hierarchy',
+         SolicitudAyuda.objects.filter(
+             urgencia='crisis', fecha_creacion__gte=desde, fecha_creacion__lte=hasta
+         ).order_by('-fecha_creacion', '-id')[:25]),
+        ('cola de triage (siguiente caso)', _por_estado('pendiente')[:5]),
+        ('admin estado',
+         SolicitudAyuda.objects.filter(estado='evaluando').order_by('-fecha_creacion', '-id')[:25]),
+    ]
+
+
+def usa_indice(plan):
+    """False si SQLite recorre la tabla completa de solicitudes"""
+    for linea in plan.splitlines():
+        if 'SCAN' in linea and 'solicitudayuda' in linea and 'USING' not in linea:
+            return False
+    return 'USE TEMP B-TREE FOR ORDER BY' not in plan
+
+
+class Command(BaseCommand):
+    help = ('Siembra solicitudes de prueba dentro de una transacción que se revierte, '
+            'y muestra EXPLAIN QUERY PLAN y tiempos de las consultas de triage')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--estricto', action='store_true',
+                            help='Terminar con error si alguna consulta recorre la tabla completa')
+
+    def handle(self, *args, **options):
+        regresiones = []
+        try:
+            with transaction.atomic():
+                categoria, desde, hasta = self._sembrar(options['filas'])
+                for nombre, queryset in consultas_triage(categoria, desde, hasta):
+                    plan = queryset.explain()
+                    inicio = time.perf_counter()
+                    for _ in range(options['repeticiones']):
+                        list(queryset)
+                    milisegundos = (time.perf_counter() - inicio) * 1000 / options['repeticiones']
+
+                    correcto = usa_indice(plan)
+                    if not correcto:
+                        regresiones.append(nombre)
+                    estilo = self.style.SUCCESS if correcto else self.style.ERROR
+                    self.stdout.write(estilo(f'{"✅" if correcto else "❌"} {nombre}: {milisegundos:.2f} ms'))
+                    for linea in plan.splitlines():
+                        self.stdout.write(f'    {linea}')
+                raise _Revertir()
+        except _Revertir:
+            pass
+
+        if regresiones and options['estricto']:
+            raise CommandError(f'Consultas sin índice: {", ".join(regresiones)}')
+
+    def _sembrar(self, filas):
+        aleatorio = random.Random(42)
+        categorias = [
+            CategoriaProblema.objects.create(nombre=f'Benchmark {i}', descripcion='')
+            for i in range(10)
+        ]
+        urgencias = [valor for valor, _ in SolicitudAyuda.URGENCIA_CHOICES]
+        estados = [valor for valor, _ in SolicitudAyuda.ESTADO_CHOICES]
+        ahora = timezone.now()
+
+        inicio = time.perf_counter()
+        for desde in range(0, filas, 5000):
+            lote = SolicitudAyuda.objects.bulk_create([
+                SolicitudAyuda(
+                    descripcion_problema='Benchmark',
+                    urgencia=aleatorio.choice(urgencias),
+                    estado=aleatorio.choice(estados),
+                    categoria_problema=aleatorio.choice(categorias),
+                )
+                for _ in range(min(5000, filas - desde))
+            ])
+            # auto_now_add asigna la misma fecha a todas: se reparten en dos años
+            for solicitud in lote:
+                solicitud.fecha_creacion = ahora - timedelta(minutes=aleatorio.randrange(730 * 24 * 60))
+            SolicitudAyuda.objects.bulk_update(lote, ['fecha_creacion'], batch_size=1000)
+        self.stdout.write(f'🌱 {filas} solicitudes sembradas en {time.perf_counter() - inicio:.1f}s')
+        return categorias[0], ahora - timedelta(days=60), ahora - timedelta(days=30)
@@ -0,0 +1,75 @@
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from solicitudes.ingreso import ingresar_remisiones, leer_jsonl, TAMANO_LOTE
+
+
+def leer_csv(archivo):
+    """Filas del CSV; la columna 'sintomas' admite ids separados por ';'"""
+    for fila in csv.DictReader(archivo):
+        if fila.get('sintomas'):
+            fila['sintomas'] = [s for s in fila['sintomas'].split(';') if s.strip()]
+        yield fila
+
+
+def leer_json(archivo):
+    datos = json.load(archivo)
+    if isinstance(datos, dict):
+        datos = datos.get('solicitudes')
+    if not isinstance(datos, list):
+        raise CommandError('Se esperaba una lista de solicitudes')
+    return datos
+
+
+LECTORES = {
+    'jsonl': leer_jsonl,
+    'json': leer_json,
+    'csv': leer_csv,
+}
+
+
+class Command(BaseCommand):
+    help = 'Ingresa remisiones de entidades aliadas desde JSON, JSONL o CSV con inserciones por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo (.jsonl, .json o .csv)')
+        parser.add_argument('--formato', choices=sorted(LECTORES), help='Por defecto según la extensión')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por bulk_create')
+        parser.add_argument('--errores', type=int, default=50, help='Máximo de filas rechazadas a mostrar')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        formato = options['formato'] or os.path.splitext(ruta)[1].lstrip('.').lower()
+        if formato not in LECTORES:
+            raise CommandError(f'Formato no soportado: {formato} (use --formato jsonl|json|csv)')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        def progreso(resultado):
+            self.stdout.write(
+                f'⏳ {resultado.creadas + resultado.rechazadas} filas | {resultado.por_segundo:.0f} filas/s'
+            )
+
+        try:
+            with open(ruta, newline='', encoding='utf-8') as archivo:
+                resultado = ingresar_remisiones(
+                    LECTORES[formato](archivo),
+                    tamano_lote=options['lote'],
+                    progreso=progreso if options['verbosity'] > 1 else None,
+                )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+        except ValueError as e:
+            raise CommandError(f'{ruta} no es un JSON válido: {e}')
+
+        rechazadas = [fila for fila in resultado.filas if not fila['ok']]
+        for fila in rechazadas[:options['errores']]:
+            self.stderr.write(f"⚠️ Fila {fila['fila']}: {fila['errores']}")
+        estilo = self.style.WARNING if resultado.rechazadas else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'📥 Creadas: {resultado.creadas} | Rechazadas: {resultado.rechazadas} | '
+            f'{resultado.segundos:.2f}s | {resultado.por_segundo:.0f} filas/s'
+        ))
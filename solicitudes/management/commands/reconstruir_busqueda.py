@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from solicitudes import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de búsqueda FTS5 de solicitudes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=busqueda.TAMANO_LOTE, help='Filas leídas por bloque')
+
+    def handle(self, *args, **options):
+        if not busqueda.disponible():
+            self.stdout.write(self.style.WARNING('⚠️ La búsqueda FTS5 solo está disponible con SQLite'))
+            return
+
+        inicio = time.monotonic()
+        total = busqueda.reconstruir(tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f'🔎 {total} solicitudes indexadas en {time.monotonic() - inicio:.2f}s'
+        ))
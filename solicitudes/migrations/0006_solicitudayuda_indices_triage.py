@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0005_solicitudayuda_acepta_terminos_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(fields=['estado', 'urgencia', '-fecha_creacion'], name='solicitud_estado_urg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='solicitud_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(fields=['urgencia', '-fecha_creacion'], name='solicitud_urgencia_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(fields=['categoria_problema', 'fecha_creacion'], name='solicitud_cat_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(fields=['-fecha_creacion'], name='solicitud_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+# Copia de SolicitudAyuda.VENTAJA_URGENCIA al momento de esta migración
+VENTAJA_URGENCIA = {
+    'crisis': timedelta(days=3650),
+    'alta': timedelta(hours=72),
+    'media': timedelta(hours=24),
+    'baja': timedelta(0),
+}
+
+
+def calcular_claves(apps, schema_editor):
+    SolicitudAyuda = apps.get_model('solicitudes', 'SolicitudAyuda')
+    for urgencia, ventaja in VENTAJA_URGENCIA.items():
+        SolicitudAyuda.objects.filter(urgencia=urgencia).update(
+            clave_prioridad=models.F('fecha_creacion') - ventaja
+        )
+    SolicitudAyuda.objects.filter(clave_prioridad__isnull=True).update(
+        clave_prioridad=models.F('fecha_creacion')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0006_solicitudayuda_indices_triage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudayuda',
+            name='asignado_a',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='casos_asignados', to=settings.AUTH_USER_MODEL, verbose_name='Asignado a'),
+        ),
+        migrations.AddField(
+            model_name='solicitudayuda',
+            name='clave_prioridad',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Fecha de llegada virtual: fecha de creación adelantada según la urgencia', null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitudayuda',
+            name='fecha_asignacion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(fields=['estado', 'asignado_a', 'clave_prioridad'], name='solicitud_cola_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudayuda',
+            index=models.Index(condition=models.Q(('asignado_a__isnull', False)), fields=['asignado_a', 'fecha_asignacion'], name='solicitud_asignado_idx'),
+        ),
+        migrations.RunPython(calcular_claves, migrations.RunPython.noop),
+    ]
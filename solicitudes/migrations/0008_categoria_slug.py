@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:18
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def generar_slugs(apps, schema_editor):
+    CategoriaProblema = apps.get_model('solicitudes', 'CategoriaProblema')
+    usados = set()
+    for categoria in CategoriaProblema.objects.order_by('id'):
+        base = slugify(categoria.nombre)[:110] or 'categoria'
+        slug = base
+        sufijo = 2
+        while slug in usados:
+            slug = f'{base}-{sufijo}'
+            sufijo += 1
+        usados.add(slug)
+        categoria.slug = slug
+        categoria.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0007_cola_triage'),
+    ]
+
+    operations = [
+        # Primero sin unique para poder rellenar las filas existentes
+        migrations.AddField(
+            model_name='categoriaproblema',
+            name='slug',
+            field=models.SlugField(blank=True, db_index=False, max_length=120, null=True),
+        ),
+        migrations.RunPython(generar_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='categoriaproblema',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=120, unique=True),
+        ),
+    ]
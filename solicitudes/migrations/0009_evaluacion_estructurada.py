@@ -0,0 +1,87 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Síntomas del formulario de evaluación (value del checkbox, nombre, descripción)
+SINTOMAS_EVALUACION = [
+    ('ansiedad', 'Ansiedad o nerviosismo', 'Preocupación constante, tensión, inquietud'),
+    ('tristeza', 'Tristeza o desesperanza', 'Estado de ánimo bajo, llanto frecuente'),
+    ('irritabilidad', 'Ira o irritabilidad', 'Reacciones exageradas, enojo constante'),
+    ('culpa', 'Culpa o vergüenza', 'Sentimientos de culpabilidad constante'),
+    ('sueno', 'Problemas de sueño', 'Insomnio o sueño excesivo'),
+    ('apetito', 'Cambios en el apetito', 'Pérdida o aumento del apetito'),
+    ('fatiga', 'Fatiga o agotamiento', 'Cansancio constante, falta de energía'),
+    ('dolores', 'Dolores físicos', 'Dolores de cabeza, musculares, tensión'),
+]
+
+
+def crear_sintomas_evaluacion(apps, schema_editor):
+    CategoriaProblema = apps.get_model('solicitudes', 'CategoriaProblema')
+    Sintoma = apps.get_model('solicitudes', 'Sintoma')
+    categoria, _ = CategoriaProblema.objects.get_or_create(
+        slug='evaluacion-general',
+        defaults={
+            'nombre': 'Evaluación general',
+            'descripcion': 'Síntomas del formulario de evaluación inicial',
+        }
+    )
+    for codigo, nombre, descripcion in SINTOMAS_EVALUACION:
+        Sintoma.objects.get_or_create(
+            codigo=codigo,
+            defaults={'categoria': categoria, 'nombre': nombre, 'descripcion': descripcion}
+        )
+
+
+def eliminar_sintomas_evaluacion(apps, schema_editor):
+    CategoriaProblema = apps.get_model('solicitudes', 'CategoriaProblema')
+    Sintoma = apps.get_model('solicitudes', 'Sintoma')
+    Sintoma.objects.filter(codigo__in=[codigo for codigo, _, _ in SINTOMAS_EVALUACION]).delete()
+    CategoriaProblema.objects.filter(slug='evaluacion-general', sintoma__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0008_categoria_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sintoma',
+            name='codigo',
+            field=models.SlugField(blank=True, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='EvaluacionSintomas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('causas', models.TextField(blank=True, verbose_name='Causas (texto libre)')),
+                ('elementos_clave', models.TextField(blank=True, verbose_name='Elementos clave (texto libre)')),
+                ('observaciones', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('solicitud', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='evaluacion', to='solicitudes.solicitudayuda')),
+            ],
+            options={
+                'verbose_name': 'Evaluación de Síntomas',
+                'verbose_name_plural': 'Evaluaciones de Síntomas',
+            },
+        ),
+        migrations.CreateModel(
+            name='FactorEvaluacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('causa', 'Causa'), ('elemento', 'Elemento clave')], max_length=10)),
+                ('codigo', models.CharField(max_length=30)),
+                ('evaluacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='factores', to='solicitudes.evaluacionsintomas')),
+            ],
+            options={
+                'verbose_name': 'Factor de Evaluación',
+                'verbose_name_plural': 'Factores de Evaluación',
+                'indexes': [models.Index(fields=['tipo', 'codigo'], name='factor_tipo_codigo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('evaluacion', 'tipo', 'codigo'), name='factor_unico_por_evaluacion')],
+            },
+        ),
+        migrations.RunPython(crear_sintomas_evaluacion, eliminar_sintomas_evaluacion),
+    ]
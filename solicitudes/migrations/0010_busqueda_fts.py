@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+SQL_CREAR = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS solicitudes_busqueda USING fts5("
+    "nombre_completo, cedula, descripcion_problema, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+SQL_LLENAR = (
+    "INSERT INTO solicitudes_busqueda (rowid, nombre_completo, cedula, descripcion_problema) "
+    "SELECT id, COALESCE(nombre_completo, ''), COALESCE(cedula, ''), descripcion_problema "
+    "FROM solicitudes_solicitudayuda"
+)
+
+
+def crear_indice(apps, schema_editor):
+    # FTS5 solo existe en SQLite; con otros motores la búsqueda usa los LIKE del admin
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(SQL_CREAR)
+    schema_editor.execute(SQL_LLENAR)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS solicitudes_busqueda')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0009_evaluacion_estructurada'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0010_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstantaneaTablero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(default='global', max_length=20, unique=True)),
+                ('datos', models.JSONField(default=dict)),
+                ('generado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('segundos_calculo', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Instantánea del Tablero',
+                'verbose_name_plural': 'Instantáneas del Tablero',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0011_instantanea_tablero'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionTaxonomia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Versión de la Taxonomía',
+                'verbose_name_plural': 'Versión de la Taxonomía',
+            },
+        ),
+    ]
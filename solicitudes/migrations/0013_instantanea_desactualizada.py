@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0012_version_taxonomia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instantaneatablero',
+            name='desactualizado',
+            field=models.BooleanField(default=False, help_text='Hubo escrituras después de generarla'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Códigos creados por 0009 dentro de la categoría sintética 'evaluacion-general'
+CODIGOS_EVALUACION = ['ansiedad', 'tristeza', 'irritabilidad', 'culpa', 'sueno', 'apetito', 'fatiga', 'dolores']
+SLUG_EVALUACION = 'evaluacion-general'
+
+
+def sacar_de_categoria(apps, schema_editor):
+    """Los síntomas de la evaluación quedan sin categoría y se borra la categoría sintética"""
+    CategoriaProblema = apps.get_model('solicitudes', 'CategoriaProblema')
+    Sintoma = apps.get_model('solicitudes', 'Sintoma')
+    Sintoma.objects.filter(
+        categoria__slug=SLUG_EVALUACION, codigo__in=CODIGOS_EVALUACION
+    ).update(categoria=None)
+    # Solo si nadie la usa: ni otros síntomas ni solicitudes
+    CategoriaProblema.objects.filter(
+        slug=SLUG_EVALUACION, sintoma__isnull=True, solicitudayuda__isnull=True
+    ).delete()
+
+
+def devolver_a_categoria(apps, schema_editor):
+    CategoriaProblema = apps.get_model('solicitudes', 'CategoriaProblema')
+    Sintoma = apps.get_model('solicitudes', 'Sintoma')
+    sin_categoria = Sintoma.objects.filter(categoria__isnull=True)
+    if not sin_categoria.exists():
+        return
+    categoria, _ = CategoriaProblema.objects.get_or_create(
+        slug=SLUG_EVALUACION,
+        defaults={
+            'nombre': 'Evaluación general',
+            'descripcion': 'Síntomas del formulario de evaluación inicial',
+        }
+    )
+    # La columna vuelve a ser obligatoria: ningún síntoma puede quedar sin categoría
+    sin_categoria.update(categoria=categoria)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0013_instantanea_desactualizada'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sintoma',
+            name='categoria',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='solicitudes.categoriaproblema'),
+        ),
+        migrations.RunPython(sacar_de_categoria, devolver_a_categoria),
+    ]
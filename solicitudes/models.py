@@ -1,25 +1,55 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from datetime import timedelta
 
 class CategoriaProblema(models.Model):
     nombre = models.CharField(max_length=100)
+    # Identificador para URLs; se genera del nombre sin tildes si se deja vacío
+    slug = models.SlugField(max_length=120, unique=True, blank=True)
     descripcion = models.TextField()
     
     def __str__(self):
         return self.nombre
     
+    def generar_slug(self):
+        """Slug a partir del nombre ('Depresión Mayor' -> 'depresion-mayor'), único en la tabla"""
+        base = slugify(self.nombre)[:110] or 'categoria'
+        slug = base
+        sufijo = 2
+        otras = CategoriaProblema.objects.exclude(pk=self.pk)
+        while otras.filter(slug=slug).exists():
+            slug = f'{base}-{sufijo}'
+            sufijo += 1
+        return slug
+    
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = self.generar_slug()
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = "Categoría de Problema"
         verbose_name_plural = "Categorías de Problemas"
 
 class Sintoma(models.Model):
-    categoria = models.ForeignKey(CategoriaProblema, on_delete=models.CASCADE)
+    # Los síntomas del formulario de evaluación no pertenecen a ninguna categoría de ayuda
+    categoria = models.ForeignKey(CategoriaProblema, on_delete=models.CASCADE, null=True, blank=True)
     nombre = models.CharField(max_length=100)
+    # Valor del checkbox en la evaluación de síntomas (ej. 'ansiedad')
+    codigo = models.SlugField(max_length=50, unique=True, null=True, blank=True)
     descripcion = models.TextField()
     
     def __str__(self):
-        return f"{self.nombre} ({self.categoria.nombre})"
+        from .taxonomia import nombre_categoria
+        if self.categoria_id is None:
+            return self.nombre
+        # Desde la caché de taxonomía: evita una consulta por síntoma en selects y listados
+        categoria = nombre_categoria(self.categoria_id) or self.categoria.nombre
+        return f"{self.nombre} ({categoria})"
     
     class Meta:
         verbose_name = "Síntoma"
@@ -180,6 +210,25 @@ class SolicitudAyuda(models.Model):
         null=True
     )
     
+    # Cola de triage
+    clave_prioridad = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Fecha de llegada virtual: fecha de creación adelantada según la urgencia"
+    )
+    asignado_a = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='casos_asignados',
+        verbose_name="Asignado a",
+        # Cubierto por solicitud_cola_idx y solicitud_asignado_idx
+        db_index=False
+    )
+    fecha_asignacion = models.DateTimeField(null=True, blank=True)
+    
     # Términos y Condiciones - CAMPOS NUEVOS
     acepta_terminos = models.BooleanField(
         default=False,
@@ -191,9 +240,28 @@ class SolicitudAyuda(models.Model):
     )
     
     
+    # Ventaja de cada urgencia en la cola: un caso 'alta' se atiende como si
+    # hubiera llegado 72 horas antes. Así los casos de baja urgencia envejecen
+    # y terminan adelantando a los nuevos en lugar de esperar para siempre.
+    # Crisis siempre va primero.
+    VENTAJA_URGENCIA = {
+        'crisis': timedelta(days=3650),
+        'alta': timedelta(hours=72),
+        'media': timedelta(hours=24),
+        'baja': timedelta(0),
+    }
+    # Estados de las solicitudes que esperan a ser tomadas por un trabajador social
+    ESTADOS_EN_COLA = ['pendiente', 'atencion_inmediata']
+    
     def __str__(self):
         return f"Solicitud #{self.id} - {self.nombre_completo} - {self.urgencia}"
     
+    def calcular_clave_prioridad(self):
+        """Actualiza clave_prioridad según la fecha de creación y la urgencia"""
+        fecha = self.fecha_creacion or timezone.now()
+        self.clave_prioridad = fecha - self.VENTAJA_URGENCIA.get(self.urgencia, timedelta(0))
+        return self.clave_prioridad
+    
     def sesiones_restantes(self):
         """Retorna el número de sesiones restantes"""
         return self.max_sesiones - self.sesiones_completadas
@@ -208,12 +276,139 @@ class SolicitudAyuda(models.Model):
             return 0
         return int((self.sesiones_completadas / self.max_sesiones) * 100)
     
+    
     class Meta:
         verbose_name = "Solicitud de Ayuda"
         verbose_name_plural = "Solicitudes de Ayuda"
         ordering = ['-fecha_creacion']
+        # Índices según las consultas de triage (SQLite agrega el id al final de cada índice)
+        indexes = [
+            # buscar_solicitudes y filtros de estado del admin: estado + urgencia, recientes primero
+            models.Index(fields=['estado', 'urgencia', '-fecha_creacion'], name='solicitud_estado_urg_idx'),
+            # Filtro de estado del admin ordenado por fecha
+            models.Index(fields=['estado', '-fecha_creacion'], name='solicitud_estado_fecha_idx'),
+            # Filtro de urgencia del admin con date_hierarchy
+            models.Index(fields=['urgencia', '-fecha_creacion'], name='solicitud_urgencia_fecha_idx'),
+            # generar_reporte: rango de fechas por categoría
+            models.Index(fields=['categoria_problema', 'fecha_creacion'], name='solicitud_cat_fecha_idx'),
+            # Rango de fechas sin otros filtros y orden por defecto
+            models.Index(fields=['-fecha_creacion'], name='solicitud_fecha_idx'),
+            # Cola de triage: por cada estado, los casos sin asignar ya ordenados
+            models.Index(fields=['estado', 'asignado_a', 'clave_prioridad'], name='solicitud_cola_idx'),
+            # Casos en curso de cada trabajador
+            models.Index(
+                fields=['asignado_a', 'fecha_asignacion'],
+                condition=Q(asignado_a__isnull=False),
+                name='solicitud_asignado_idx'
+            ),
+        ]
+
+
+class EvaluacionSintomas(models.Model):
+    """Paso 3 del flujo: síntomas, causas y elementos clave de una solicitud"""
+    solicitud = models.OneToOneField(
+        SolicitudAyuda,
+        on_delete=models.CASCADE,
+        related_name='evaluacion'
+    )
+    causas = models.TextField(blank=True, verbose_name="Causas (texto libre)")
+    elementos_clave = models.TextField(blank=True, verbose_name="Elementos clave (texto libre)")
+    observaciones = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Evaluación de la solicitud #{self.solicitud_id}"
+    
+    def factores_por_tipo(self):
+        """[(etiqueta del tipo, [etiquetas de los factores])] en el orden de TIPO_CHOICES"""
+        grupos = {tipo: [] for tipo, _ in FactorEvaluacion.TIPO_CHOICES}
+        for factor in self.factores.all():
+            grupos.setdefault(factor.tipo, []).append(str(factor))
+        return [
+            (etiqueta, grupos[tipo]) for tipo, etiqueta in FactorEvaluacion.TIPO_CHOICES if grupos[tipo]
+        ]
     
     class Meta:
-        verbose_name = "Solicitud de Ayuda"
-        verbose_name_plural = "Solicitudes de Ayuda"
-        ordering = ['-fecha_creacion']
\ No newline at end of file
+        verbose_name = "Evaluación de Síntomas"
+        verbose_name_plural = "Evaluaciones de Síntomas"
+
+
+class FactorEvaluacion(models.Model):
+    """Causa o elemento clave marcado en una evaluación, para contarlos con SQL"""
+    TIPO_CHOICES = [
+        ('causa', 'Causa'),
+        ('elemento', 'Elemento clave'),
+    ]
+    
+    CAUSA_CHOICES = [
+        ('familiar', 'Problemas familiares'),
+        ('laboral', 'Problemas laborales'),
+        ('economica', 'Problemas económicos'),
+        ('salud', 'Problemas de salud'),
+        ('perdida', 'Pérdida o duelo'),
+        ('violencia', 'Violencia'),
+        ('otra', 'Otra causa'),
+    ]
+    
+    ELEMENTO_CHOICES = [
+        ('situacion_familiar', 'Situación familiar'),
+        ('red_apoyo', 'Cuenta con red de apoyo'),
+        ('sin_red_apoyo', 'Sin red de apoyo'),
+        ('recursos', 'Recursos disponibles'),
+        ('antecedentes', 'Antecedentes importantes'),
+    ]
+    
+    CODIGOS = {
+        'causa': dict(CAUSA_CHOICES),
+        'elemento': dict(ELEMENTO_CHOICES),
+    }
+    
+    evaluacion = models.ForeignKey(
+        EvaluacionSintomas,
+        on_delete=models.CASCADE,
+        related_name='factores'
+    )
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    codigo = models.CharField(max_length=30)
+    
+    def __str__(self):
+        return self.CODIGOS.get(self.tipo, {}).get(self.codigo, self.codigo)
+    
+    class Meta:
+        verbose_name = "Factor de Evaluación"
+        verbose_name_plural = "Factores de Evaluación"
+        constraints = [
+            models.UniqueConstraint(fields=['evaluacion', 'tipo', 'codigo'], name='factor_unico_por_evaluacion'),
+        ]
+        indexes = [
+            # Frecuencia de cada causa / elemento sin recorrer las evaluaciones
+            models.Index(fields=['tipo', 'codigo'], name='factor_tipo_codigo_idx'),
+        ]
+
+
+class VersionTaxonomia(models.Model):
+    """Contador de cambios de categorías y síntomas compartido por todos los procesos (una fila)"""
+    version = models.PositiveBigIntegerField(default=1)
+    
+    def __str__(self):
+        return f"Taxonomía v{self.version}"
+    
+    class Meta:
+        verbose_name = "Versión de la Taxonomía"
+        verbose_name_plural = "Versión de la Taxonomía"
+
+
+class InstantaneaTablero(models.Model):
+    """Contadores y series del panel de estadísticas, precalculados (ver tablero.py)"""
+    clave = models.CharField(max_length=20, unique=True, default='global')
+    datos = models.JSONField(default=dict)
+    generado = models.DateTimeField(default=timezone.now)
+    segundos_calculo = models.FloatField(default=0)
+    desactualizado = models.BooleanField(default=False, help_text="Hubo escrituras después de generarla")
+    
+    def __str__(self):
+        return f"Instantánea del tablero ({self.generado:%Y-%m-%d %H:%M})"
+    
+    class Meta:
+        verbose_name = "Instantánea del Tablero"
+        verbose_name_plural = "Instantáneas del Tablero"
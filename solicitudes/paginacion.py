@@ -0,0 +1,213 @@
+"""
+Paginación por cursor (keyset) para los listados de solicitudes.
+
+Cada página filtra por la clave (fecha_creacion, id) de la última fila vista
+en lugar de usar OFFSET, así la página N cuesta lo mismo que la primera
+(los índices de solicitudes terminan en fecha_creacion + id). El total solo
+se calcula si se pide explícitamente con ?contar=1.
+"""
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from sistema_triage.cursores import codificar_token, decodificar_token
+
+
+POR_PAGINA = 20
+MAX_POR_PAGINA = 100
+# Por encima de este número de filas el total mostrado es aproximado
+UMBRAL_CONTEO_EXACTO = 10000
+
+
+def codificar_cursor(fecha, id_registro):
+    """Convierte la clave (fecha, id) en un token opaco para la URL"""
+    return codificar_token({'t': fecha.isoformat(), 'i': id_registro})
+
+
+def decodificar_cursor(token):
+    """Recupera la clave (fecha, id) de un token; ValueError si es inválido"""
+    datos = decodificar_token(token)
+    try:
+        fecha = datetime.fromisoformat(datos['t'])
+        id_registro = int(datos['i'])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f'Cursor inválido: {token}') from e
+    if fecha.tzinfo is None:
+        raise ValueError(f'Cursor inválido: {token}')
+    return fecha, id_registro
+
+
+class PaginaCursor:
+    """Una página de resultados con sus cursores de navegación"""
+
+    def __init__(self, objetos, cursor_siguiente=None, cursor_anterior=None, total=None):
+        self.objetos = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.total = total
+        self.url_primera = self.url_anterior = self.url_siguiente = None
+
+    def enlazar(self, request):
+        """Enlaces de navegación que conservan los demás parámetros (por_pagina, contar...)"""
+        parametros = request.GET.copy()
+        for clave in ('despues', 'antes'):
+            parametros.pop(clave, None)
+
+        def url(**cambios):
+            nuevos = parametros.copy()
+            nuevos.update(cambios)
+            return '?' + nuevos.urlencode()
+
+        self.url_primera = url()
+        if self.tiene_anterior:
+            self.url_anterior = url(antes=self.cursor_anterior)
+        if self.tiene_siguiente:
+            self.url_siguiente = url(despues=self.cursor_siguiente)
+        return self
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def _cursor_de(objeto):
+    return codificar_cursor(objeto.fecha_creacion, objeto.id)
+
+
+def paginar_por_cursor(queryset, despues=None, antes=None, por_pagina=POR_PAGINA, contar=False):
+    """
+    Retorna una PaginaCursor del queryset, de la más reciente a la más antigua.
+
+    despues/antes son tokens de cursor: 'despues' avanza y 'antes' retrocede.
+    Lanza ValueError si el cursor no es válido.
+    """
+    por_pagina = max(1, min(por_pagina, MAX_POR_PAGINA))
+    ascendente = antes is not None
+    token = antes if ascendente else despues
+    total = queryset.count() if contar else None
+
+    filtrado = queryset
+    if token:
+        fecha, id_registro = decodificar_cursor(token)
+        op = 'gt' if ascendente else 'lt'
+        filtrado = queryset.filter(
+            Q(**{f'fecha_creacion__{op}': fecha}) |
+            Q(fecha_creacion=fecha, **{f'id__{op}': id_registro})
+        )
+
+    orden = ['fecha_creacion', 'id'] if ascendente else ['-fecha_creacion', '-id']
+    objetos = list(filtrado.order_by(*orden)[:por_pagina + 1])
+    hay_mas = len(objetos) > por_pagina
+    objetos = objetos[:por_pagina]
+
+    if ascendente:
+        if not hay_mas:
+            # No quedan suficientes filas antes del cursor: es la primera página
+            return paginar_por_cursor(queryset, por_pagina=por_pagina, contar=contar)
+        objetos.reverse()
+        return PaginaCursor(
+            objetos,
+            cursor_siguiente=_cursor_de(objetos[-1]),
+            cursor_anterior=_cursor_de(objetos[0]),
+            total=total,
+        )
+
+    return PaginaCursor(
+        objetos,
+        cursor_siguiente=_cursor_de(objetos[-1]) if hay_mas else None,
+        cursor_anterior=_cursor_de(objetos[0]) if token and objetos else None,
+        total=total,
+    )
+
+
+def pagina_desde_request(request, queryset):
+    """Lee despues/antes/por_pagina/contar de la URL; un cursor inválido vuelve a la primera página"""
+    try:
+        por_pagina = int(request.GET.get('por_pagina', POR_PAGINA))
+    except ValueError:
+        por_pagina = POR_PAGINA
+    contar = request.GET.get('contar') == '1'
+    try:
+        pagina = paginar_por_cursor(
+            queryset,
+            despues=request.GET.get('despues') or None,
+            antes=request.GET.get('antes') or None,
+            por_pagina=por_pagina,
+            contar=contar,
+        )
+    except ValueError:
+        pagina = paginar_por_cursor(queryset, por_pagina=por_pagina, contar=contar)
+    return pagina.enlazar(request)
+
+
+def estimar_filas(modelo, using='default'):
+    """
+    Número aproximado de filas de la tabla sin recorrerla. En SQLite se usa
+    sqlite_stat1 si existe (ANALYZE / PRAGMA optimize; no cuenta los huecos
+    que dejan los borrados) y si no el rowid máximo, que sobreestima cuando
+    hubo borrados. En otros motores retorna None.
+    """
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return None
+    tabla = modelo._meta.db_table
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            f'SELECT MAX(rowid), EXISTS(SELECT 1 FROM sqlite_master '
+            f"WHERE type = 'table' AND name = 'sqlite_stat1') FROM \"{tabla}\""
+        )
+        maximo, hay_estadisticas = cursor.fetchone()
+        if hay_estadisticas:
+            # El primer número de cada fila es el de filas del índice; los
+            # índices parciales tienen menos, así que se toma el mayor
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [tabla])
+            filas = [int(stat.split()[0]) for stat, in cursor.fetchall() if stat]
+            if filas:
+                return max(filas)
+    return maximo or 0
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator cuyo count no recorre la tabla completa cuando no hay filtros:
+    si estimar_filas() supera UMBRAL_CONTEO_EXACTO se usa la estimación.
+    Con filtros el conteo es exacto (los índices de triage lo resuelven).
+
+    Si la estimación se pasó del final real (la página pedida sale vacía),
+    se cuenta exacto una vez y los enlaces de páginas se recalculan.
+    """
+    umbral = UMBRAL_CONTEO_EXACTO
+    estimado = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimado = estimar_filas(queryset.model, queryset.db)
+            if estimado is not None and estimado > self.umbral:
+                self.estimado = True
+                return estimado
+        return super().count
+
+    def page(self, number):
+        pagina = super().page(number)
+        if self.estimado and pagina.number > 1 and not pagina.object_list:
+            self.estimado = False
+            self.__dict__['count'] = Paginator.count.func(self)
+            self.__dict__.pop('num_pages', None)
+            # Con el conteo exacto una página fuera de rango es EmptyPage (el admin redirige a ?e=1)
+            pagina = super().page(number)
+        return pagina
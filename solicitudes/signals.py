@@ -0,0 +1,51 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from calificaciones.estadisticas import resumen_actualizado
+from calificaciones.models import ResumenCalificaciones
+from .models import SolicitudAyuda, CategoriaProblema, Sintoma
+from .taxonomia import nueva_version
+from . import busqueda
+from .tablero import marcar_al_confirmar, marcar_desactualizado
+
+
+@receiver(pre_save, sender=SolicitudAyuda)
+def actualizar_clave_prioridad(sender, instance, **kwargs):
+    """Mantiene la posición en la cola al crear o cambiar la urgencia"""
+    instance.calcular_clave_prioridad()
+
+
+@receiver(post_save, sender=CategoriaProblema)
+@receiver(post_delete, sender=CategoriaProblema)
+@receiver(post_save, sender=Sintoma)
+@receiver(post_delete, sender=Sintoma)
+def actualizar_version_taxonomia(sender, instance, **kwargs):
+    """La versión sube en la misma transacción; los demás procesos la ven al confirmarse"""
+    nueva_version()
+
+
+@receiver(post_save, sender=SolicitudAyuda)
+def indexar_busqueda(sender, instance, created, update_fields=None, **kwargs):
+    """Mantiene el índice FTS5 en la misma transacción que la solicitud"""
+    if update_fields is not None and not set(update_fields) & set(busqueda.CAMPOS):
+        # Cambios de estado, cola o urgencia no tocan el texto indexado
+        return
+    busqueda.indexar([instance], nuevas=created)
+
+
+@receiver(post_delete, sender=SolicitudAyuda)
+def desindexar_busqueda(sender, instance, **kwargs):
+    busqueda.eliminar(instance.id)
+
+
+@receiver(post_save, sender=SolicitudAyuda)
+@receiver(post_delete, sender=SolicitudAyuda)
+def desactualizar_tablero(sender, instance, **kwargs):
+    marcar_al_confirmar()
+
+
+@receiver(resumen_actualizado, sender=ResumenCalificaciones)
+def desactualizar_tablero_por_calificaciones(sender, origen, **kwargs):
+    """El panel muestra las calificaciones de SQLite; la señal ya llega confirmada"""
+    if origen == 'sqlite':
+        marcar_desactualizado()
@@ -0,0 +1,213 @@
+"""
+Instantánea materializada del panel de estadísticas del admin.
+
+Los contadores de solicitudes, encuentros y calificaciones y la serie diaria
+por urgencia/estado se calculan con pocas consultas agrupadas y se guardan
+en una fila de InstantaneaTablero con la hora en que se generaron. La página
+de estadísticas solo lee esa fila.
+
+Las escrituras (señales, ingreso masivo, transiciones masivas, resumen de
+calificaciones) marcan la misma fila como desactualizada, así todos los
+procesos lo ven; la siguiente visita la regenera si pasó el intervalo mínimo. Además se regenera
+cuando supera la edad máxima y con el comando actualizar_tablero (cron).
+"""
+import logging
+import time
+from datetime import datetime, time as hora, timedelta
+
+from django.conf import settings
+from django.db import transaction, DatabaseError, IntegrityError
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SolicitudAyuda, InstantaneaTablero
+
+
+logger = logging.getLogger(__name__)
+
+CLAVE_INSTANTANEA = 'global'
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def dias_serie():
+    return _ajuste('TABLERO_DIAS_SERIE', 30)
+
+
+def marcar_desactualizado():
+    """Indica que hubo escrituras después de la última instantánea (un UPDATE)"""
+    InstantaneaTablero.objects.filter(
+        clave=CLAVE_INSTANTANEA, desactualizado=False
+    ).update(desactualizado=True)
+
+
+def esta_desactualizado():
+    return InstantaneaTablero.objects.filter(clave=CLAVE_INSTANTANEA, desactualizado=True).exists()
+
+
+def marcar_al_confirmar():
+    """Marca la instantánea cuando la transacción en curso se confirme"""
+    transaction.on_commit(marcar_desactualizado)
+
+
+def _solicitudes():
+    """Totales por estado y por urgencia en una consulta agrupada"""
+    por_estado = {valor: 0 for valor, _ in SolicitudAyuda.ESTADO_CHOICES}
+    por_urgencia = {valor: 0 for valor, _ in SolicitudAyuda.URGENCIA_CHOICES}
+    filas = SolicitudAyuda.objects.order_by().values_list('estado', 'urgencia').annotate(cantidad=Count('id'))
+    for estado, urgencia, cantidad in filas:
+        por_estado[estado] = por_estado.get(estado, 0) + cantidad
+        por_urgencia[urgencia] = por_urgencia.get(urgencia, 0) + cantidad
+    return por_estado, por_urgencia
+
+
+def _serie_diaria(dias):
+    """
+    Solicitudes creadas por día (hora local) en los últimos 'dias', separadas
+    por urgencia y por estado actual, en una consulta agrupada. Los días sin
+    solicitudes aparecen con ceros.
+    """
+    hoy = timezone.localdate()
+    primer_dia = hoy - timedelta(days=dias - 1)
+    inicio = timezone.make_aware(datetime.combine(primer_dia, hora.min))
+
+    serie = {}
+    for desplazamiento in range(dias):
+        dia = primer_dia + timedelta(days=desplazamiento)
+        serie[dia] = {
+            'dia': dia.isoformat(),
+            'total': 0,
+            'urgencia': {valor: 0 for valor, _ in SolicitudAyuda.URGENCIA_CHOICES},
+            'estado': {valor: 0 for valor, _ in SolicitudAyuda.ESTADO_CHOICES},
+        }
+
+    filas = SolicitudAyuda.objects.filter(fecha_creacion__gte=inicio).order_by().annotate(
+        dia=TruncDate('fecha_creacion')
+    ).values_list('dia', 'urgencia', 'estado').annotate(cantidad=Count('id'))
+    for dia, urgencia, estado, cantidad in filas:
+        punto = serie.get(dia)
+        if punto is None:
+            continue
+        punto['total'] += cantidad
+        punto['urgencia'][urgencia] = punto['urgencia'].get(urgencia, 0) + cantidad
+        punto['estado'][estado] = punto['estado'].get(estado, 0) + cantidad
+    return list(serie.values())
+
+
+def _encuentros():
+    from encuentros.models import EncuentroVirtual
+
+    por_estado = {valor: 0 for valor, _ in EncuentroVirtual.ESTADO_CHOICES}
+    filas = EncuentroVirtual.objects.order_by().values_list('estado').annotate(cantidad=Count('id'))
+    for estado, cantidad in filas:
+        por_estado[estado] = por_estado.get(estado, 0) + cantidad
+    return por_estado
+
+
+def calcular_datos(dias=None):
+    """Dict serializable con todos los contadores del panel (cuatro consultas)"""
+    from calificaciones.estadisticas import resumen_origen
+
+    solicitudes_por_estado, solicitudes_por_urgencia = _solicitudes()
+    encuentros_por_estado = _encuentros()
+    calificaciones = resumen_origen('sqlite')
+    return {
+        'total_solicitudes': sum(solicitudes_por_estado.values()),
+        'solicitudes_por_estado': solicitudes_por_estado,
+        'solicitudes_por_urgencia': solicitudes_por_urgencia,
+        'total_encuentros': sum(encuentros_por_estado.values()),
+        'encuentros_por_estado': encuentros_por_estado,
+        'total_calificaciones': calificaciones.total,
+        'promedio_calificaciones': calificaciones.promedio if calificaciones.total else None,
+        'serie': _serie_diaria(dias or dias_serie()),
+    }
+
+
+def actualizar_instantanea(dias=None):
+    """Recalcula y guarda la instantánea; retorna la fila guardada"""
+    # Se limpia antes de calcular: una escritura concurrente la vuelve a marcar
+    # y update_or_create solo guarda los campos de 'valores', no la pisa
+    InstantaneaTablero.objects.filter(clave=CLAVE_INSTANTANEA).update(desactualizado=False)
+    inicio = time.monotonic()
+    datos = calcular_datos(dias)
+    valores = {
+        'datos': datos,
+        'generado': timezone.now(),
+        'segundos_calculo': time.monotonic() - inicio,
+    }
+    try:
+        with transaction.atomic():
+            instantanea, _ = InstantaneaTablero.objects.update_or_create(
+                clave=CLAVE_INSTANTANEA, defaults=valores
+            )
+    except IntegrityError:
+        # Otro proceso la creó al mismo tiempo; sus datos son igual de recientes
+        instantanea = InstantaneaTablero(clave=CLAVE_INSTANTANEA, **valores)
+    return instantanea
+
+
+def necesita_actualizarse(instantanea, ahora=None):
+    if instantanea is None:
+        return True
+    edad = ((ahora or timezone.now()) - instantanea.generado).total_seconds()
+    if edad >= _ajuste('TABLERO_EDAD_MAXIMA_SEGUNDOS', 900):
+        return True
+    return instantanea.desactualizado and edad >= _ajuste('TABLERO_INTERVALO_MINIMO_SEGUNDOS', 30)
+
+
+def obtener_instantanea(forzar=False):
+    """La instantánea vigente (una lectura); la regenera si está vencida o desactualizada"""
+    instantanea = InstantaneaTablero.objects.filter(clave=CLAVE_INSTANTANEA).first()
+    if forzar or necesita_actualizarse(instantanea):
+        try:
+            instantanea = actualizar_instantanea()
+        except DatabaseError:
+            if instantanea is None:
+                raise
+            logger.exception('No se pudo actualizar el tablero, se muestra la última instantánea')
+    return instantanea
+
+
+def contexto_tablero(instantanea):
+    """Variables de la plantilla admin/estadisticas.html a partir de la instantánea"""
+    from encuentros.models import EncuentroVirtual
+
+    datos = instantanea.datos
+    urgencias = SolicitudAyuda.URGENCIA_CHOICES
+    estados = SolicitudAyuda.ESTADO_CHOICES
+    # Del día más reciente al más antiguo, con columnas en el orden de los choices
+    filas_serie = [
+        {
+            'dia': punto['dia'],
+            'total': punto['total'],
+            'urgencia': [punto['urgencia'].get(valor, 0) for valor, _ in urgencias],
+            'estado': [punto['estado'].get(valor, 0) for valor, _ in estados],
+        }
+        for punto in reversed(datos.get('serie', []))
+    ]
+    return {
+        'total_solicitudes': datos['total_solicitudes'],
+        'solicitudes_pendientes': datos['solicitudes_por_estado'].get('pendiente', 0),
+        'solicitudes_completadas': datos['solicitudes_por_estado'].get('completado', 0),
+        'solicitudes_por_estado': [
+            (etiqueta, datos['solicitudes_por_estado'].get(valor, 0)) for valor, etiqueta in estados
+        ],
+        'solicitudes_por_urgencia': [
+            (etiqueta, datos['solicitudes_por_urgencia'].get(valor, 0)) for valor, etiqueta in urgencias
+        ],
+        'total_encuentros': datos['total_encuentros'],
+        'encuentros_programados': datos['encuentros_por_estado'].get('programado', 0),
+        'encuentros_por_estado': [
+            (etiqueta, datos['encuentros_por_estado'].get(valor, 0))
+            for valor, etiqueta in EncuentroVirtual.ESTADO_CHOICES
+        ],
+        'total_calificaciones': datos['total_calificaciones'],
+        'promedio_calificaciones': datos['promedio_calificaciones'],
+        'columnas_urgencia': [etiqueta for _, etiqueta in urgencias],
+        'columnas_estado': [etiqueta for _, etiqueta in estados],
+        'serie_diaria': filas_serie,
+        'tablero_generado': instantanea.generado,
+    }
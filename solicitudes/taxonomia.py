@@ -0,0 +1,174 @@
+"""
+Caché versionada de la taxonomía de categorías y síntomas.
+
+La taxonomía cambia muy poco y se lee en cada formulario, listado del admin
+y página de categoría. Cada proceso guarda una copia en tuplas compactas
+(cargada con dos consultas) junto al número de versión con que se leyó. El
+número vive en la fila de VersionTaxonomia y se incrementa, en la misma
+transacción, al guardar o eliminar una categoría o un síntoma (ver
+signals.py). Cada proceso relee el número como máximo cada
+TAXONOMIA_VERIFICAR_SEGUNDOS; si ya no coincide con el local, la copia se
+recarga. Las búsquedas que fallan en la copia local se confirman en la BD
+antes de responder que algo no existe.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import CategoriaProblema, Sintoma, VersionTaxonomia
+
+
+Categoria = namedtuple('Categoria', 'id nombre slug descripcion cantidad_sintomas')
+SintomaItem = namedtuple('SintomaItem', 'id nombre codigo categoria_id')
+
+
+class Taxonomia:
+    """Copia inmutable de la taxonomía en una versión dada"""
+
+    def __init__(self, version, categorias, sintomas):
+        self.version = version
+        self.categorias = {categoria.id: categoria for categoria in categorias}
+        self.sintomas = {sintoma.id: sintoma for sintoma in sintomas}
+        self.por_slug = {categoria.slug: categoria for categoria in categorias}
+        self.por_codigo = {sintoma.codigo: sintoma for sintoma in sintomas if sintoma.codigo}
+        sintomas_por_categoria = {}
+        for sintoma in sintomas:
+            sintomas_por_categoria.setdefault(sintoma.categoria_id, []).append(sintoma)
+        self.sintomas_por_categoria = {
+            categoria_id: tuple(lista) for categoria_id, lista in sintomas_por_categoria.items()
+        }
+
+
+_lock = threading.Lock()
+_actual = None
+# time.monotonic() de la última lectura de VersionTaxonomia en este proceso
+_verificada_en = None
+
+
+def _intervalo_verificacion():
+    return getattr(settings, 'TAXONOMIA_VERIFICAR_SEGUNDOS', 5)
+
+
+def _version_compartida():
+    """Versión de la BD (una consulta); 0 si todavía no hubo cambios"""
+    version = VersionTaxonomia.objects.values_list('version', flat=True).order_by('pk').first()
+    return version or 0
+
+
+def _cargar(version):
+    sintomas = [
+        SintomaItem(*fila)
+        for fila in Sintoma.objects.order_by('categoria_id', 'nombre').values_list(
+            'id', 'nombre', 'codigo', 'categoria_id'
+        )
+    ]
+    cantidades = {}
+    for sintoma in sintomas:
+        cantidades[sintoma.categoria_id] = cantidades.get(sintoma.categoria_id, 0) + 1
+    categorias = [
+        Categoria(*fila, cantidades.get(fila[0], 0))
+        for fila in CategoriaProblema.objects.order_by('nombre').values_list(
+            'id', 'nombre', 'slug', 'descripcion'
+        )
+    ]
+    return Taxonomia(version, categorias, sintomas)
+
+
+def taxonomia(forzar=False):
+    """
+    Taxonomía vigente. Dentro del intervalo de verificación no hace consultas;
+    después lee la versión y recarga solo si cambió (o con forzar=True).
+    """
+    global _actual, _verificada_en
+    actual = _actual
+    ahora = time.monotonic()
+    if (not forzar and actual is not None and _verificada_en is not None
+            and ahora - _verificada_en < _intervalo_verificacion()):
+        return actual
+
+    version = _version_compartida()
+    with _lock:
+        if forzar or _actual is None or _actual.version != version:
+            _actual = _cargar(version)
+        _verificada_en = ahora
+        return _actual
+
+
+def nueva_version():
+    """
+    Marca la taxonomía como modificada en todos los procesos. Se llama dentro
+    de la transacción del cambio: si se revierte, también se revierte la versión.
+    """
+    if not VersionTaxonomia.objects.update(version=F('version') + 1):
+        VersionTaxonomia.objects.create(version=1)
+    descartar_copia_local()
+
+
+def descartar_copia_local():
+    """La próxima lectura de este proceso vuelve a la BD"""
+    global _actual, _verificada_en
+    with _lock:
+        _actual = None
+        _verificada_en = None
+
+
+def categoria_por_slug(slug):
+    """
+    Categoria del slug o None si no existe. Si la copia local no lo tiene pero
+    la categoría sí está en la BD (creada o renombrada en otro proceso), se
+    recarga la taxonomía en lugar de responder 404.
+    """
+    categoria = taxonomia().por_slug.get(slug)
+    if categoria is None and CategoriaProblema.objects.filter(slug=slug).exists():
+        categoria = taxonomia(forzar=True).por_slug.get(slug)
+    return categoria
+
+
+def categoria_por_id(categoria_id):
+    """Categoria del id o None; un id desconocido localmente se confirma en la BD"""
+    categoria = taxonomia().categorias.get(categoria_id)
+    if categoria is None and CategoriaProblema.objects.filter(pk=categoria_id).exists():
+        categoria = taxonomia(forzar=True).categorias.get(categoria_id)
+    return categoria
+
+
+def cantidad_sintomas(categoria_id):
+    categoria = categoria_por_id(categoria_id)
+    return categoria.cantidad_sintomas if categoria else 0
+
+
+def nombre_categoria(categoria_id):
+    categoria = categoria_por_id(categoria_id)
+    return categoria.nombre if categoria else None
+
+
+def sintomas_con_recarga(ids=(), codigos=()):
+    """
+    Taxonomía que contiene los síntomas indicados por id o código, si existen.
+    Solo consulta la BD cuando alguno falta en la copia local.
+    """
+    actual = taxonomia()
+    faltan_ids = [i for i in ids if i not in actual.sintomas]
+    faltan_codigos = [codigo for codigo in codigos if codigo not in actual.por_codigo]
+    if faltan_ids or faltan_codigos:
+        existen = Sintoma.objects.filter(pk__in=faltan_ids).exists() or (
+            bool(faltan_codigos) and Sintoma.objects.filter(codigo__in=faltan_codigos).exists()
+        )
+        if existen:
+            actual = taxonomia(forzar=True)
+    return actual
+
+
+def nombres_sintomas(ids):
+    """Nombres de los síntomas indicados, en el mismo orden, omitiendo los que no existan"""
+    sintomas = sintomas_con_recarga(ids=ids).sintomas
+    return [sintomas[i].nombre for i in ids if i in sintomas]
+
+
+def sintomas_por_codigo(codigos):
+    """Ids de los síntomas con esos códigos de formulario; los desconocidos se ignoran"""
+    por_codigo = sintomas_con_recarga(codigos=codigos).por_codigo
+    return [por_codigo[codigo].id for codigo in codigos if codigo in por_codigo]
@@ -1,6 +1,31 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, DatabaseError
+from django.db.models import F
 from django.urls import reverse
-from .models import SolicitudAyuda
+from django.core.paginator import EmptyPage
+from django.core.cache import cache
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.utils import timezone
+from .models import SolicitudAyuda, CategoriaProblema, Sintoma, EvaluacionSintomas
+from .paginacion import paginar_por_cursor, PaginadorEstimado, estimar_filas
+from .taxonomia import nueva_version, taxonomia, cantidad_sintomas, nombre_categoria
+from .cola import proximos_casos, tomar_siguiente_caso, liberar_caso
+from .ingreso import ingresar_remisiones
+from .evaluacion import frecuencia_sintomas, frecuencia_factores
+from . import busqueda
+from .transiciones import transicionar, derivar_a_encuentros, SinTrabajadoresDisponibles
+from . import tablero
+from .models import InstantaneaTablero, VersionTaxonomia
+from encuentros.models import TrabajadorSocial, EncuentroVirtual
+from encuentros.disponibilidad import invalidar_registro, trabajadores_disponibles
+from calificaciones.estadisticas import reconstruir_resumen
+from calificaciones.models import CalificacionSQLite
+from django.contrib.auth.models import User
+from .management.commands.benchmark_indices_solicitudes import consultas_triage, usa_indice
 
 class SolicitudAyudaTestCase(TestCase):
     
@@ -76,4 +101,793 @@ class EncuentrosTestCase(TestCase):
     def test_url_lista_encuentros(self):
         """Test: Verificar que la lista de encuentros carga"""
         response = self.client.get(reverse('encuentros:lista_encuentros'))
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+
+class ReporteTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = Client()
+        self.categoria = CategoriaProblema.objects.create(nombre="Ansiedad", descripcion="Ansiedad")
+        for i in range(3):
+            SolicitudAyuda.objects.create(
+                nombre_completo=f"Usuario {i}",
+                cedula="123456789",
+                descripcion_problema="Problema de prueba",
+                categoria_problema=self.categoria if i else None,
+            )
+    
+    def _staff(self):
+        User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.login(username='staff', password='testpass123')
+    
+    def test_exportacion_requiere_staff(self):
+        """Test: Un anónimo no puede descargar el reporte completo"""
+        for formato in ('csv', 'jsonl'):
+            response = self.client.get(reverse('solicitudes:generar_reporte'), {'formato': formato})
+            self.assertEqual(response.status_code, 302)
+            self.assertFalse(response.streaming)
+        self.assertNotContains(self.client.get(reverse('solicitudes:generar_reporte')), 'formato=csv')
+    
+    def test_reporte_csv_en_streaming(self):
+        """Test: El CSV se entrega como StreamingHttpResponse sin datos de contacto"""
+        self._staff()
+        response = self.client.get(reverse('solicitudes:generar_reporte'), {'formato': 'csv'})
+        self.assertTrue(response.streaming)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 4)
+        self.assertTrue(lineas[0].startswith('id,fecha_creacion'))
+        self.assertNotIn('123456789', ''.join(lineas))
+    
+    def test_reporte_jsonl_filtrado(self):
+        """Test: JSONL respeta los filtros del reporte"""
+        self._staff()
+        response = self.client.get(
+            reverse('solicitudes:generar_reporte'),
+            {'formato': 'jsonl', 'categoria': self.categoria.id}
+        )
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[0]['categoria'], 'Ansiedad')
+    
+    def test_reporte_html_paginado(self):
+        """Test: El reporte HTML muestra solo una página"""
+        with mock.patch('solicitudes.views.POR_PAGINA_REPORTE', 2):
+            response = self.client.get(reverse('solicitudes:generar_reporte'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], 3)
+        self.assertEqual(len(response.context['solicitudes']), 2)
+        self.assertTrue(response.context['page_obj'].has_next())
+    
+    def test_consultas_de_triage_usan_indices(self):
+        """Test: Ninguna consulta de triage recorre la tabla completa"""
+        ahora = timezone.now()
+        for nombre, queryset in consultas_triage(self.categoria, ahora - timedelta(days=30), ahora):
+            plan = queryset.explain()
+            self.assertTrue(usa_indice(plan), f'{nombre}: {plan}')
+
+
+class PaginacionCursorTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: varias solicitudes con la misma fecha"""
+        self.client = Client()
+        SolicitudAyuda.objects.bulk_create([
+            SolicitudAyuda(descripcion_problema=f"Problema {i}", estado='pendiente', urgencia='alta')
+            for i in range(7)
+        ])
+        self.ids = list(
+            SolicitudAyuda.objects.order_by('-fecha_creacion', '-id').values_list('id', flat=True)
+        )
+    
+    def test_recorrer_paginas_sin_offset(self):
+        """Test: Avanzar y retroceder por cursor sin OFFSET ni COUNT"""
+        queryset = SolicitudAyuda.objects.all()
+        vistos = []
+        pagina = paginar_por_cursor(queryset, por_pagina=3)
+        while True:
+            vistos.extend(s.id for s in pagina)
+            if not pagina.tiene_siguiente:
+                break
+            with self.assertNumQueries(1) as consultas:
+                pagina = paginar_por_cursor(queryset, despues=pagina.cursor_siguiente, por_pagina=3)
+            sql = consultas.captured_queries[0]['sql']
+            self.assertNotIn('OFFSET', sql)
+            self.assertNotIn('COUNT', sql)
+        self.assertEqual(vistos, self.ids)
+        
+        anterior = paginar_por_cursor(queryset, antes=pagina.cursor_anterior, por_pagina=3)
+        self.assertEqual([s.id for s in anterior], self.ids[3:6])
+    
+    def test_vista_busqueda_paginada(self):
+        """Test: buscar_solicitudes devuelve una página acotada y cuenta solo si se pide"""
+        url = reverse('solicitudes:buscar_solicitudes', args=['pendiente', 'alta'])
+        response = self.client.get(url, {'por_pagina': 5})
+        self.assertEqual(len(response.context['solicitudes']), 5)
+        self.assertIsNone(response.context['pagina'].total)
+        
+        response = self.client.get(url, {'despues': response.context['pagina'].cursor_siguiente, 'contar': '1'})
+        self.assertEqual(len(response.context['solicitudes']), 2)
+        self.assertEqual(response.context['pagina'].total, 7)
+    
+    def test_enlaces_conservan_parametros(self):
+        """Test: Siguiente/Anterior mantienen por_pagina y contar"""
+        url = reverse('solicitudes:buscar_solicitudes', args=['pendiente', 'alta'])
+        pagina = self.client.get(url, {'por_pagina': 3, 'contar': '1'}).context['pagina']
+        self.assertIn('por_pagina=3', pagina.url_siguiente)
+        self.assertIn('contar=1', pagina.url_siguiente)
+        
+        response = self.client.get(url + pagina.url_siguiente)
+        self.assertEqual(len(response.context['solicitudes']), 3)
+        pagina = response.context['pagina']
+        self.assertNotIn('despues=', pagina.url_anterior)
+        self.assertIn('por_pagina=3', pagina.url_anterior)
+        self.assertEqual(pagina.url_primera, '?por_pagina=3&contar=1')
+        self.assertContains(response, f'href="{pagina.url_siguiente.replace("&", "&amp;")}"')
+    
+    def test_cursor_invalido_vuelve_al_inicio(self):
+        """Test: Un cursor alterado muestra la primera página"""
+        url = reverse('solicitudes:buscar_solicitudes', args=['pendiente', 'alta'])
+        response = self.client.get(url, {'despues': 'no-es-un-cursor'})
+        self.assertEqual(response.context['solicitudes'][0].id, self.ids[0])
+
+
+class ColaTriageTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: casos de distintas urgencias y antigüedad"""
+        self.trabajador = User.objects.create_user('trabajador', password='clave-segura-123', is_staff=True)
+        self.otro = User.objects.create_user('otro', password='clave-segura-123', is_staff=True)
+        ahora = timezone.now()
+        self.casos = {}
+        for nombre, urgencia, horas in [
+            ('baja_vieja', 'baja', 30), ('media_nueva', 'media', 1),
+            ('alta', 'alta', 2), ('crisis', 'crisis', 0), ('baja_nueva', 'baja', 0),
+        ]:
+            solicitud = SolicitudAyuda.objects.create(descripcion_problema=nombre, urgencia=urgencia)
+            SolicitudAyuda.objects.filter(pk=solicitud.pk).update(
+                fecha_creacion=ahora - timedelta(hours=horas)
+            )
+            solicitud.refresh_from_db()
+            solicitud.save()
+            self.casos[nombre] = solicitud
+    
+    def test_orden_por_urgencia_y_espera(self):
+        """Test: Crisis primero; una baja que espera más de un día adelanta a una media nueva"""
+        SolicitudAyuda.objects.filter(pk=self.casos['crisis'].pk).update(estado='atencion_inmediata')
+        with self.assertNumQueries(2):
+            orden = [s.descripcion_problema for s in proximos_casos(10)]
+        self.assertEqual(orden, ['crisis', 'alta', 'baja_vieja', 'media_nueva', 'baja_nueva'])
+    
+    def test_tomar_caso_no_se_repite(self):
+        """Test: Dos trabajadores reciben casos distintos"""
+        primero = tomar_siguiente_caso(self.trabajador)
+        segundo = tomar_siguiente_caso(self.otro)
+        self.assertEqual(primero.descripcion_problema, 'crisis')
+        self.assertEqual(primero.estado, 'evaluando')
+        self.assertEqual(segundo.descripcion_problema, 'alta')
+        self.assertEqual(segundo.estado, 'evaluando')
+        self.assertEqual(segundo.asignado_a, self.otro)
+    
+    def test_caso_ganado_por_otro_se_salta(self):
+        """Test: Si el candidato ya fue tomado se asigna el siguiente"""
+        # La lista de candidatos se leyó antes de que otro trabajador tomara la crisis
+        candidatos = proximos_casos(5)
+        SolicitudAyuda.objects.filter(pk=self.casos['crisis'].pk).update(asignado_a=self.otro)
+        with mock.patch('solicitudes.cola.proximos_casos', side_effect=[candidatos, proximos_casos(5)]):
+            caso = tomar_siguiente_caso(self.trabajador)
+        self.assertEqual(caso.descripcion_problema, 'alta')
+    
+    def test_liberar_conserva_posicion(self):
+        """Test: Un caso liberado vuelve a su lugar en la cola"""
+        caso = tomar_siguiente_caso(self.trabajador)
+        self.assertTrue(liberar_caso(caso))
+        self.assertEqual(proximos_casos(1)[0].pk, caso.pk)
+    
+    def test_vista_tomar_siguiente(self):
+        """Test: La vista asigna el caso y lleva al admin"""
+        self.client.force_login(self.trabajador)
+        response = self.client.post(reverse('solicitudes:tomar_siguiente'))
+        self.assertRedirects(
+            response,
+            reverse('custom_admin:solicitudes_solicitudayuda_change', args=[self.casos['crisis'].id]),
+            fetch_redirect_response=False
+        )
+        self.assertEqual(self.client.get(reverse('solicitudes:cola_triage')).status_code, 200)
+
+
+class CategoriaSlugTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: categoría con tildes"""
+        self.client = Client()
+        nueva_version()
+        self.categoria = CategoriaProblema.objects.create(
+            nombre="Depresión Mayor", descripcion="Tristeza persistente"
+        )
+        SolicitudAyuda.objects.create(
+            descripcion_problema="Problema de prueba", categoria_problema=self.categoria
+        )
+    
+    def test_slug_sin_tildes_y_unico(self):
+        """Test: El slug se genera del nombre y no se repite"""
+        self.assertEqual(self.categoria.slug, 'depresion-mayor')
+        otra = CategoriaProblema.objects.create(nombre="Depresion mayor", descripcion="")
+        self.assertEqual(otra.slug, 'depresion-mayor-2')
+    
+    def test_pagina_categoria_una_consulta(self):
+        """Test: Con el mapa cargado la página solo consulta SolicitudAyuda"""
+        url = reverse('solicitudes:solicitudes_por_categoria', args=['depresion-mayor'])
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Depresión Mayor')
+        self.assertEqual(len(response.context['solicitudes']), 1)
+    
+    def test_mapa_se_invalida_al_guardar(self):
+        """Test: Renombrar el slug deja de resolver el anterior"""
+        url = reverse('solicitudes:solicitudes_por_categoria', args=['depresion-mayor'])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria.slug = 'depresion'
+            self.categoria.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        nueva = reverse('solicitudes:solicitudes_por_categoria', args=['depresion'])
+        self.assertEqual(self.client.get(nueva).status_code, 200)
+
+    
+    def test_slug_nuevo_de_otro_proceso(self):
+        """Test: Un slug que la copia local no conoce se busca en la BD antes del 404"""
+        url = reverse('solicitudes:solicitudes_por_categoria', args=['depresion-mayor'])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Cambio hecho por otro proceso: no pasa por las señales de este
+        CategoriaProblema.objects.filter(pk=self.categoria.pk).update(slug='depresion')
+        nueva = reverse('solicitudes:solicitudes_por_categoria', args=['depresion'])
+        self.assertEqual(self.client.get(nueva).status_code, 200)
+        inexistente = reverse('solicitudes:solicitudes_por_categoria', args=['no-existe'])
+        self.assertEqual(self.client.get(inexistente).status_code, 404)
+    
+    def test_taxonomia_sin_consultas_por_sintoma(self):
+        """Test: Nombres y conteos de síntomas salen de la caché versionada"""
+        with self.captureOnCommitCallbacks(execute=True):
+            sintomas = [
+                Sintoma.objects.create(categoria=self.categoria, nombre=f"Síntoma {i}", descripcion="")
+                for i in range(3)
+            ]
+        taxonomia()
+        with self.assertNumQueries(0):
+            textos = [str(sintoma) for sintoma in sintomas]
+            self.assertEqual(cantidad_sintomas(self.categoria.id), 3)
+        self.assertEqual(textos[0], "Síntoma 0 (Depresión Mayor)")
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            sintomas[0].delete()
+        with self.assertNumQueries(3):
+            # Versión nueva: lectura de la versión y recarga de categorías y síntomas
+            self.assertEqual(cantidad_sintomas(self.categoria.id), 2)
+    
+    def test_cambio_en_otro_proceso(self):
+        """Test: Un proceso que no hizo el cambio lo ve al vencer el intervalo de verificación"""
+        taxonomia()
+        # Otro proceso renombra la categoría: sube la versión en la BD pero no toca esta copia
+        CategoriaProblema.objects.filter(pk=self.categoria.pk).update(nombre="Duelo")
+        VersionTaxonomia.objects.update(version=F('version') + 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(nombre_categoria(self.categoria.id), "Depresión Mayor")
+        with override_settings(TAXONOMIA_VERIFICAR_SEGUNDOS=0):
+            self.assertEqual(nombre_categoria(self.categoria.id), "Duelo")
+            with self.assertNumQueries(1):
+                # Misma versión: solo se relee el número
+                taxonomia()
+
+
+@override_settings(INGRESO_MASIVO_TOKENS=['token-aliado'])
+class IngresoMasivoTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: taxonomía y una remisión válida"""
+        self.client = Client()
+        nueva_version()
+        self.categoria = CategoriaProblema.objects.create(nombre="Ansiedad", descripcion="")
+        self.sintomas = [
+            Sintoma.objects.create(categoria=self.categoria, nombre=f"Síntoma {i}", descripcion="")
+            for i in range(2)
+        ]
+        nueva_version()
+        self.remision = {
+            'nombre_completo': 'Persona Remitida',
+            'cedula': '123456789',
+            'edad': 30,
+            'celular': '3001234567',
+            'correo_electronico': 'remitida@ejemplo.com',
+            'urgencia': 'alta',
+            'descripcion_problema': 'Remitida por entidad aliada',
+            'acepta_terminos': True,
+            'acepta_tratamiento_datos': True,
+            'categoria': 'ansiedad',
+            'sintomas': [s.id for s in self.sintomas],
+        }
+    
+    def test_lote_con_consultas_constantes(self):
+        """Test: Un lote se inserta con bulk_create sin consultas por fila"""
+        taxonomia()
+        filas = [dict(self.remision, cedula=str(i)) for i in range(20)]
+        with self.assertNumQueries(5):
+            # SAVEPOINT + INSERT solicitudes + INSERT síntomas + INSERT índice de búsqueda + RELEASE
+            resultado = ingresar_remisiones(filas)
+        self.assertEqual(resultado.creadas, 20)
+        solicitud = SolicitudAyuda.objects.get(id=resultado.filas[0]['id'])
+        self.assertEqual(solicitud.sintomas_seleccionados.count(), 2)
+        self.assertEqual(solicitud.categoria_problema_id, self.categoria.id)
+        self.assertEqual(solicitud.estado, 'pendiente')
+        self.assertIsNotNone(solicitud.clave_prioridad)
+    
+    def test_endpoint_resultados_por_fila(self):
+        """Test: El endpoint JSONL reporta cada fila aceptada o rechazada"""
+        invalida = dict(self.remision, acepta_terminos=False, sintomas=[999])
+        cuerpo = '\n'.join(json.dumps(fila) for fila in [self.remision, invalida, self.remision])
+        response = self.client.post(
+            reverse('solicitudes:ingreso_masivo'), cuerpo,
+            content_type='application/x-ndjson', HTTP_AUTHORIZATION='Token token-aliado'
+        )
+        self.assertEqual(response.status_code, 201)
+        datos = response.json()
+        self.assertEqual((datos['creadas'], datos['rechazadas']), (2, 1))
+        self.assertFalse(datos['resultados'][1]['ok'])
+        self.assertIn('acepta_terminos', datos['resultados'][1]['errores'])
+        self.assertIn('sintomas', datos['resultados'][1]['errores'])
+    
+    def test_endpoint_cuerpo_invalido(self):
+        """Test: Un cuerpo que no es UTF-8 o JSON válido responde 400, no 500"""
+        url = reverse('solicitudes:ingreso_masivo')
+        cuerpo = json.dumps(self.remision).encode() + b'\n\xff\xfe{"nombre": "\xe9"}'
+        for content_type in ('application/x-ndjson', 'application/json'):
+            response = self.client.post(
+                url, cuerpo, content_type=content_type, HTTP_AUTHORIZATION='Token token-aliado'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+        self.assertFalse(SolicitudAyuda.objects.exists())
+    
+    def test_endpoint_requiere_token(self):
+        """Test: Sin token válido no se ingresa nada"""
+        response = self.client.post(
+            reverse('solicitudes:ingreso_masivo'), json.dumps([self.remision]),
+            content_type='application/json', HTTP_AUTHORIZATION='Token otro'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(SolicitudAyuda.objects.exists())
+    
+    def test_sesion_staff_sin_csrf_rechazada(self):
+        """Test: Un POST de otro sitio con la sesión de un staff no pasa (CSRF)"""
+        User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.login(username='staff', password='testpass123')
+        url = reverse('solicitudes:ingreso_masivo')
+        for content_type in ('text/plain', 'application/json'):
+            response = cliente.post(url, json.dumps([self.remision]), content_type=content_type)
+            self.assertEqual(response.status_code, 403)
+        self.assertFalse(SolicitudAyuda.objects.exists())
+        
+        # Con token la petición sigue exenta de CSRF
+        response = cliente.post(
+            url, json.dumps([self.remision]),
+            content_type='application/json', HTTP_AUTHORIZATION='Token token-aliado'
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class EvaluacionSintomasTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = Client()
+        nueva_version()
+        self.solicitudes = [
+            SolicitudAyuda.objects.create(descripcion_problema=f"Problema {i}") for i in range(2)
+        ]
+    
+    def _evaluar(self, solicitud, **datos):
+        return self.client.post(
+            reverse('solicitudes:evaluacion_sintomas', args=[solicitud.id]),
+            {'causas': 'Texto libre', **datos}
+        )
+    
+    def test_evaluacion_estructurada(self):
+        """Test: Síntomas y factores se guardan en tablas, no en informacion_adicional"""
+        response = self._evaluar(
+            self.solicitudes[0],
+            sintomas=['ansiedad', 'sueno', 'desconocido'],
+            factores_causa=['familiar', 'economica', 'inventada'],
+            factores_elemento=['red_apoyo'],
+        )
+        self.assertEqual(response.status_code, 302)
+        solicitud = self.solicitudes[0]
+        solicitud.refresh_from_db()
+        self.assertIsNone(solicitud.informacion_adicional)
+        self.assertEqual(
+            sorted(solicitud.sintomas_seleccionados.values_list('codigo', flat=True)),
+            ['ansiedad', 'sueno']
+        )
+        evaluacion = EvaluacionSintomas.objects.get(solicitud=solicitud)
+        self.assertEqual(evaluacion.causas, 'Texto libre')
+        self.assertEqual(evaluacion.factores.count(), 3)
+    
+    def test_frecuencias_en_una_consulta(self):
+        """Test: Las frecuencias de síntomas y causas son agregados SQL"""
+        self._evaluar(self.solicitudes[0], sintomas=['ansiedad'], factores_causa=['familiar'])
+        self._evaluar(self.solicitudes[1], sintomas=['ansiedad', 'fatiga'], factores_causa=['familiar', 'salud'])
+        with self.assertNumQueries(1):
+            sintomas = frecuencia_sintomas()
+        self.assertEqual(sintomas[0][1:], ('Ansiedad o nerviosismo', 2))
+        with self.assertNumQueries(1):
+            causas = frecuencia_factores('causa')
+        self.assertEqual(causas[0], ('familiar', 'Problemas familiares', 2))
+    
+    def test_sintomas_de_evaluacion_sin_categoria_publica(self):
+        """Test: Los síntomas del formulario no crean una categoría de ayuda visible"""
+        self.assertFalse(CategoriaProblema.objects.filter(slug='evaluacion-general').exists())
+        sintoma = Sintoma.objects.get(codigo='ansiedad')
+        self.assertIsNone(sintoma.categoria_id)
+        self.assertEqual(str(sintoma), 'Ansiedad o nerviosismo')
+        self.assertNotIn(None, taxonomia().categorias)
+    
+    def test_reenvio_reemplaza_sintomas(self):
+        """Test: Reenviar la evaluación con menos síntomas elimina los anteriores"""
+        solicitud = self.solicitudes[0]
+        self._evaluar(solicitud, sintomas=['ansiedad', 'sueno'])
+        self._evaluar(solicitud, sintomas=['fatiga'])
+        self.assertEqual(
+            list(solicitud.sintomas_seleccionados.values_list('codigo', flat=True)),
+            ['fatiga']
+        )
+    
+    def test_admin_muestra_evaluacion(self):
+        """Test: La ficha de la solicitud en el admin muestra la evaluación en solo lectura"""
+        solicitud = self.solicitudes[0]
+        self._evaluar(
+            solicitud, observaciones='Seguimiento semanal',
+            factores_causa=['familiar'], factores_elemento=['red_apoyo']
+        )
+        User.objects.create_superuser(username='admin', password='testpass123', email='a@b.com')
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(
+            reverse('custom_admin:solicitudes_solicitudayuda_change', args=[solicitud.id])
+        )
+        self.assertContains(response, 'Seguimiento semanal')
+        self.assertContains(response, 'Problemas familiares')
+        self.assertContains(response, 'Cuenta con red de apoyo')
+        self.assertNotContains(response, 'name="evaluacion-0-observaciones"')
+
+
+class BusquedaTextoTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = Client()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.maria = SolicitudAyuda.objects.create(
+            nombre_completo="María Pérez", cedula="1020304050",
+            descripcion_problema="Ansiedad por pérdida del empleo"
+        )
+        self.jose = SolicitudAyuda.objects.create(
+            nombre_completo="José Gómez", cedula="998877",
+            descripcion_problema="Conflictos familiares y ansiedad, mucha ansiedad"
+        )
+    
+    def test_busqueda_sin_tildes_y_por_prefijo(self):
+        """Test: 'maria' encuentra 'María' y la cédula se busca por prefijo"""
+        self.assertEqual([i for i, _ in busqueda.buscar('maria perez')], [self.maria.id])
+        self.assertEqual([i for i, _ in busqueda.buscar('10203')], [self.maria.id])
+        self.assertEqual(busqueda.buscar('"; DROP TABLE x; --'), [])
+    
+    def test_indice_sincronizado_con_signals(self):
+        """Test: Editar y eliminar una solicitud actualiza el índice"""
+        self.maria.descripcion_problema = "Duelo reciente"
+        self.maria.save()
+        self.assertEqual(busqueda.buscar('empleo'), [])
+        self.assertEqual([i for i, _ in busqueda.buscar('duelo')], [self.maria.id])
+        self.maria.delete()
+        self.assertEqual(busqueda.buscar('duelo'), [])
+    
+    def test_admin_usa_fts(self):
+        """Test: La búsqueda del admin usa MATCH en lugar de LIKE"""
+        self.client.login(username='staff', password='testpass123')
+        self.staff.is_superuser = True
+        self.staff.save()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(
+                reverse('custom_admin:solicitudes_solicitudayuda_changelist'), {'q': 'gomez'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [self.jose])
+        sql = ' '.join(c['sql'] for c in consultas.captured_queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
+    
+    def test_endpoint_ordenado_por_relevancia(self):
+        """Test: El endpoint devuelve primero la solicitud más relevante"""
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('solicitudes:buscar_texto'), {'q': 'ansiedad'})
+        ids = [fila['id'] for fila in response.json()['resultados']]
+        self.assertEqual(ids, [self.jose.id, self.maria.id])
+
+
+class ChangelistPresupuestoTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: superusuario y taxonomía"""
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpass123', email='a@b.com')
+        self.client.login(username='admin', password='testpass123')
+        nueva_version()
+        self.categoria = CategoriaProblema.objects.create(nombre="Ansiedad", descripcion="")
+        self.sintomas = [
+            Sintoma.objects.create(categoria=self.categoria, nombre=f"Síntoma {i}", descripcion="")
+            for i in range(3)
+        ]
+    
+    def _crear_solicitudes(self, cantidad):
+        for i in range(cantidad):
+            solicitud = SolicitudAyuda.objects.create(
+                descripcion_problema=f"Problema {i}", categoria_problema=self.categoria
+            )
+            solicitud.sintomas_seleccionados.set(self.sintomas)
+    
+    def _consultas(self, nombre_url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse(nombre_url))
+        self.assertEqual(response.status_code, 200)
+        return len(consultas.captured_queries)
+    
+    def test_changelist_solicitudes_costo_constante(self):
+        """Test: 2 o 25 solicitudes por página cuestan las mismas consultas"""
+        self._crear_solicitudes(2)
+        pocas = self._consultas('custom_admin:solicitudes_solicitudayuda_changelist')
+        self._crear_solicitudes(23)
+        muchas = self._consultas('custom_admin:solicitudes_solicitudayuda_changelist')
+        self.assertEqual(pocas, muchas)
+        self.assertLessEqual(muchas, 8)
+    
+    def test_changelist_categorias_y_sintomas_costo_constante(self):
+        """Test: Los conteos de síntomas y las categorías no consultan por fila"""
+        categorias = self._consultas('custom_admin:solicitudes_categoriaproblema_changelist')
+        sintomas = self._consultas('custom_admin:solicitudes_sintoma_changelist')
+        for i in range(10):
+            with self.captureOnCommitCallbacks(execute=True):
+                otra = CategoriaProblema.objects.create(nombre=f"Categoría {i}", descripcion="")
+                Sintoma.objects.create(categoria=otra, nombre=f"Otro {i}", descripcion="")
+        self.assertEqual(self._consultas('custom_admin:solicitudes_categoriaproblema_changelist'), categorias)
+        self.assertEqual(self._consultas('custom_admin:solicitudes_sintoma_changelist'), sintomas)
+    
+    def test_paginador_estimado_sin_filtros(self):
+        """Test: Sin filtros el total sale de la estimación, no de COUNT(*)"""
+        self._crear_solicitudes(3)
+        with mock.patch.object(PaginadorEstimado, 'umbral', 1):
+            paginador = PaginadorEstimado(SolicitudAyuda.objects.all(), 25)
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertGreaterEqual(paginador.count, 3)
+            self.assertNotIn('COUNT', consultas.captured_queries[-1]['sql'])
+            filtrado = PaginadorEstimado(SolicitudAyuda.objects.filter(estado='completado'), 25)
+            self.assertEqual(filtrado.count, 0)
+    
+    def test_paginador_estimado_con_huecos(self):
+        """Test: Los huecos de rowid no dejan páginas vacías; sqlite_stat1 los descuenta"""
+        SolicitudAyuda.objects.bulk_create([
+            SolicitudAyuda(descripcion_problema=f"Problema {i}") for i in range(30)
+        ])
+        SolicitudAyuda.objects.filter(id__in=SolicitudAyuda.objects.order_by('id').values('id')[:20]).delete()
+        with mock.patch.object(PaginadorEstimado, 'umbral', 1):
+            paginador = PaginadorEstimado(SolicitudAyuda.objects.order_by('-id'), 5)
+            self.assertEqual(paginador.num_pages, 6)
+            self.assertEqual(len(paginador.page(2).object_list), 5)
+            with self.assertRaises(EmptyPage):
+                paginador.page(6)
+            self.assertEqual((paginador.count, paginador.num_pages), (10, 2))
+            
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.assertEqual(estimar_filas(SolicitudAyuda), 10)
+
+
+class TransicionesMasivasTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: dos trabajadores disponibles"""
+        invalidar_registro()
+        self.trabajadores = [
+            TrabajadorSocial.objects.create(
+                user=User.objects.create_user(username=f'ts{i}', password='testpass123'),
+                especialidad='General', telefono='3000000000'
+            )
+            for i in range(2)
+        ]
+    
+    def tearDown(self):
+        invalidar_registro()
+    
+    def test_derivar_500_en_pocas_consultas(self):
+        """Test: Derivar 500 casos crea sus encuentros sin consultas por caso"""
+        SolicitudAyuda.objects.bulk_create([
+            SolicitudAyuda(descripcion_problema=f"Problema {i}", estado='pendiente') for i in range(500)
+        ])
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = derivar_a_encuentros(SolicitudAyuda.objects.all())
+        self.assertLessEqual(len(consultas.captured_queries), 10)
+        self.assertEqual(len(resultado.aplicadas), 500)
+        self.assertEqual(resultado.encuentros_creados, 500)
+        self.assertEqual(SolicitudAyuda.objects.filter(estado='programado').count(), 500)
+        por_trabajador = EncuentroVirtual.objects.filter(trabajador_social=self.trabajadores[0]).count()
+        self.assertEqual(por_trabajador, 250)
+    
+    def test_conteos_por_resultado(self):
+        """Test: Se reportan por separado aplicadas, ya en destino y no permitidas"""
+        for estado in ['pendiente', 'evaluando', 'programado', 'completado', 'completado']:
+            SolicitudAyuda.objects.create(descripcion_problema="Problema", estado=estado)
+        resultado = derivar_a_encuentros(SolicitudAyuda.objects.all())
+        self.assertEqual(len(resultado.aplicadas), 2)
+        self.assertEqual(resultado.ya_en_destino, 1)
+        self.assertEqual(resultado.no_permitidas, {'completado': 2})
+        self.assertEqual(EncuentroVirtual.objects.count(), 2)
+        
+        resultado = transicionar(SolicitudAyuda.objects.all(), 'completado')
+        self.assertEqual(len(resultado.aplicadas), 3)
+        self.assertEqual(resultado.ya_en_destino, 2)
+    
+    def test_sin_trabajadores_no_modifica(self):
+        """Test: Sin trabajadores disponibles no se deriva nada"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for trabajador in self.trabajadores:
+                trabajador.disponible = False
+                trabajador.save()
+        solicitud = SolicitudAyuda.objects.create(descripcion_problema="Problema")
+        with self.assertRaises(SinTrabajadoresDisponibles):
+            derivar_a_encuentros(SolicitudAyuda.objects.all())
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, 'pendiente')
+    
+    def _derivar(self, cantidad, inicio):
+        SolicitudAyuda.objects.bulk_create([
+            SolicitudAyuda(descripcion_problema="Problema", estado='pendiente') for _ in range(cantidad)
+        ])
+        return derivar_a_encuentros(SolicitudAyuda.objects.filter(estado='pendiente'), inicio=inicio)
+    
+    def test_derivaciones_sucesivas_no_se_solapan(self):
+        """Test: Una segunda derivación agenda después de los encuentros ya programados"""
+        inicio = timezone.make_aware(datetime(2030, 3, 4, 9, 0))
+        self._derivar(4, inicio)
+        self._derivar(4, inicio)
+        agenda = list(EncuentroVirtual.objects.values_list('trabajador_social_id', 'fecha_programada'))
+        self.assertEqual(len(agenda), 8)
+        self.assertEqual(len(set(agenda)), 8)
+        horas = sorted({timezone.localtime(fecha).hour for _, fecha in agenda})
+        self.assertEqual(horas, [9, 10, 11, 12])
+    
+    @override_settings(ENCUENTROS_HORA_INICIO=8, ENCUENTROS_HORA_FIN=18)
+    def test_encuentros_dentro_de_la_jornada(self):
+        """Test: Los turnos no pasan de la hora de cierre y siguen al día siguiente"""
+        inicio = timezone.make_aware(datetime(2030, 3, 4, 16, 30))
+        self._derivar(6, inicio)
+        fechas = [timezone.localtime(fecha) for fecha in EncuentroVirtual.objects.values_list('fecha_programada', flat=True)]
+        for fecha in fechas:
+            self.assertGreaterEqual(fecha.hour, 8)
+            self.assertLessEqual(fecha.hour * 60 + fecha.minute + 60, 18 * 60)
+        self.assertEqual(sorted({(fecha.day, fecha.hour) for fecha in fechas}), [(4, 16), (5, 8), (5, 9)])
+    
+    def test_encuentros_saltan_el_fin_de_semana(self):
+        """Test: Una derivación del viernes por la tarde continúa el lunes, no el sábado"""
+        inicio = timezone.make_aware(datetime(2030, 3, 8, 16, 30))
+        self._derivar(6, inicio)
+        fechas = [timezone.localtime(fecha) for fecha in EncuentroVirtual.objects.values_list('fecha_programada', flat=True)]
+        self.assertEqual(sorted({(fecha.day, fecha.hour) for fecha in fechas}), [(8, 16), (11, 8), (11, 9)])
+        
+        # Un inicio en sábado también se mueve a la apertura del lunes
+        EncuentroVirtual.objects.all().delete()
+        self._derivar(1, timezone.make_aware(datetime(2030, 3, 9, 10, 0)))
+        fecha = timezone.localtime(EncuentroVirtual.objects.latest('fecha_programada').fecha_programada)
+        self.assertEqual((fecha.weekday(), fecha.hour), (0, 8))
+    
+    def test_disponibilidad_leida_de_la_bd(self):
+        """Test: Un trabajador marcado no disponible no recibe casos aunque la caché diga lo contrario"""
+        trabajadores_disponibles()
+        TrabajadorSocial.objects.filter(pk=self.trabajadores[0].pk).update(disponible=False)
+        self._derivar(3, timezone.make_aware(datetime(2030, 3, 4, 9, 0)))
+        self.assertEqual(
+            set(EncuentroVirtual.objects.values_list('trabajador_social_id', flat=True)),
+            {self.trabajadores[1].id}
+        )
+
+
+class TableroEstadisticasTestCase(TestCase):
+    
+    def setUp(self):
+        """Configuración inicial: solicitudes de hoy y de ayer"""
+        reconstruir_resumen('sqlite')
+        SolicitudAyuda.objects.create(descripcion_problema="Hoy", urgencia='crisis', estado='pendiente')
+        SolicitudAyuda.objects.create(descripcion_problema="Hoy", urgencia='baja', estado='completado')
+        ayer = SolicitudAyuda.objects.create(descripcion_problema="Ayer", urgencia='crisis', estado='pendiente')
+        SolicitudAyuda.objects.filter(pk=ayer.pk).update(fecha_creacion=timezone.now() - timedelta(days=1))
+    
+    def test_calculo_con_consultas_agrupadas(self):
+        """Test: Contadores y serie diaria salen de cuatro consultas agrupadas"""
+        with CaptureQueriesContext(connection) as consultas:
+            datos = tablero.calcular_datos(dias=7)
+        self.assertLessEqual(len(consultas.captured_queries), 4)
+        self.assertEqual(datos['total_solicitudes'], 3)
+        self.assertEqual(datos['solicitudes_por_estado']['pendiente'], 2)
+        self.assertEqual(datos['solicitudes_por_urgencia']['crisis'], 2)
+        self.assertEqual(len(datos['serie']), 7)
+        hoy, ayer = datos['serie'][-1], datos['serie'][-2]
+        self.assertEqual(hoy['dia'], timezone.localdate().isoformat())
+        self.assertEqual((hoy['total'], hoy['urgencia']['baja'], hoy['estado']['completado']), (2, 1, 1))
+        self.assertEqual((ayer['total'], ayer['urgencia']['crisis']), (1, 1))
+    
+    def test_vista_lee_solo_la_instantanea(self):
+        """Test: Con la instantánea vigente la página no consulta solicitudes ni encuentros"""
+        tablero.actualizar_instantanea()
+        User.objects.create_superuser(username='admin', password='testpass123', email='a@b.com')
+        self.client.login(username='admin', password='testpass123')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('custom_admin:estadisticas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_solicitudes'], 3)
+        self.assertEqual(response.context['solicitudes_pendientes'], 2)
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        self.assertNotIn('solicitudes_solicitudayuda', sql)
+        self.assertNotIn('encuentros_encuentrovirtual', sql)
+        self.assertEqual(sql.count('FROM "solicitudes_instantaneatablero"'), 1)
+    
+    @override_settings(TABLERO_INTERVALO_MINIMO_SEGUNDOS=0)
+    def test_escritura_desactualiza_la_instantanea(self):
+        """Test: Una solicitud nueva (también por transición masiva) regenera la instantánea"""
+        tablero.actualizar_instantanea()
+        self.assertEqual(tablero.obtener_instantanea().datos['total_solicitudes'], 3)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            SolicitudAyuda.objects.create(descripcion_problema="Nueva")
+        self.assertTrue(tablero.esta_desactualizado())
+        self.assertEqual(tablero.obtener_instantanea().datos['total_solicitudes'], 4)
+        self.assertFalse(tablero.esta_desactualizado())
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            transicionar(SolicitudAyuda.objects.all(), 'completado')
+        self.assertEqual(tablero.obtener_instantanea().datos['solicitudes_por_estado']['completado'], 4)
+    
+    def test_intervalo_minimo_y_edad_maxima(self):
+        """Test: Se reutiliza dentro del intervalo mínimo y se regenera al vencer"""
+        generado = tablero.actualizar_instantanea().generado
+        tablero.marcar_desactualizado()
+        self.assertEqual(tablero.obtener_instantanea().generado, generado)
+        
+        InstantaneaTablero.objects.update(generado=timezone.now() - timedelta(hours=1))
+        self.assertGreater(tablero.obtener_instantanea().generado, generado)
+        self.assertEqual(InstantaneaTablero.objects.count(), 1)
+    
+    @override_settings(TABLERO_INTERVALO_MINIMO_SEGUNDOS=0)
+    def test_marca_en_la_fila_compartida(self):
+        """Test: La marca de desactualizada vive en la fila, no en la caché del proceso"""
+        tablero.actualizar_instantanea()
+        with self.captureOnCommitCallbacks(execute=True):
+            SolicitudAyuda.objects.create(descripcion_problema="Nueva")
+        cache.clear()
+        self.assertTrue(InstantaneaTablero.objects.get().desactualizado)
+        self.assertEqual(tablero.obtener_instantanea().datos['total_solicitudes'], 4)
+        self.assertFalse(InstantaneaTablero.objects.get().desactualizado)
+    
+    def test_calificacion_desactualiza_por_senal(self):
+        """Test: Una calificación de SQLite marca la instantánea al confirmarse"""
+        tablero.actualizar_instantanea()
+        with self.captureOnCommitCallbacks(execute=True):
+            CalificacionSQLite.objects.create(nombre="Usuario", calificacion=5)
+            self.assertFalse(tablero.esta_desactualizado())
+        self.assertTrue(tablero.esta_desactualizado())
+    
+    def test_error_de_bd_muestra_la_anterior(self):
+        """Test: Solo un error de base de datos recurre a la última instantánea"""
+        generado = tablero.actualizar_instantanea().generado
+        with mock.patch.object(tablero, 'calcular_datos', side_effect=DatabaseError('bloqueada')):
+            self.assertEqual(tablero.obtener_instantanea(forzar=True).generado, generado)
+        with mock.patch.object(tablero, 'calcular_datos', side_effect=KeyError('serie')):
+            with self.assertRaises(KeyError):
+                tablero.obtener_instantanea(forzar=True)
@@ -0,0 +1,212 @@
+"""
+Transiciones masivas de SolicitudAyuda.estado.
+
+TRANSICIONES indica desde qué estados se puede llegar a cada destino. Una
+transición lee los ids y estados de la selección en una consulta, aplica el
+cambio con un único UPDATE condicional (WHERE estado IN origenes permitidos)
+y ejecuta en la misma transacción lo que dependa de los casos movidos, como
+crear sus encuentros con bulk_create. El resultado cuenta exactamente cuántos
+casos se movieron, cuántos no estaban en un estado permitido y cuántos ya
+estaban en el destino.
+
+Los encuentros de una derivación se agendan dentro de la jornada laboral
+(ENCUENTROS_HORA_INICIO a ENCUENTROS_HORA_FIN, hora local, de lunes a
+viernes), a continuación del último encuentro que cada trabajador ya tenga
+programado.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import SolicitudAyuda
+from .tablero import marcar_al_confirmar
+
+
+TRANSICIONES = {
+    'evaluando': {'pendiente'},
+    'atencion_inmediata': {'pendiente', 'evaluando'},
+    'programado': {'pendiente', 'evaluando', 'atencion_inmediata'},
+    'completado': {'pendiente', 'evaluando', 'atencion_inmediata', 'programado'},
+    'remitido': {'pendiente', 'evaluando', 'atencion_inmediata', 'programado'},
+    'pendiente': {'evaluando'},
+}
+
+DURACION_ENCUENTRO = 60
+
+
+class SinTrabajadoresDisponibles(Exception):
+    """No hay trabajadores sociales disponibles para asignar encuentros"""
+
+
+class TransicionConcurrente(Exception):
+    """Otro proceso cambió el estado de alguna solicitud durante la transición"""
+
+
+class ResultadoTransicion:
+    """Conteo por resultado de una transición masiva"""
+
+    def __init__(self, destino):
+        self.destino = destino
+        self.aplicadas = []
+        self.ya_en_destino = 0
+        self.no_permitidas = {}
+        self.encuentros_creados = 0
+
+    @property
+    def total_no_permitidas(self):
+        return sum(self.no_permitidas.values())
+
+    def mensaje(self):
+        etiqueta = dict(SolicitudAyuda.ESTADO_CHOICES)[self.destino]
+        partes = [f'{len(self.aplicadas)} solicitudes pasaron a "{etiqueta}"']
+        if self.encuentros_creados:
+            partes.append(f'{self.encuentros_creados} encuentros creados')
+        if self.ya_en_destino:
+            partes.append(f'{self.ya_en_destino} ya estaban en ese estado')
+        if self.no_permitidas:
+            detalle = ', '.join(f'{cantidad} en {estado}' for estado, cantidad in sorted(self.no_permitidas.items()))
+            partes.append(f'{self.total_no_permitidas} no permitidas ({detalle})')
+        return ' | '.join(partes)
+
+
+def transicionar(queryset, destino, al_aplicar=None, **campos):
+    """
+    Mueve a 'destino' las solicitudes del queryset cuyo estado lo permita.
+    al_aplicar(ids, resultado) corre dentro de la misma transacción con los ids movidos.
+    campos adicionales se escriben en el mismo UPDATE.
+    Lanza TransicionConcurrente, sin modificar nada, si otro proceso cambió
+    alguna solicitud entre la lectura y el UPDATE.
+    """
+    if destino not in TRANSICIONES:
+        raise ValueError(f'Transición no soportada: {destino}')
+    origenes = TRANSICIONES[destino]
+    resultado = ResultadoTransicion(destino)
+
+    with transaction.atomic():
+        candidatos = []
+        filas = queryset.select_for_update().prefetch_related(None).order_by().values_list('id', 'estado')
+        for id_solicitud, estado in filas:
+            if estado in origenes:
+                candidatos.append(id_solicitud)
+            elif estado == destino:
+                resultado.ya_en_destino += 1
+            else:
+                resultado.no_permitidas[estado] = resultado.no_permitidas.get(estado, 0) + 1
+
+        if not candidatos:
+            return resultado
+
+        aplicadas = SolicitudAyuda.objects.filter(
+            id__in=candidatos, estado__in=origenes
+        ).update(estado=destino, **campos)
+        if aplicadas != len(candidatos):
+            # Sin bloqueo de filas (SQLite) no se sabe cuáles movió este proceso:
+            # se revierte todo en lugar de adivinar
+            raise TransicionConcurrente(
+                'Otro proceso modificó algunas de las solicitudes seleccionadas; intente de nuevo'
+            )
+        resultado.aplicadas = candidatos
+        # update() no envía señales
+        marcar_al_confirmar()
+
+        if al_aplicar and candidatos:
+            al_aplicar(candidatos, resultado)
+
+    return resultado
+
+
+def _jornada():
+    return (
+        getattr(settings, 'ENCUENTROS_HORA_INICIO', 8),
+        getattr(settings, 'ENCUENTROS_HORA_FIN', 18),
+    )
+
+
+def _en_jornada(fecha):
+    """Primer momento desde 'fecha' en que un encuentro cabe completo en una jornada de lunes a viernes"""
+    hora_inicio, hora_fin = _jornada()
+    local = timezone.localtime(fecha)
+    apertura = local.replace(hour=hora_inicio, minute=0, second=0, microsecond=0)
+    cierre = local.replace(hour=hora_fin, minute=0, second=0, microsecond=0)
+    if local + timedelta(minutes=DURACION_ENCUENTRO) > cierre:
+        apertura += timedelta(days=1)
+    elif local >= apertura:
+        apertura = local
+    # Sábado y domingo no son laborables: se pasa a la apertura del lunes
+    if apertura.weekday() >= 5:
+        apertura = apertura.replace(hour=hora_inicio, minute=0) + timedelta(days=7 - apertura.weekday())
+    return apertura
+
+
+def _trabajadores_con_agenda():
+    """
+    [(id, fin de su último encuentro pendiente o None)] de los trabajadores
+    disponibles según la BD, en una consulta. Las filas quedan bloqueadas
+    hasta el final de la transacción para que dos derivaciones no agenden
+    al mismo trabajador a la vez.
+    """
+    from encuentros.models import TrabajadorSocial, EncuentroVirtual
+
+    pendientes = EncuentroVirtual.objects.filter(
+        trabajador_social=OuterRef('pk'), estado__in=['programado', 'en_curso']
+    ).order_by('-fecha_programada')
+    filas = TrabajadorSocial.objects.select_for_update().filter(disponible=True).annotate(
+        ultima_fecha=Subquery(pendientes.values('fecha_programada')[:1]),
+        ultima_duracion=Subquery(pendientes.values('duracion_estimada')[:1]),
+    ).order_by('id').values_list('id', 'ultima_fecha', 'ultima_duracion')
+    return [
+        (id_trabajador, fecha + timedelta(minutes=duracion) if fecha else None)
+        for id_trabajador, fecha, duracion in filas
+    ]
+
+
+def _horarios(trabajadores, inicio):
+    """Para cada caso: (id de trabajador, fecha) del turno libre más próximo entre todos"""
+    turnos = [
+        (_en_jornada(max(inicio, libre) if libre else inicio), id_trabajador)
+        for id_trabajador, libre in trabajadores
+    ]
+    heapq.heapify(turnos)
+    while True:
+        fecha, id_trabajador = heapq.heappop(turnos)
+        yield id_trabajador, fecha
+        siguiente = _en_jornada(fecha + timedelta(minutes=DURACION_ENCUENTRO))
+        heapq.heappush(turnos, (siguiente, id_trabajador))
+
+
+def derivar_a_encuentros(queryset, inicio=None):
+    """
+    Pasa a 'programado' las solicitudes permitidas y les crea un encuentro
+    virtual, repartiendo los casos entre los trabajadores disponibles.
+    Lanza SinTrabajadoresDisponibles sin modificar nada si no hay ninguno.
+    """
+    from encuentros.models import EncuentroVirtual
+
+    if inicio is None:
+        # Desde la próxima hora en punto de mañana
+        inicio = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+
+    def crear_encuentros(ids, resultado):
+        # Dentro de la transacción: la excepción revierte el cambio de estado
+        trabajadores = _trabajadores_con_agenda()
+        if not trabajadores:
+            raise SinTrabajadoresDisponibles('No hay trabajadores sociales disponibles')
+        horarios = _horarios(trabajadores, inicio)
+        encuentros = []
+        for id_solicitud in ids:
+            id_trabajador, fecha = next(horarios)
+            encuentros.append(EncuentroVirtual(
+                solicitud_id=id_solicitud,
+                trabajador_social_id=id_trabajador,
+                fecha_programada=fecha,
+                duracion_estimada=DURACION_ENCUENTRO,
+                estado='programado',
+            ))
+        EncuentroVirtual.objects.bulk_create(encuentros)
+        resultado.encuentros_creados = len(encuentros)
+
+    return transicionar(queryset, 'programado', al_aplicar=crear_encuentros)
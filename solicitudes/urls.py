@@ -24,4 +24,14 @@ urlpatterns = [
     
     # Rutas con parámetros opcionales usando query params
     path('reporte/', views.generar_reporte, name='generar_reporte'),
+    
+    # Cola de triage para trabajadores sociales
+    path('cola/', views.cola_triage, name='cola_triage'),
+    path('cola/siguiente/', views.tomar_siguiente, name='tomar_siguiente'),
+    
+    # Ingreso masivo de remisiones de entidades aliadas
+    path('ingreso-masivo/', views.ingreso_masivo, name='ingreso_masivo'),
+    
+    # Búsqueda de texto completo por relevancia
+    path('busqueda/', views.buscar_texto, name='buscar_texto'),
 ]
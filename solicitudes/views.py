@@ -3,9 +3,30 @@ from django.http import Http404
 from django.utils import timezone
 from django.contrib import messages
 from solicitudes.forms import SolicitudAyudaForm
-from .models import SolicitudAyuda, CategoriaProblema, Sintoma
-from encuentros.models import TrabajadorSocial, EncuentroVirtual
-from django.contrib.auth.models import User
+from .models import SolicitudAyuda, EvaluacionSintomas, FactorEvaluacion
+from .evaluacion import registrar_evaluacion
+from encuentros.disponibilidad import trabajadores_disponibles
+from django.core.paginator import Paginator
+from .exportar import respuesta_exportacion
+from sistema_triage.exportar import FORMATOS
+from .paginacion import pagina_desde_request
+from .taxonomia import categoria_por_slug
+from .cola import proximos_casos, tomar_siguiente_caso
+from .ingreso import ingresar_remisiones, leer_jsonl, token_valido
+from . import busqueda
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
+from django.views.decorators.csrf import csrf_exempt
+from django.middleware.csrf import CsrfViewMiddleware
+from django.http import JsonResponse
+from django.conf import settings
+import json
+from django.urls import reverse
+
+POR_PAGINA_REPORTE = 50
+MAX_RESULTADOS_BUSQUEDA = 50
+CASOS_VISIBLES_COLA = 20
+
 
 def pagina_principal(request):
     """Página principal"""
@@ -40,41 +61,50 @@ def evaluacion_sintomas(request, solicitud_id):
     solicitud = get_object_or_404(SolicitudAyuda, id=solicitud_id)
     
     if request.method == 'POST':
-        sintomas = request.POST.getlist('sintomas')
-        causas = request.POST.get('causas', '')
-        elementos_clave = request.POST.get('elementos_clave', '')
-        observaciones = request.POST.get('observaciones', '')
-        
-        solicitud.informacion_adicional = f"Causas: {causas}\nElementos clave: {elementos_clave}\nObservaciones: {observaciones}"
-        solicitud.save()
+        registrar_evaluacion(
+            solicitud,
+            sintomas=request.POST.getlist('sintomas'),
+            causas=request.POST.getlist('factores_causa'),
+            elementos=request.POST.getlist('factores_elemento'),
+            texto_causas=request.POST.get('causas', ''),
+            texto_elementos=request.POST.get('elementos_clave', ''),
+            observaciones=request.POST.get('observaciones', ''),
+        )
         
         messages.success(request, 'Evaluación completada. Será contactado por un trabajador social.')
         
         return redirect('solicitudes:confirmacion_solicitud', solicitud_id=solicitud.id)
     
     return render(request, 'solicitudes/evaluacion_sintomas.html', {
-        'solicitud': solicitud
+        'solicitud': solicitud,
+        'opciones_causa': FactorEvaluacion.CAUSA_CHOICES,
+        'opciones_elemento': FactorEvaluacion.ELEMENTO_CHOICES,
     })
 
 def atencion_inmediata(request, solicitud_id):
     """Paso 4: Intervención inmediata para crisis"""
     solicitud = get_object_or_404(SolicitudAyuda, id=solicitud_id)
     
-    solicitud.urgencia = 'crisis'
-    solicitud.estado = 'atencion_inmediata'
-    solicitud.save()
-    
-    trabajadores_disponibles = TrabajadorSocial.objects.filter(disponible=True)
+    # Solo se escribe la primera vez: recargar la página no toca la BD
+    if solicitud.urgencia != 'crisis' or solicitud.estado != 'atencion_inmediata':
+        solicitud.urgencia = 'crisis'
+        solicitud.estado = 'atencion_inmediata'
+        solicitud.save(update_fields=['urgencia', 'estado', 'clave_prioridad'])
     
     return render(request, 'solicitudes/atencion_inmediata.html', {
         'solicitud': solicitud,
-        'trabajadores_disponibles': trabajadores_disponibles
+        # Registro en caché con nombres ya resueltos: sin consultar trabajadores ni usuarios
+        'trabajadores_disponibles': trabajadores_disponibles()
     })
 
 def detalle_solicitud(request, solicitud_id):
     """Ver detalle de solicitud"""
     solicitud = get_object_or_404(SolicitudAyuda, id=solicitud_id)
-    return render(request, 'solicitudes/detalle_solicitud.html', {'solicitud': solicitud})
+    evaluacion = EvaluacionSintomas.objects.filter(solicitud=solicitud).prefetch_related('factores').first()
+    return render(request, 'solicitudes/detalle_solicitud.html', {
+        'solicitud': solicitud,
+        'evaluacion': evaluacion,
+    })
 
 def confirmacion_solicitud(request, solicitud_id):
     """Confirmación de que la solicitud fue recibida"""
@@ -98,30 +128,35 @@ def seguimiento_sesion(request, solicitud_id, sesion_numero):
     return render(request, 'solicitudes/seguimiento_sesion.html', context)
 
 def solicitudes_por_categoria(request, categoria_slug):
-    """Vista con slug parameter"""
-    categoria = get_object_or_404(CategoriaProblema, nombre__iexact=categoria_slug.replace('-', ' '))
-    solicitudes = SolicitudAyuda.objects.filter(categoria_problema=categoria)
+    """Vista con slug parameter, paginada por cursor"""
+    categoria = categoria_por_slug(categoria_slug)
+    if categoria is None:
+        raise Http404('Categoría no encontrada')
+    pagina = pagina_desde_request(
+        request, SolicitudAyuda.objects.filter(categoria_problema_id=categoria.id)
+    )
     
     return render(request, 'solicitudes/por_categoria.html', {
         'categoria': categoria,
-        'solicitudes': solicitudes
+        'solicitudes': pagina.objetos,
+        'pagina': pagina,
     })
 
 def buscar_solicitudes(request, estado, urgencia):
-    """Vista con múltiples filtros dinámicos"""
-    solicitudes = SolicitudAyuda.objects.filter(
-        estado=estado,
-        urgencia=urgencia
-    ).order_by('-fecha_creacion')
+    """Vista con múltiples filtros dinámicos, paginada por cursor"""
+    pagina = pagina_desde_request(
+        request, SolicitudAyuda.objects.filter(estado=estado, urgencia=urgencia)
+    )
     
     return render(request, 'solicitudes/resultados_busqueda.html', {
-        'solicitudes': solicitudes,
+        'solicitudes': pagina.objetos,
+        'pagina': pagina,
         'estado': estado,
         'urgencia': urgencia
     })
 
-def generar_reporte(request):
-    """Vista con parámetros de query string"""
+def _solicitudes_reporte(request):
+    """Solicitudes filtradas por los parámetros del reporte"""
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
     categoria_id = request.GET.get('categoria')
@@ -134,10 +169,133 @@ def generar_reporte(request):
         solicitudes = solicitudes.filter(fecha_creacion__lte=fecha_fin)
     if categoria_id:
         solicitudes = solicitudes.filter(categoria_problema_id=categoria_id)
+    return solicitudes
+
+
+@staff_member_required
+def exportar_reporte(request):
+    """Descarga el reporte completo en streaming (solo staff: son datos sensibles)"""
+    return respuesta_exportacion(_solicitudes_reporte(request), request.GET['formato'])
+
+
+def generar_reporte(request):
+    """
+    Vista con parámetros de query string.
+    ?formato=csv|jsonl descarga el reporte completo en streaming (solo staff);
+    sin formato se muestra paginado en HTML.
+    """
+    if request.GET.get('formato') in FORMATOS:
+        return exportar_reporte(request)
+    
+    solicitudes = _solicitudes_reporte(request)
+    # El paginador hace el único count(); cada página lee solo sus filas
+    paginador = Paginator(
+        solicitudes.select_related('categoria_problema').order_by('-fecha_creacion', '-id'),
+        POR_PAGINA_REPORTE
+    )
+    pagina = paginador.get_page(request.GET.get('page'))
+    filtros = request.GET.copy()
+    filtros.pop('page', None)
     
     return render(request, 'solicitudes/reporte.html', {
-        'solicitudes': solicitudes,
-        'total': solicitudes.count()
+        'solicitudes': pagina.object_list,
+        'page_obj': pagina,
+        'total': paginador.count,
+        'filtros': filtros.urlencode(),
+    })
+
+
+@staff_member_required
+def cola_triage(request):
+    """Próximos casos de la cola de triage, en orden de atención"""
+    casos = proximos_casos(CASOS_VISIBLES_COLA, select_related=['categoria_problema'])
+    return render(request, 'solicitudes/cola_triage.html', {
+        'casos': casos,
+        'mis_casos': SolicitudAyuda.objects.filter(
+            asignado_a=request.user, estado__in=['evaluando', 'atencion_inmediata']
+        ).order_by('fecha_asignacion'),
     })
 
+@staff_member_required
+@require_POST
+def tomar_siguiente(request):
+    """Asigna al trabajador el caso de mayor prioridad"""
+    solicitud = tomar_siguiente_caso(request.user)
+    if solicitud is None:
+        messages.info(request, '✅ No hay casos pendientes en la cola.')
+        return redirect('solicitudes:cola_triage')
+    
+    messages.success(request, f'📋 Caso #{solicitud.id} asignado ({solicitud.get_urgencia_display()}).')
+    return redirect(reverse('custom_admin:solicitudes_solicitudayuda_change', args=[solicitud.id]))
+
 
+def _rechazo_csrf(request):
+    """Respuesta 403 si la petición no pasa la verificación CSRF; None si la pasa"""
+    return CsrfViewMiddleware(lambda peticion: None).process_view(request, None, (), {})
+
+
+@csrf_exempt
+@require_POST
+def ingreso_masivo(request):
+    """
+    Recibe un lote de remisiones de entidades aliadas.
+    Cuerpo: lista JSON (o {"solicitudes": [...]}) con Content-Type application/json,
+    o JSONL con Content-Type application/x-ndjson.
+    
+    Las entidades se autentican con 'Authorization: Token ...' y solo esas
+    peticiones quedan exentas de CSRF; una sesión de staff pasa por la
+    verificación CSRF normal.
+    """
+    if not token_valido(request.headers.get('Authorization')):
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'No autorizado'}, status=401)
+        rechazo = _rechazo_csrf(request)
+        if rechazo is not None:
+            return rechazo
+    
+    if request.content_type in ('application/x-ndjson', 'application/jsonl'):
+        try:
+            filas = list(leer_jsonl(request.body.splitlines()))
+        except ValueError:
+            # UnicodeDecodeError: el cuerpo no está en UTF-8
+            return JsonResponse({'error': 'JSONL inválido: el cuerpo debe estar en UTF-8'}, status=400)
+    elif request.content_type != 'application/json':
+        return JsonResponse({'error': 'Content-Type no soportado'}, status=415)
+    else:
+        try:
+            filas = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        if isinstance(filas, dict):
+            filas = filas.get('solicitudes')
+        if not isinstance(filas, list):
+            return JsonResponse({'error': 'Se esperaba una lista de solicitudes'}, status=400)
+    
+    if len(filas) > settings.INGRESO_MASIVO_MAX_FILAS:
+        return JsonResponse(
+            {'error': f'Máximo {settings.INGRESO_MASIVO_MAX_FILAS} solicitudes por envío'}, status=413
+        )
+    
+    resultado = ingresar_remisiones(filas)
+    return JsonResponse(resultado.como_dict(), status=201 if resultado.creadas else 400)
+
+
+@staff_member_required
+def buscar_texto(request):
+    """Búsqueda por relevancia (FTS5) en nombre, cédula y descripción: ?q=texto&limite=20"""
+    texto = request.GET.get('q', '')
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 20)), MAX_RESULTADOS_BUSQUEDA))
+    except ValueError:
+        limite = 20
+    
+    puntajes = dict(busqueda.buscar(texto, limite))
+    filas = SolicitudAyuda.objects.filter(id__in=puntajes).values(
+        'id', 'nombre_completo', 'urgencia', 'estado', 'fecha_creacion'
+    )
+    resultados = sorted(filas, key=lambda fila: puntajes[fila['id']])
+    for fila in resultados:
+        fila['puntaje'] = round(puntajes[fila['id']], 4)
+        fila['url'] = reverse('custom_admin:solicitudes_solicitudayuda_change', args=[fila['id']])
+    
+    return JsonResponse({'q': texto, 'resultados': resultados})